@@ -14,6 +14,14 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# A URL vem de DATABASE_URL (shared/config.py), a mesma usada pela
+# aplicação, a não ser que quem chamou já tenha definido sqlalchemy.url.
+if not config.get_main_option("sqlalchemy.url"):
+    from shared.config import DATABASE_URL
+
+    config.set_main_option("sqlalchemy.url",
+                           DATABASE_URL.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -21,6 +29,12 @@ if config.config_file_name is not None:
 from contas_a_pagar_e_receber.models import ContaPagarReceber
 # noinspection PyUnresolvedReferences
 from contas_a_pagar_e_receber.models import FornecedorCliente
+# noinspection PyUnresolvedReferences
+from shared.versao_tabela import VersaoTabela
+# noinspection PyUnresolvedReferences
+from shared.tarefas import Tarefa
+# noinspection PyUnresolvedReferences
+from shared.idempotencia import ChaveIdempotencia
 from shared.database import Base
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
@@ -31,6 +45,15 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# As partições mensais de contas e do arquivo são criadas pela migração e
+# pelo comando contas_a_pagar_e_receber.particoes, fora dos modelos; o
+# autogenerate não deve propor removê-las.
+def include_object(objeto, nome, tipo, refletido, comparado_com):
+    if tipo == "table" and refletido and comparado_com is None:
+        return not nome.startswith("contas_a_pagar_e_receber_")
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -49,6 +72,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -70,7 +94,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
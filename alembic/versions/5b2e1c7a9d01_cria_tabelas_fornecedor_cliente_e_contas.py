@@ -0,0 +1,40 @@
+"""Cria tabelas de fornecedor cliente e contas a pagar e receber
+
+Revision ID: 5b2e1c7a9d01
+Revises: 
+Create Date: 2024-04-06 10:12:31.518402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e1c7a9d01'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('fornecedor_cliente',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('nome', sa.String(length=255), nullable=True),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_table('contas_a_pagar_e_receber',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('descricao', sa.String(length=30), nullable=True),
+                    sa.Column('valor', sa.Numeric(), nullable=True),
+                    sa.Column('tipo', sa.String(length=30), nullable=True),
+                    sa.Column('fornecedor_id', sa.Integer(), nullable=True),
+                    sa.ForeignKeyConstraint(['fornecedor_id'], ['fornecedor_cliente.id'], ),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+
+
+def downgrade() -> None:
+    op.drop_table('contas_a_pagar_e_receber')
+    op.drop_table('fornecedor_cliente')
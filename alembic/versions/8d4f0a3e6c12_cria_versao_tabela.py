@@ -0,0 +1,73 @@
+"""Cria versao_tabela e triggers de versionamento
+
+Revision ID: 8d4f0a3e6c12
+Revises: 5b2e1c7a9d01
+Create Date: 2024-04-06 10:20:04.102937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f0a3e6c12'
+down_revision: Union[str, None] = '5b2e1c7a9d01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS_VERSIONADAS = ('contas_a_pagar_e_receber', 'fornecedor_cliente')
+
+
+def upgrade() -> None:
+    op.create_table('versao_tabela',
+                    sa.Column('tabela', sa.String(length=63), nullable=False),
+                    sa.Column('versao', sa.Integer(), nullable=False),
+                    sa.Column('atualizado_em', sa.DateTime(timezone=True), nullable=False),
+                    sa.PrimaryKeyConstraint('tabela')
+                    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            CREATE OR REPLACE FUNCTION incrementar_versao_tabela() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO versao_tabela (tabela, versao, atualizado_em)
+                VALUES (TG_TABLE_NAME, 1, now())
+                ON CONFLICT (tabela) DO UPDATE
+                    SET versao = versao_tabela.versao + 1,
+                        atualizado_em = excluded.atualizado_em;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        for tabela in TABELAS_VERSIONADAS:
+            op.execute(f"""
+                CREATE TRIGGER {tabela}_versao
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabela}
+                FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_tabela()
+            """)
+    elif op.get_bind().dialect.name == 'sqlite':
+        for tabela in TABELAS_VERSIONADAS:
+            for operacao in ('INSERT', 'UPDATE', 'DELETE'):
+                op.execute(f"""
+                    CREATE TRIGGER {tabela}_versao_{operacao} AFTER {operacao} ON {tabela}
+                    BEGIN
+                        INSERT INTO versao_tabela (tabela, versao, atualizado_em)
+                        VALUES ('{tabela}', 1, strftime('%Y-%m-%d %H:%M:%S', 'now'))
+                        ON CONFLICT (tabela) DO UPDATE
+                            SET versao = versao + 1, atualizado_em = excluded.atualizado_em;
+                    END
+                """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for tabela in TABELAS_VERSIONADAS:
+            op.execute(f"DROP TRIGGER IF EXISTS {tabela}_versao ON {tabela}")
+        op.execute("DROP FUNCTION IF EXISTS incrementar_versao_tabela()")
+    elif op.get_bind().dialect.name == 'sqlite':
+        for tabela in TABELAS_VERSIONADAS:
+            for operacao in ('INSERT', 'UPDATE', 'DELETE'):
+                op.execute(f"DROP TRIGGER IF EXISTS {tabela}_versao_{operacao}")
+    op.drop_table('versao_tabela')
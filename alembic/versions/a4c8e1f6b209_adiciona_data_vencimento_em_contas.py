@@ -0,0 +1,53 @@
+"""Adiciona data_vencimento em contas_a_pagar_e_receber
+
+Revision ID: a4c8e1f6b209
+Revises: f7b2d5e8a913
+Create Date: 2024-04-08 08:41:17.226904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e1f6b209'
+down_revision: Union[str, None] = 'f7b2d5e8a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# No SQLite a coluna NOT NULL com DEFAULT CURRENT_DATE exige recriar a
+# tabela (modo batch), e a tabela recriada perde os triggers de versão e de
+# saldo; eles são lidos antes e recriados depois.
+def triggers_sqlite() -> list[str]:
+    if op.get_bind().dialect.name != 'sqlite':
+        return []
+    return [sql for sql, in op.get_bind().exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' "
+        "AND tbl_name = 'contas_a_pagar_e_receber'")]
+
+
+def recriar_triggers(triggers: list[str]) -> None:
+    for sql in triggers:
+        op.execute(sql)
+
+
+def upgrade() -> None:
+    triggers = triggers_sqlite()
+    with op.batch_alter_table('contas_a_pagar_e_receber') as batch_op:
+        batch_op.add_column(sa.Column('data_vencimento', sa.Date(), nullable=False,
+                                      server_default=sa.text('(CURRENT_DATE)')))
+    recriar_triggers(triggers)
+    op.create_index(op.f('ix_contas_a_pagar_e_receber_data_vencimento'),
+                    'contas_a_pagar_e_receber', ['data_vencimento'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_contas_a_pagar_e_receber_data_vencimento'),
+                  table_name='contas_a_pagar_e_receber')
+    triggers = triggers_sqlite()
+    with op.batch_alter_table('contas_a_pagar_e_receber') as batch_op:
+        batch_op.drop_column('data_vencimento')
+    recriar_triggers(triggers)
@@ -0,0 +1,158 @@
+"""Particiona contas_a_pagar_e_receber por mês e cria a tabela de arquivo
+
+Revision ID: b9d3f7a2c518
+Revises: a4c8e1f6b209
+Create Date: 2024-04-08 10:26:54.871362
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d3f7a2c518'
+down_revision: Union[str, None] = 'a4c8e1f6b209'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELA = 'contas_a_pagar_e_receber'
+LEGADO = 'contas_a_pagar_e_receber_legado'
+ARQUIVO = 'contas_a_pagar_e_receber_arquivo'
+COLUNAS = 'id, descricao, valor, tipo, fornecedor_id, data_vencimento'
+# Partições criadas à frente; depois disso quem mantém é o comando
+# python -m contas_a_pagar_e_receber.particoes.
+MESES_A_FRENTE = 12
+
+INDICES = (
+    ('ix_contas_a_pagar_e_receber_fornecedor_id', ['fornecedor_id'], {}),
+    ('ix_contas_a_pagar_e_receber_tipo_fornecedor_id', ['tipo', 'fornecedor_id'],
+     {'postgresql_include': ['valor']}),
+    ('ix_contas_a_pagar_e_receber_descricao_trgm', ['descricao'],
+     {'postgresql_using': 'gist', 'postgresql_ops': {'descricao': 'gist_trgm_ops'}}),
+    ('ix_contas_a_pagar_e_receber_data_vencimento', ['data_vencimento'], {}),
+)
+
+
+def somar_meses(mes: date, quantidade: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + quantidade
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def colunas_contas(chave_primaria: sa.PrimaryKeyConstraint) -> list:
+    return [
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('descricao', sa.String(length=30), nullable=True),
+        sa.Column('valor', sa.Numeric(), nullable=True),
+        sa.Column('tipo', sa.String(length=30), nullable=True),
+        sa.Column('fornecedor_id', sa.Integer(), nullable=True),
+        sa.Column('data_vencimento', sa.Date(), nullable=False),
+        chave_primaria,
+    ]
+
+
+def criar_triggers_contas() -> None:
+    op.execute(f"""
+        CREATE TRIGGER {TABELA}_versao
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {TABELA}
+        FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_tabela()
+    """)
+    op.execute(f"""
+        CREATE TRIGGER {TABELA}_saldo
+        AFTER INSERT OR UPDATE OR DELETE ON {TABELA}
+        FOR EACH ROW EXECUTE FUNCTION atualizar_saldo_fornecedor()
+    """)
+
+
+# Troca a tabela de contas por outra com a mesma estrutura: o conteúdo é
+# copiado sem os triggers (o saldo e a versão já refletem essas linhas) e os
+# índices e triggers são criados depois da cópia.
+def substituir_tabela_contas(criar_tabela) -> None:
+    op.execute(f"LOCK TABLE {TABELA} IN ACCESS EXCLUSIVE MODE")
+    op.execute(f"DROP TRIGGER {TABELA}_versao ON {TABELA}")
+    op.execute(f"DROP TRIGGER {TABELA}_saldo ON {TABELA}")
+    for nome, _, _ in INDICES:
+        op.drop_index(nome, table_name=TABELA)
+    op.rename_table(TABELA, LEGADO)
+    op.execute(f"ALTER TABLE {LEGADO} RENAME CONSTRAINT {TABELA}_pkey TO {LEGADO}_pkey")
+    # A sequência dos ids passa para a tabela nova e não é removida junto
+    # com a antiga.
+    op.execute(f"ALTER SEQUENCE {TABELA}_id_seq OWNED BY NONE")
+
+    criar_tabela()
+    op.execute(f"ALTER TABLE {TABELA} ALTER COLUMN id "
+               f"SET DEFAULT nextval('{TABELA}_id_seq')")
+    op.execute(f"ALTER TABLE {TABELA} ALTER COLUMN data_vencimento "
+               f"SET DEFAULT CURRENT_DATE")
+    op.execute(f"ALTER SEQUENCE {TABELA}_id_seq OWNED BY {TABELA}.id")
+    op.create_foreign_key(f'{TABELA}_fornecedor_id_fkey', TABELA,
+                          'fornecedor_cliente', ['fornecedor_id'], ['id'])
+
+    op.execute(f"INSERT INTO {TABELA} ({COLUNAS}) SELECT {COLUNAS} FROM {LEGADO}")
+    op.drop_table(LEGADO)
+    for nome, colunas, opcoes in INDICES:
+        op.create_index(nome, TABELA, colunas, unique=False, **opcoes)
+    criar_triggers_contas()
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_table(ARQUIVO, *colunas_contas(sa.PrimaryKeyConstraint('id')))
+        return
+
+    # No Postgres a chave de partição precisa fazer parte da chave primária:
+    # ela passa a ser (id, data_vencimento), com os ids ainda vindos de uma
+    # única sequência. O banco deixa de garantir que o id sozinho seja único
+    # (só a sequência garante; quem grava ids explícitos precisa conferir) e
+    # as buscas só por id, como GET/PUT/DELETE /{id}, passam a consultar o
+    # índice da chave primária de todas as partições. Datas fora das
+    # partições mensais caem na partição padrão.
+    inicio = op.get_bind().execute(sa.text(
+        f"SELECT date_trunc('month', min(data_vencimento))::date FROM {TABELA}"
+    )).scalar() or date.today().replace(day=1)
+    fim = somar_meses(date.today().replace(day=1), MESES_A_FRENTE)
+
+    def criar_tabela_particionada():
+        op.create_table(TABELA, *colunas_contas(
+            sa.PrimaryKeyConstraint('id', 'data_vencimento')),
+            postgresql_partition_by='RANGE (data_vencimento)')
+        op.execute(f"CREATE TABLE {TABELA}_padrao PARTITION OF {TABELA} DEFAULT")
+        mes = inicio
+        while mes < fim:
+            op.execute(f"CREATE TABLE {TABELA}_p{mes:%Y_%m} PARTITION OF {TABELA} "
+                       f"FOR VALUES FROM ('{mes}') TO ('{somar_meses(mes, 1)}')")
+            mes = somar_meses(mes, 1)
+
+    substituir_tabela_contas(criar_tabela_particionada)
+
+    # O arquivo tem a mesma estrutura e recebe as partições antigas inteiras
+    # (DETACH/ATTACH), sem copiar linhas.
+    op.create_table(ARQUIVO, *colunas_contas(
+        sa.PrimaryKeyConstraint('id', 'data_vencimento')),
+        postgresql_partition_by='RANGE (data_vencimento)')
+    op.execute(f"CREATE TABLE {ARQUIVO}_padrao PARTITION OF {ARQUIVO} DEFAULT")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_table(ARQUIVO)
+        return
+
+    def criar_tabela_simples():
+        op.create_table(TABELA, *colunas_contas(sa.PrimaryKeyConstraint('id')))
+
+    substituir_tabela_contas(criar_tabela_simples)
+    # As contas arquivadas voltam para a tabela e o saldo é recalculado.
+    op.execute(f"INSERT INTO {TABELA} ({COLUNAS}) SELECT {COLUNAS} FROM {ARQUIVO}")
+    op.drop_table(ARQUIVO)
+    op.execute("DELETE FROM saldo_fornecedor")
+    op.execute(f"""
+        INSERT INTO saldo_fornecedor (fornecedor_id, quantidade, total_pagar, total_receber)
+        SELECT COALESCE(fornecedor_id, 0), count(*),
+               COALESCE(sum(CASE WHEN tipo = 'PAGAR' THEN COALESCE(valor, 0) ELSE 0 END), 0),
+               COALESCE(sum(CASE WHEN tipo = 'RECEBER' THEN COALESCE(valor, 0) ELSE 0 END), 0)
+        FROM {TABELA}
+        GROUP BY COALESCE(fornecedor_id, 0)
+    """)
@@ -0,0 +1,35 @@
+"""Cria índices de contas a pagar e receber
+
+Revision ID: c1a7e9f2b345
+Revises: 8d4f0a3e6c12
+Create Date: 2024-04-06 10:31:47.661205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1a7e9f2b345'
+down_revision: Union[str, None] = '8d4f0a3e6c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # fornecedor_id: filtros, joins e a checagem da FK ao remover um
+    # fornecedor deixam de fazer varredura sequencial na tabela de contas.
+    op.create_index(op.f('ix_contas_a_pagar_e_receber_fornecedor_id'),
+                    'contas_a_pagar_e_receber', ['fornecedor_id'], unique=False)
+    op.create_index('ix_contas_a_pagar_e_receber_tipo_fornecedor_id',
+                    'contas_a_pagar_e_receber', ['tipo', 'fornecedor_id'],
+                    unique=False, postgresql_include=['valor'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contas_a_pagar_e_receber_tipo_fornecedor_id',
+                  table_name='contas_a_pagar_e_receber')
+    op.drop_index(op.f('ix_contas_a_pagar_e_receber_fornecedor_id'),
+                  table_name='contas_a_pagar_e_receber')
@@ -0,0 +1,43 @@
+"""Cria a tabela tarefa da fila de tarefas em segundo plano
+
+Revision ID: c6e2a9d4f157
+Revises: b9d3f7a2c518
+Create Date: 2024-04-09 09:12:40.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e2a9d4f157'
+down_revision: Union[str, None] = 'b9d3f7a2c518'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('tarefa',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('tipo', sa.String(length=60), nullable=False),
+    sa.Column('parametros', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('max_tentativas', sa.Integer(), nullable=False),
+    sa.Column('resultado', sa.JSON(), nullable=True),
+    sa.Column('erro', sa.Text(), nullable=True),
+    sa.Column('criada_em', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('disponivel_em', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('iniciada_em', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('concluida_em', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tarefa_status_disponivel_em', 'tarefa',
+                    ['status', 'disponivel_em'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tarefa_status_disponivel_em', table_name='tarefa')
+    op.drop_table('tarefa')
@@ -0,0 +1,36 @@
+"""Cria a tabela chave_idempotencia das respostas por Idempotency-Key
+
+Revision ID: d8a3f1c6e274
+Revises: c6e2a9d4f157
+Create Date: 2024-04-12 15:27:08.912043
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f1c6e274'
+down_revision: Union[str, None] = 'c6e2a9d4f157'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chave_idempotencia',
+    sa.Column('escopo', sa.String(length=60), nullable=False),
+    sa.Column('chave', sa.String(length=255), nullable=False),
+    sa.Column('impressao', sa.String(length=32), nullable=False),
+    sa.Column('resposta', sa.JSON(), nullable=True),
+    sa.Column('criada_em', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('escopo', 'chave')
+    )
+    op.create_index('ix_chave_idempotencia_criada_em', 'chave_idempotencia',
+                    ['criada_em'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chave_idempotencia_criada_em', table_name='chave_idempotencia')
+    op.drop_table('chave_idempotencia')
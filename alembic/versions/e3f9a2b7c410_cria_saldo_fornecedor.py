@@ -0,0 +1,99 @@
+"""Cria saldo_fornecedor e triggers de manutenção do saldo
+
+Revision ID: e3f9a2b7c410
+Revises: c1a7e9f2b345
+Create Date: 2024-04-07 09:12:31.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f9a2b7c410'
+down_revision: Union[str, None] = 'c1a7e9f2b345'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def aplicar_linha(linha: str, sinal: int) -> str:
+    return f"""
+        INSERT INTO saldo_fornecedor (fornecedor_id, quantidade, total_pagar, total_receber)
+        VALUES (COALESCE({linha}.fornecedor_id, 0), {sinal},
+                CASE WHEN {linha}.tipo = 'PAGAR' THEN {sinal} * COALESCE({linha}.valor, 0) ELSE 0 END,
+                CASE WHEN {linha}.tipo = 'RECEBER' THEN {sinal} * COALESCE({linha}.valor, 0) ELSE 0 END)
+        ON CONFLICT (fornecedor_id) DO UPDATE
+            SET quantidade = saldo_fornecedor.quantidade + excluded.quantidade,
+                total_pagar = saldo_fornecedor.total_pagar + excluded.total_pagar,
+                total_receber = saldo_fornecedor.total_receber + excluded.total_receber;
+    """
+
+
+TRIGGERS_SQLITE = {
+    'INSERT': aplicar_linha('NEW', 1),
+    'UPDATE': aplicar_linha('OLD', -1) + aplicar_linha('NEW', 1),
+    'DELETE': aplicar_linha('OLD', -1),
+}
+
+
+def upgrade() -> None:
+    op.create_table('saldo_fornecedor',
+                    sa.Column('fornecedor_id', sa.Integer(), autoincrement=False, nullable=False),
+                    sa.Column('quantidade', sa.Integer(), nullable=False),
+                    sa.Column('total_pagar', sa.Numeric(), nullable=False),
+                    sa.Column('total_receber', sa.Numeric(), nullable=False),
+                    sa.PrimaryKeyConstraint('fornecedor_id')
+                    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("LOCK TABLE contas_a_pagar_e_receber IN SHARE MODE")
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION atualizar_saldo_fornecedor() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    {aplicar_linha('OLD', -1)}
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    {aplicar_linha('NEW', 1)}
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER contas_a_pagar_e_receber_saldo
+            AFTER INSERT OR UPDATE OR DELETE ON contas_a_pagar_e_receber
+            FOR EACH ROW EXECUTE FUNCTION atualizar_saldo_fornecedor()
+        """)
+    elif op.get_bind().dialect.name == 'sqlite':
+        for operacao, corpo in TRIGGERS_SQLITE.items():
+            op.execute(f"""
+                CREATE TRIGGER contas_a_pagar_e_receber_saldo_{operacao} AFTER {operacao}
+                ON contas_a_pagar_e_receber
+                BEGIN
+                    {corpo}
+                END
+            """)
+
+    # Carga inicial com as contas já existentes.
+    op.execute("""
+        INSERT INTO saldo_fornecedor (fornecedor_id, quantidade, total_pagar, total_receber)
+        SELECT COALESCE(fornecedor_id, 0), count(*),
+               COALESCE(sum(CASE WHEN tipo = 'PAGAR' THEN COALESCE(valor, 0) ELSE 0 END), 0),
+               COALESCE(sum(CASE WHEN tipo = 'RECEBER' THEN COALESCE(valor, 0) ELSE 0 END), 0)
+        FROM contas_a_pagar_e_receber
+        GROUP BY COALESCE(fornecedor_id, 0)
+    """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS contas_a_pagar_e_receber_saldo "
+                   "ON contas_a_pagar_e_receber")
+        op.execute("DROP FUNCTION IF EXISTS atualizar_saldo_fornecedor()")
+    elif op.get_bind().dialect.name == 'sqlite':
+        for operacao in TRIGGERS_SQLITE:
+            op.execute(f"DROP TRIGGER IF EXISTS contas_a_pagar_e_receber_saldo_{operacao}")
+    op.drop_table('saldo_fornecedor')
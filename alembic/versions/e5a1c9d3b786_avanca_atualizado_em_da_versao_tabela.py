@@ -0,0 +1,65 @@
+"""Avança atualizado_em da versao_tabela ao menos um segundo por escrita
+
+Revision ID: e5a1c9d3b786
+Revises: d8a3f1c6e274
+Create Date: 2024-04-15 09:41:52.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c9d3b786'
+down_revision: Union[str, None] = 'd8a3f1c6e274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS_VERSIONADAS = ('contas_a_pagar_e_receber', 'fornecedor_cliente')
+
+FUNCAO_POSTGRESQL = """
+    CREATE OR REPLACE FUNCTION incrementar_versao_tabela() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO versao_tabela (tabela, versao, atualizado_em)
+        VALUES (TG_TABLE_NAME, 1, now())
+        ON CONFLICT (tabela) DO UPDATE
+            SET versao = versao_tabela.versao + 1,
+                atualizado_em = {atualizado_em};
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+TRIGGER_SQLITE = """
+    CREATE TRIGGER {tabela}_versao_{operacao} AFTER {operacao} ON {tabela}
+    BEGIN
+        INSERT INTO versao_tabela (tabela, versao, atualizado_em)
+        VALUES ('{tabela}', 1, strftime('%Y-%m-%d %H:%M:%S', 'now'))
+        ON CONFLICT (tabela) DO UPDATE
+            SET versao = versao + 1, atualizado_em = {atualizado_em};
+    END
+"""
+
+
+def recriar_triggers(atualizado_em_postgresql: str, atualizado_em_sqlite: str) -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(FUNCAO_POSTGRESQL.format(atualizado_em=atualizado_em_postgresql))
+    elif op.get_bind().dialect.name == 'sqlite':
+        for tabela in TABELAS_VERSIONADAS:
+            for operacao in ('INSERT', 'UPDATE', 'DELETE'):
+                op.execute(f"DROP TRIGGER IF EXISTS {tabela}_versao_{operacao}")
+                op.execute(TRIGGER_SQLITE.format(tabela=tabela, operacao=operacao,
+                                                 atualizado_em=atualizado_em_sqlite))
+
+
+def upgrade() -> None:
+    recriar_triggers(
+        "greatest(excluded.atualizado_em, date_trunc('second', "
+        "versao_tabela.atualizado_em) + interval '1 second')",
+        "max(excluded.atualizado_em, "
+        "strftime('%Y-%m-%d %H:%M:%S', atualizado_em, '+1 second'))")
+
+
+def downgrade() -> None:
+    recriar_triggers("excluded.atualizado_em", "excluded.atualizado_em")
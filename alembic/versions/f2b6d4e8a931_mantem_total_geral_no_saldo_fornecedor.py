@@ -0,0 +1,92 @@
+"""Mantém a linha do total geral em saldo_fornecedor
+
+Revision ID: f2b6d4e8a931
+Revises: e5a1c9d3b786
+Create Date: 2024-04-16 10:27:14.902635
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d4e8a931'
+down_revision: Union[str, None] = 'e5a1c9d3b786'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TOTAL_GERAL = -1
+
+
+def aplicar_linha(linha: str, sinal: int, chave: str) -> str:
+    return f"""
+        INSERT INTO saldo_fornecedor (fornecedor_id, quantidade, total_pagar, total_receber)
+        VALUES ({chave}, {sinal},
+                CASE WHEN {linha}.tipo = 'PAGAR' THEN {sinal} * COALESCE({linha}.valor, 0) ELSE 0 END,
+                CASE WHEN {linha}.tipo = 'RECEBER' THEN {sinal} * COALESCE({linha}.valor, 0) ELSE 0 END)
+        ON CONFLICT (fornecedor_id) DO UPDATE
+            SET quantidade = saldo_fornecedor.quantidade + excluded.quantidade,
+                total_pagar = saldo_fornecedor.total_pagar + excluded.total_pagar,
+                total_receber = saldo_fornecedor.total_receber + excluded.total_receber;
+    """
+
+
+# Passos do trigger: (operações, linha, sinal, chave). Com total, a linha do
+# total geral é atualizada depois das dos fornecedores.
+def passos(total: bool) -> list[tuple[tuple[str, ...], str, int, str]]:
+    chaves = ["COALESCE({linha}.fornecedor_id, 0)"]
+    if total:
+        chaves.append(str(TOTAL_GERAL))
+    return [(operacoes, linha, sinal, chave.format(linha=linha))
+            for chave in chaves
+            for operacoes, linha, sinal in ((('UPDATE', 'DELETE'), 'OLD', -1),
+                                            (('INSERT', 'UPDATE'), 'NEW', 1))]
+
+
+def recriar_triggers(total: bool) -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        blocos = "".join(f"""
+                IF TG_OP IN {operacoes} THEN
+                    {aplicar_linha(linha, sinal, chave)}
+                END IF;""" for operacoes, linha, sinal, chave in passos(total))
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION atualizar_saldo_fornecedor() RETURNS trigger AS $$
+            BEGIN
+                {blocos}
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+    elif op.get_bind().dialect.name == 'sqlite':
+        for operacao in ('INSERT', 'UPDATE', 'DELETE'):
+            corpo = "".join(aplicar_linha(linha, sinal, chave)
+                            for operacoes, linha, sinal, chave in passos(total)
+                            if operacao in operacoes)
+            op.execute(f"DROP TRIGGER IF EXISTS contas_a_pagar_e_receber_saldo_{operacao}")
+            op.execute(f"""
+                CREATE TRIGGER contas_a_pagar_e_receber_saldo_{operacao} AFTER {operacao}
+                ON contas_a_pagar_e_receber
+                BEGIN
+                    {corpo}
+                END
+            """)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("LOCK TABLE contas_a_pagar_e_receber IN SHARE MODE")
+    recriar_triggers(total=True)
+    # Carga inicial com as contas já existentes.
+    op.execute(f"""
+        INSERT INTO saldo_fornecedor (fornecedor_id, quantidade, total_pagar, total_receber)
+        SELECT {TOTAL_GERAL}, count(*),
+               COALESCE(sum(CASE WHEN tipo = 'PAGAR' THEN COALESCE(valor, 0) ELSE 0 END), 0),
+               COALESCE(sum(CASE WHEN tipo = 'RECEBER' THEN COALESCE(valor, 0) ELSE 0 END), 0)
+        FROM contas_a_pagar_e_receber
+    """)
+
+
+def downgrade() -> None:
+    recriar_triggers(total=False)
+    op.execute(f"DELETE FROM saldo_fornecedor WHERE fornecedor_id = {TOTAL_GERAL}")
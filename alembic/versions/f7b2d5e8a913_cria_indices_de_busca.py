@@ -0,0 +1,38 @@
+"""Cria índices de trigramas para a busca por nome e descrição
+
+Revision ID: f7b2d5e8a913
+Revises: e3f9a2b7c410
+Create Date: 2024-04-07 11:03:52.917340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b2d5e8a913'
+down_revision: Union[str, None] = 'e3f9a2b7c410'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDICES = (
+    ('ix_fornecedor_cliente_nome_trgm', 'fornecedor_cliente', 'nome'),
+    ('ix_contas_a_pagar_e_receber_descricao_trgm', 'contas_a_pagar_e_receber', 'descricao'),
+)
+
+
+def upgrade() -> None:
+    # GiST com gist_trgm_ops atende ILIKE '%termo%', o operador % e a
+    # ordenação por distância (<->) com LIMIT. Fora do Postgres o índice é comum.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for nome, tabela, coluna in INDICES:
+        op.create_index(nome, tabela, [coluna], unique=False,
+                        postgresql_using='gist',
+                        postgresql_ops={coluna: 'gist_trgm_ops'})
+
+
+def downgrade() -> None:
+    for nome, tabela, _ in INDICES:
+        op.drop_index(nome, table_name=tabela)
@@ -0,0 +1,110 @@
+"""Compara a escalabilidade das rotas síncronas e assíncronas.
+
+As duas versões da aplicação são exercitadas em processo, via
+httpx.ASGITransport, contra o mesmo banco. As rotas síncronas rodam no
+threadpool do Starlette (40 threads por padrão) e as assíncronas no event
+loop, então a diferença aparece quando a concorrência passa do tamanho do
+threadpool.
+
+Uso:
+    python -m benchmarks.benchmark_async --concorrencia 1 10 50 200
+
+As URLs vêm de DATABASE_URL e ASYNC_DATABASE_URL (veja shared/config.py).
+"""
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.comum import cliente_asgi, disparar
+from contas_a_pagar_e_receber.models import ContaPagarReceber
+from main import criar_app
+from shared import Base, config
+from shared.dependencies import get_async_db, get_async_db_leitura, get_db, \
+    get_db_leitura
+
+
+def preparar_banco(url: str, quantidade: int):
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conexao:
+        conexao.execute(insert(ContaPagarReceber), [
+            {"descricao": f"Conta {i}", "valor": i + 1,
+             "tipo": "PAGAR" if i % 2 else "RECEBER"}
+            for i in range(quantidade)
+        ])
+    return engine
+
+
+def criar_apps(engine, url_async: str):
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_async_engine(url_async)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False,
+                                           expire_on_commit=False)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app_sync = criar_app(database_async=False)
+    app_async = criar_app(database_async=True)
+    for app in (app_sync, app_async):
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_db_leitura] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        app.dependency_overrides[get_async_db_leitura] = override_get_async_db
+    return {"sync": app_sync, "async": app_async}, async_engine
+
+
+async def executar(args):
+    engine = preparar_banco(args.url, args.contas)
+    apps, async_engine = criar_apps(engine, args.url_async)
+
+    async def obter_conta(client, i):
+        return await client.get(f"/contas_a_pagar_e_receber/{i % args.contas + 1}")
+
+    resultados = []
+    try:
+        for concorrencia in args.concorrencia:
+            for modo, app in apps.items():
+                async with cliente_asgi(app) as client:
+                    resultado = await disparar(client, modo, obter_conta,
+                                               args.requisicoes, concorrencia)
+                resultados.append(resultado.como_dict())
+                print(f"{modo:>5} c={concorrencia:<4} "
+                      f"{resultado.requisicoes_por_segundo:>9.1f} req/s  "
+                      f"p95={resultado.percentil(95) * 1000:.2f}ms")
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=config.DATABASE_URL)
+    parser.add_argument("--url-async", default=config.ASYNC_DATABASE_URL)
+    parser.add_argument("--contas", type=int, default=1000)
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, nargs="+",
+                        default=[1, 10, 50, 100, 200])
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    asyncio.run(executar(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
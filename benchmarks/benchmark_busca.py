@@ -0,0 +1,146 @@
+"""Mostra planos de execução e latência das buscas por trigramas de
+fornecedores e de contas (Postgres).
+
+O banco informado é recriado pela cadeia de migrações do Alembic e populado
+com nomes e descrições de 1 a 3 palavras sorteadas de um vocabulário gerado
+(uma delas presente em 5% das linhas). Cada termo (comum, raro, com erro de
+digitação e ausente) é medido na forma atual da busca e na forma anterior
+(ILIKE OR % e desempate por id no ORDER BY), para comparar os planos: a
+atual deve ser uma só varredura KNN do índice GiST.
+
+Uso:
+    python -m benchmarks.benchmark_busca --url postgresql://... --linhas 1000000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, insert, or_, select, text
+
+from benchmarks.benchmark_indices import migrar, plano
+from contas_a_pagar_e_receber.models import ContaPagarReceber, FornecedorCliente
+from contas_a_pagar_e_receber.routers.contas_a_pagar_e_receber_router import \
+    COLUNAS_LISTAGEM
+from contas_a_pagar_e_receber.routers.fornecedor_cliente_router import \
+    COLUNAS_RESPOSTA
+from shared.busca import LIMITE_BUSCA_PADRAO, consulta_busca
+
+TAMANHO_LOTE = 10000
+SILABAS = ("ba", "be", "bi", "bo", "ca", "ce", "co", "da", "de", "di", "fa",
+           "fe", "ga", "go", "la", "le", "li", "lo", "ma", "me", "mi", "mo",
+           "na", "ne", "no", "pa", "pe", "pi", "po", "ra", "re", "ri", "ro",
+           "sa", "se", "si", "so", "ta", "te", "ti", "to", "va", "ve", "vi",
+           "tra", "pro", "cri", "lha", "nho", "que", "gui")
+# Entra em 5% das linhas; as demais palavras do vocabulário, em ~0,01% cada.
+PALAVRA_COMUM = "energia"
+TAMANHO_VOCABULARIO = 20000
+BUSCAS = {
+    "fornecedores": (COLUNAS_RESPOSTA, FornecedorCliente.nome, FornecedorCliente.id),
+    "contas": (COLUNAS_LISTAGEM, ContaPagarReceber.descricao, ContaPagarReceber.id),
+}
+
+
+def vocabulario(aleatorio: random.Random) -> list[str]:
+    palavras = set()
+    while len(palavras) < TAMANHO_VOCABULARIO:
+        palavras.add("".join(aleatorio.choice(SILABAS)
+                             for _ in range(aleatorio.randint(2, 4))))
+    return sorted(palavras)
+
+
+# Termos medidos: comum, raro (uma palavra qualquer do vocabulário), o raro
+# com erro de digitação e um sem nenhuma linha parecida.
+def termos(palavras: list[str]) -> dict:
+    raro = palavras[len(palavras) // 2]
+    return {"comum": PALAVRA_COMUM, "raro": raro,
+            "com_erro": raro[:-1] + "x", "ausente": "zzqwx"}
+
+
+def texto(aleatorio: random.Random, palavras: list[str]) -> str:
+    escolhidas = aleatorio.sample(palavras, aleatorio.randint(1, 3))
+    if aleatorio.random() < 0.05:
+        escolhidas[0] = PALAVRA_COMUM
+    return " ".join(escolhidas)[:30]
+
+
+def popular(engine, palavras: list[str], fornecedores: int, contas: int):
+    aleatorio = random.Random(42)
+    with engine.begin() as conexao:
+        for inicio in range(0, fornecedores, TAMANHO_LOTE):
+            conexao.execute(insert(FornecedorCliente), [
+                {"nome": texto(aleatorio, palavras)}
+                for i in range(inicio, min(inicio + TAMANHO_LOTE, fornecedores))])
+        for inicio in range(0, contas, TAMANHO_LOTE):
+            conexao.execute(insert(ContaPagarReceber), [
+                {"descricao": texto(aleatorio, palavras),
+                 "valor": round(aleatorio.uniform(1, 10000), 2),
+                 "tipo": aleatorio.choice(("PAGAR", "RECEBER")),
+                 "fornecedor_id": aleatorio.randint(1, fornecedores)}
+                for i in range(inicio, min(inicio + TAMANHO_LOTE, contas))])
+        conexao.execute(text("ANALYZE"))
+
+
+# SQL das duas formas da busca, com os valores já no texto.
+def consultas(engine, colunas, coluna, desempate, termo: str, limite: int) -> dict:
+    atual = consulta_busca(select(*colunas), coluna, termo, limite, desempate,
+                           engine.dialect.name)
+    anterior = select(*colunas) \
+        .where(or_(coluna.icontains(termo, autoescape=True), coluna.op("%")(termo))) \
+        .order_by(coluna.op("<->")(termo), desempate).limit(limite)
+    return {forma: str(consulta.compile(engine, compile_kwargs={"literal_binds": True}))
+            for forma, consulta in (("atual", atual), ("anterior", anterior))}
+
+
+def medir(engine, palavras: list[str], limite: int, repeticoes: int) -> dict:
+    resultados = {}
+    with engine.connect() as conexao:
+        for busca, (colunas, coluna, desempate) in BUSCAS.items():
+            for nome_termo, termo in termos(palavras).items():
+                sqls = consultas(engine, colunas, coluna, desempate, termo, limite)
+                for forma, sql in sqls.items():
+                    latencias = []
+                    for _ in range(repeticoes):
+                        inicio = time.perf_counter()
+                        linhas = conexao.exec_driver_sql(sql).all()
+                        latencias.append(time.perf_counter() - inicio)
+                    resultados[f"{busca}_{nome_termo}_{forma}"] = {
+                        "termo": termo,
+                        "linhas": len(linhas),
+                        "mediana_ms": round(statistics.median(latencias) * 1000, 3),
+                        "plano": plano(conexao, sql),
+                    }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True,
+                        help="banco descartável: todas as tabelas são recriadas")
+    parser.add_argument("--linhas", type=int, default=1000000,
+                        help="fornecedores e contas criados, cada")
+    parser.add_argument("--limite", type=int, default=LIMITE_BUSCA_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    migrar(args.url, "head", rebaixar=True)
+    palavras = vocabulario(random.Random(42))
+    popular(engine, palavras, args.linhas, args.linhas)
+    resultados = medir(engine, palavras, args.limite, args.repeticoes)
+    engine.dispose()
+
+    for nome, resultado in resultados.items():
+        print(f"== {nome} ({resultado['termo']!r}, {resultado['linhas']} linhas): "
+              f"{resultado['mediana_ms']}ms")
+        print(f"{resultado['plano']}\n")
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Teste de carga de todas as rotas de contas, de fornecedores e de tarefas.
+
+O banco é populado com os volumes informados e cada cenário (uma rota com
+parâmetros típicos) é disparado em processo, via httpx.ASGITransport, em cada
+nível de concorrência (só /metricas fica de fora). As tarefas agendadas pelos
+cenários não são executadas: sem o lifespan da aplicação não há workers da
+fila, e o que se mede é o agendamento. O resultado traz p50/p95/p99 e
+requisições por segundo por cenário e pode ser gravado em JSON com o commit
+atual, para comparar execuções de commits diferentes com --comparar.
+
+Uso:
+    python -m benchmarks.benchmark_carga --contas 10000 --concorrencia 1 10 50 \\
+        --saida atual.json --comparar base.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+from datetime import datetime, timezone
+from itertools import count
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from benchmarks.benchmark_async import criar_apps
+from benchmarks.comum import cliente_asgi, disparar
+from contas_a_pagar_e_receber.models import ContaPagarReceber, FornecedorCliente
+from contas_a_pagar_e_receber.tarefas import RELATORIO_CONCILIACAO
+from shared import Base
+from shared.tarefas import FilaTarefas
+
+TAMANHO_LOTE_INSERCAO = 10000
+DESCRICAO_DESCARTAVEL = "Descartavel"
+
+
+class Massa:
+    # Ids disponíveis para os cenários. As linhas descartáveis existem só
+    # para as remoções, que consomem um id por requisição.
+    def __init__(self, engine, fornecedores: int, contas: int, descartaveis: int,
+                 tamanho_lote: int):
+        self.tamanho_lote = tamanho_lote
+        aleatorio = random.Random(42)
+        with engine.begin() as conexao:
+            conexao.execute(insert(FornecedorCliente), [
+                {"nome": f"Fornecedor {i}"} for i in range(fornecedores)] + [
+                {"nome": DESCRICAO_DESCARTAVEL} for _ in range(descartaveis)])
+            self.fornecedores = _ids(conexao, FornecedorCliente,
+                                     FornecedorCliente.nome != DESCRICAO_DESCARTAVEL)
+            self.fornecedores_descartaveis = iter(_ids(
+                conexao, FornecedorCliente,
+                FornecedorCliente.nome == DESCRICAO_DESCARTAVEL))
+
+            linhas = [{"descricao": f"Conta {i}",
+                       "valor": round(aleatorio.uniform(1, 10000), 2),
+                       "tipo": aleatorio.choice(("PAGAR", "RECEBER")),
+                       "fornecedor_id": aleatorio.choice(self.fornecedores)}
+                      for i in range(contas)]
+            linhas += [{"descricao": DESCRICAO_DESCARTAVEL, "valor": 1,
+                        "tipo": "PAGAR", "fornecedor_id": None}
+                       for _ in range(descartaveis * (1 + tamanho_lote))]
+            for inicio in range(0, len(linhas), TAMANHO_LOTE_INSERCAO):
+                conexao.execute(insert(ContaPagarReceber),
+                                linhas[inicio:inicio + TAMANHO_LOTE_INSERCAO])
+            self.contas = _ids(conexao, ContaPagarReceber,
+                               ContaPagarReceber.descricao != DESCRICAO_DESCARTAVEL)
+            self.contas_descartaveis = iter(_ids(
+                conexao, ContaPagarReceber,
+                ContaPagarReceber.descricao == DESCRICAO_DESCARTAVEL))
+        # Tarefa consultada pelo cenário de GET /tarefas/{id}.
+        with Session(engine) as db:
+            self.tarefa = FilaTarefas(lambda: Session(engine)).enfileirar(
+                db, RELATORIO_CONCILIACAO, {}).id
+
+    def conta(self, i: int) -> int:
+        return self.contas[i % len(self.contas)]
+
+    def fornecedor(self, i: int) -> int:
+        return self.fornecedores[i % len(self.fornecedores)]
+
+    def lote_de_contas(self, i: int) -> list[int]:
+        return [self.conta(i * self.tamanho_lote + j)
+                for j in range(self.tamanho_lote)]
+
+
+def _ids(conexao, modelo, condicao) -> list[int]:
+    return list(conexao.scalars(select(modelo.id).where(condicao).order_by(modelo.id)))
+
+
+def _conta(i: int, fornecedor_id: int) -> dict:
+    return {"descricao": f"Carga {i:06d}", "valor": i % 1000 + 1.5,
+            "tipo": "PAGAR" if i % 2 else "RECEBER", "fornecedor_id": fornecedor_id}
+
+
+def criar_cenarios(massa: Massa) -> dict:
+    contas = "/contas_a_pagar_e_receber"
+    fornecedores = "/fornecedor-cliente"
+    sequencia = count()
+
+    return {
+        "contas_listar": lambda c, i: c.get(f"{contas}/"),
+        "contas_listar_filtro": lambda c, i: c.get(
+            f"{contas}/", params={"tipo": "PAGAR", "valor_minimo": 100}),
+        "contas_listar_expandido": lambda c, i: c.get(
+            f"{contas}/", params={"expand": "fornecedor"}),
+        "contas_exportar": lambda c, i: c.get(f"{contas}/exportar"),
+        "contas_resumo": lambda c, i: c.get(
+            f"{contas}/resumo", params={"agrupar_por": ["tipo", "fornecedor"]}),
+        "contas_saldo": lambda c, i: c.get(f"{contas}/saldo"),
+        "contas_saldo_fornecedores": lambda c, i: c.get(f"{contas}/saldo/fornecedores"),
+        "contas_busca": lambda c, i: c.get(
+            f"{contas}/busca", params={"q": f"Conta {i % 100}"}),
+        "contas_obter": lambda c, i: c.get(f"{contas}/{massa.conta(i)}"),
+        "contas_criar": lambda c, i: c.post(
+            f"{contas}/", json=_conta(i, massa.fornecedor(i))),
+        "contas_atualizar": lambda c, i: c.put(
+            f"{contas}/{massa.conta(i)}", json=_conta(i, massa.fornecedor(i))),
+        "contas_remover": lambda c, i: c.delete(
+            f"{contas}/{next(massa.contas_descartaveis)}"),
+        "contas_criar_lote": lambda c, i: c.post(f"{contas}/lote", json=[
+            _conta(j, massa.fornecedor(j)) for j in range(massa.tamanho_lote)]),
+        "contas_atualizar_lote": lambda c, i: c.put(f"{contas}/lote", json=[
+            {**_conta(id_conta, massa.fornecedor(i)), "id": id_conta}
+            for id_conta in massa.lote_de_contas(i)]),
+        "contas_remover_lote": lambda c, i: c.request(
+            "DELETE", f"{contas}/lote", json=[
+                next(massa.contas_descartaveis) for _ in range(massa.tamanho_lote)]),
+        "contas_recorrentes": lambda c, i: c.post(
+            f"{contas}/recorrentes", json={"mes_origem": "2024-01", "mes_destino": "2024-02"}),
+        "contas_conciliacao": lambda c, i: c.post(f"{contas}/conciliacao"),
+        "tarefas_obter": lambda c, i: c.get(f"/tarefas/{massa.tarefa}"),
+        "fornecedores_listar": lambda c, i: c.get(fornecedores),
+        "fornecedores_exportar": lambda c, i: c.get(f"{fornecedores}/exportar"),
+        "fornecedores_busca": lambda c, i: c.get(
+            f"{fornecedores}/busca", params={"q": f"Fornecedor {i % 10}"}),
+        "fornecedores_obter": lambda c, i: c.get(
+            f"{fornecedores}/{massa.fornecedor(i)}"),
+        "fornecedores_lote": lambda c, i: c.get(f"{fornecedores}/lote", params={
+            "ids": ",".join(str(massa.fornecedor(i + j)) for j in range(20))}),
+        "fornecedores_criar": lambda c, i: c.post(
+            fornecedores, json={"nome": f"Carga {next(sequencia)}"}),
+        "fornecedores_atualizar": lambda c, i: c.put(
+            f"{fornecedores}/{massa.fornecedor(i)}", json={"nome": f"Carga {i}"}),
+        "fornecedores_remover": lambda c, i: c.delete(
+            f"{fornecedores}/{next(massa.fornecedores_descartaveis)}"),
+    }
+
+
+def cenario_misto(cenarios: dict):
+    # Intercala as leituras e escritas que não consomem ids descartáveis,
+    # aproximando o tráfego concorrente de rotas diferentes.
+    mistura = [requisicao for nome, requisicao in cenarios.items()
+               if "remover" not in nome]
+    return lambda c, i: mistura[i % len(mistura)](c, i)
+
+
+def metadados(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "parametros": {chave: valor for chave, valor in vars(args).items()
+                       if chave not in ("url", "url_async", "saida", "comparar")},
+    }
+
+
+def comparar(resultados: list[dict], caminho: str, tolerancia: float) -> list[str]:
+    with open(caminho) as arquivo:
+        base = {(r["modo"], r["nome"], r["concorrencia"]): r
+                for r in json.load(arquivo)["resultados"]}
+
+    regressoes = []
+    print(f"\nComparação com {caminho} (tolerância de {tolerancia:.0f}% no p95 "
+          "e nenhum erro novo):")
+    for atual in resultados:
+        chave = (atual["modo"], atual["nome"], atual["concorrencia"])
+        anterior = base.get(chave)
+        if anterior is None or not anterior["p95_ms"] or not anterior["rps"]:
+            continue
+        variacao_p95 = (atual["p95_ms"] / anterior["p95_ms"] - 1) * 100
+        variacao_rps = (atual["rps"] / anterior["rps"] - 1) * 100
+        regrediu = variacao_p95 > tolerancia or atual["erros"] > anterior["erros"]
+        if regrediu:
+            regressoes.append("{} {} c={}".format(*chave))
+        print(f"{'REGRESSÃO' if regrediu else 'ok':>9}  {chave[0]:>5} {chave[1]:<26} "
+              f"c={chave[2]:<4} p95 {variacao_p95:+7.1f}%  req/s {variacao_rps:+7.1f}%")
+    return regressoes
+
+
+async def executar(args) -> list[dict]:
+    niveis = len(args.concorrencia) * len(args.modos)
+    engine = create_engine(args.url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    massa = Massa(engine, args.fornecedores, args.contas,
+                  args.requisicoes * niveis, args.tamanho_lote)
+    apps, async_engine = criar_apps(engine, args.url_async)
+
+    cenarios = criar_cenarios(massa)
+    cenarios["misto"] = cenario_misto(cenarios)
+    if args.cenarios:
+        cenarios = {nome: cenarios[nome] for nome in args.cenarios}
+
+    resultados = []
+    try:
+        for modo in args.modos:
+            async with cliente_asgi(apps[modo]) as client:
+                for nome, requisicao in cenarios.items():
+                    for concorrencia in args.concorrencia:
+                        resultado = await disparar(client, nome, requisicao,
+                                                   args.requisicoes, concorrencia)
+                        resultados.append({"modo": modo, **resultado.como_dict()})
+                        print(f"{modo:>5} {nome:<26} c={concorrencia:<4} "
+                              f"{resultado.requisicoes_por_segundo:>9.1f} req/s  "
+                              f"p50={resultado.percentil(50) * 1000:7.2f}ms  "
+                              f"p95={resultado.percentil(95) * 1000:7.2f}ms  "
+                              f"p99={resultado.percentil(99) * 1000:7.2f}ms"
+                              + (f"  erros={resultado.erros}" if resultado.erros else ""))
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="sqlite:///./benchmark_carga.db",
+                        help="banco descartável: as tabelas são recriadas")
+    parser.add_argument("--url-async", default="sqlite+aiosqlite:///./benchmark_carga.db",
+                        help="mesmo banco de --url, usado no modo async")
+    parser.add_argument("--modos", nargs="+", choices=["sync", "async"],
+                        default=["sync"])
+    parser.add_argument("--fornecedores", type=int, default=100)
+    parser.add_argument("--contas", type=int, default=10000)
+    parser.add_argument("--requisicoes", type=int, default=500,
+                        help="requisições por cenário e nível de concorrência")
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--tamanho-lote", type=int, default=20,
+                        help="itens por requisição nas rotas /lote")
+    parser.add_argument("--cenarios", nargs="+",
+                        help="executa apenas os cenários informados")
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=10.0,
+                        help="aumento máximo do p95, em %%, antes de acusar regressão")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(executar(args))
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump({"metadados": metadados(args), "resultados": resultados},
+                      arquivo, indent=2)
+    if args.comparar and comparar(resultados, args.comparar, args.tolerancia):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Mede o custo de CPU e os bytes economizados pela compressão das respostas
+em diferentes tamanhos de payload.
+
+Os payloads imitam a listagem de contas (JSON gerado pelo orjson, como no
+caminho rápido das rotas). Cada codificação disponível (gzip sempre; br e
+zstd com o extra "compressao") é medida nos níveis informados, além do
+nível padrão de shared/compressao.py.
+
+Uso:
+    python -m benchmarks.benchmark_compressao --linhas 10 100 1000 10000
+"""
+import argparse
+import json
+import statistics
+import time
+
+import orjson
+
+from shared.compressao import COMPRESSORES, NIVEIS, comprimir
+
+NIVEIS_EXTRAS = {"gzip": [1, 9], "br": [1, 6], "zstd": [1, 9]}
+
+
+def payload(linhas: int) -> bytes:
+    return orjson.dumps([
+        {"id": i + 1, "descricao": f"Conta {i} de fornecedor", "valor": round(i * 1.37, 2),
+         "tipo": "PAGAR" if i % 2 else "RECEBER", "data_vencimento": "2024-05-10"}
+        for i in range(linhas)
+    ])
+
+
+def medir(codificacao: str, nivel: int, dados: bytes, repeticoes: int) -> tuple[float, int]:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        comprimido = comprimir(codificacao, dados, nivel)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), len(comprimido)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    for linhas in args.linhas:
+        dados = payload(linhas)
+        print(f"{linhas} linhas ({len(dados)} bytes)")
+        for codificacao in COMPRESSORES:
+            for nivel in sorted({NIVEIS[codificacao], *NIVEIS_EXTRAS[codificacao]}):
+                duracao, tamanho = medir(codificacao, nivel, dados, args.repeticoes)
+                resultados.append({
+                    "linhas": linhas, "bytes": len(dados), "codificacao": codificacao,
+                    "nivel": nivel, "comprimido": tamanho,
+                    "economia": round(1 - tamanho / len(dados), 4),
+                    "cpu_ms": round(duracao * 1000, 4),
+                    "mb_s": round(len(dados) / duracao / 1e6, 1),
+                })
+                padrao = "*" if nivel == NIVEIS[codificacao] else " "
+                print(f"  {codificacao:>4} {nivel:>2}{padrao} {tamanho:>9} bytes  "
+                      f"economia={1 - tamanho / len(dados):6.1%}  "
+                      f"cpu={duracao * 1000:8.3f}ms  ({len(dados) / duracao / 1e6:7.1f} MB/s)")
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
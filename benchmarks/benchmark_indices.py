@@ -0,0 +1,136 @@
+"""Mostra planos de execução e latência das consultas de contas antes e
+depois dos índices da migração c1a7e9f2b345.
+
+O banco informado é recriado pela cadeia de migrações do Alembic: primeiro
+até a revisão anterior aos índices, depois até head, com os mesmos dados.
+
+Uso:
+    python -m benchmarks.benchmark_indices --url postgresql://... --contas 1000000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, func, insert, select, text
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber, FornecedorCliente
+
+REVISAO_SEM_INDICES = "8d4f0a3e6c12"
+# Só as colunas que já existem na revisão sem índices.
+COLUNAS = (ContaPagarReceber.id, ContaPagarReceber.descricao,
+           ContaPagarReceber.valor, ContaPagarReceber.tipo,
+           ContaPagarReceber.fornecedor_id)
+TAMANHO_LOTE = 10000
+
+
+def migrar(url: str, revisao: str, rebaixar: bool = False):
+    configuracao = Config("alembic.ini")
+    configuracao.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    if rebaixar:
+        command.downgrade(configuracao, "base")
+    command.upgrade(configuracao, revisao)
+
+
+def popular(engine, fornecedores: int, contas: int):
+    aleatorio = random.Random(42)
+    with engine.begin() as conexao:
+        conexao.execute(insert(FornecedorCliente), [
+            {"nome": f"Fornecedor {i}"} for i in range(fornecedores)])
+        for inicio in range(0, contas, TAMANHO_LOTE):
+            conexao.execute(insert(ContaPagarReceber), [
+                {"descricao": f"Conta {i}",
+                 "valor": round(aleatorio.uniform(1, 10000), 2),
+                 "tipo": aleatorio.choice(("PAGAR", "RECEBER")),
+                 "fornecedor_id": aleatorio.randint(1, fornecedores)}
+                for i in range(inicio, min(inicio + TAMANHO_LOTE, contas))
+            ])
+        conexao.execute(text("ANALYZE"))
+
+
+def consultas(fornecedor_id: int) -> dict:
+    return {
+        "lista_por_fornecedor": select(*COLUNAS)
+        .where(ContaPagarReceber.fornecedor_id == fornecedor_id)
+        .order_by(ContaPagarReceber.id).limit(101),
+        "lista_por_tipo_e_fornecedor": select(*COLUNAS)
+        .where(ContaPagarReceber.tipo == "PAGAR",
+               ContaPagarReceber.fornecedor_id == fornecedor_id)
+        .order_by(ContaPagarReceber.id).limit(101),
+        "resumo_por_tipo": select(ContaPagarReceber.tipo, func.count(),
+                                  func.sum(ContaPagarReceber.valor))
+        .group_by(ContaPagarReceber.tipo),
+        "resumo_por_tipo_de_um_fornecedor": select(
+            ContaPagarReceber.tipo, func.count(), func.sum(ContaPagarReceber.valor))
+        .where(ContaPagarReceber.fornecedor_id == fornecedor_id)
+        .group_by(ContaPagarReceber.tipo),
+        # É a consulta que o banco faz para checar a FK ao remover um fornecedor.
+        "checagem_fk_remocao_fornecedor": select(ContaPagarReceber.id)
+        .where(ContaPagarReceber.fornecedor_id == fornecedor_id).limit(1),
+    }
+
+
+def plano(conexao, sql: str) -> str:
+    if conexao.dialect.name == "postgresql":
+        linhas = conexao.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")
+        return "\n".join(linha[0] for linha in linhas)
+    linhas = conexao.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+    return "\n".join(str(linha[-1]) for linha in linhas)
+
+
+def medir(engine, fornecedor_id: int, repeticoes: int) -> dict:
+    resultados = {}
+    with engine.connect() as conexao:
+        for nome, consulta in consultas(fornecedor_id).items():
+            sql = str(consulta.compile(engine,
+                                       compile_kwargs={"literal_binds": True}))
+            latencias = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                conexao.exec_driver_sql(sql).all()
+                latencias.append(time.perf_counter() - inicio)
+            resultados[nome] = {
+                "mediana_ms": round(statistics.median(latencias) * 1000, 3),
+                "plano": plano(conexao, sql),
+            }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True,
+                        help="banco descartável: todas as tabelas são recriadas")
+    parser.add_argument("--fornecedores", type=int, default=1000)
+    parser.add_argument("--contas", type=int, default=200000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    migrar(args.url, REVISAO_SEM_INDICES, rebaixar=True)
+    popular(engine, args.fornecedores, args.contas)
+    fornecedor_id = args.fornecedores // 2
+
+    antes = medir(engine, fornecedor_id, args.repeticoes)
+    migrar(args.url, "head")
+    with engine.begin() as conexao:
+        conexao.execute(text("ANALYZE"))
+    depois = medir(engine, fornecedor_id, args.repeticoes)
+    engine.dispose()
+
+    for nome in antes:
+        print(f"== {nome}: {antes[nome]['mediana_ms']}ms -> "
+              f"{depois[nome]['mediana_ms']}ms")
+        print(f"-- antes\n{antes[nome]['plano']}")
+        print(f"-- depois\n{depois[nome]['plano']}\n")
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump({"antes": antes, "depois": depois}, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Mede o tempo de inicialização da aplicação: importação de main e tempo
+até a primeira resposta de uma rota que consulta o banco.
+
+Cada repetição sobe um processo novo do uvicorn (como uma réplica recém
+criada pelo autoscaling) e consulta a listagem de contas até receber a
+primeira resposta; o tempo inclui a importação, o startup com a criação e o
+aquecimento dos pools e a própria primeira consulta. A importação também é
+medida à parte, em um processo que só faz ``import main``.
+
+Uso:
+    python -m benchmarks.benchmark_inicializacao --aquecimento 0 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import create_engine
+
+# noinspection PyUnresolvedReferences
+from contas_a_pagar_e_receber.models import ContaPagarReceber
+from shared import Base
+# noinspection PyUnresolvedReferences
+from shared.versao_tabela import VersaoTabela
+
+MEDIR_IMPORTACAO = ("import time; inicio = time.perf_counter(); import main; "
+                    "print(time.perf_counter() - inicio)")
+
+
+def ambiente(url: str, aquecimento: int) -> dict:
+    return {**os.environ, "DATABASE_URL": url,
+            "DB_POOL_AQUECIMENTO": str(aquecimento)}
+
+
+def medir_importacao(url: str) -> float:
+    saida = subprocess.run([sys.executable, "-c", MEDIR_IMPORTACAO],
+                           env=ambiente(url, 0), capture_output=True, text=True,
+                           check=True)
+    return float(saida.stdout)
+
+
+def medir_primeira_resposta(url: str, aquecimento: int, porta: int,
+                            limite: float = 30.0) -> float:
+    endereco = f"http://127.0.0.1:{porta}/contas_a_pagar_e_receber/?limite=1"
+    inicio = time.perf_counter()
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta),
+         "--log-level", "warning"],
+        env=ambiente(url, aquecimento))
+    try:
+        while time.perf_counter() - inicio < limite:
+            try:
+                response = httpx.get(endereco)
+            except httpx.TransportError:
+                time.sleep(0.005)
+                continue
+            response.raise_for_status()
+            return time.perf_counter() - inicio
+        raise TimeoutError(f"sem resposta em {limite}s")
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="sqlite:///./benchmark_inicializacao.db",
+                        help="banco descartável: as tabelas são recriadas")
+    parser.add_argument("--aquecimento", type=int, nargs="+", default=[0, 5],
+                        help="valores de DB_POOL_AQUECIMENTO a comparar")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    importacao = statistics.median(medir_importacao(args.url)
+                                   for _ in range(args.repeticoes))
+    print(f"importação de main: {importacao * 1000:.1f}ms")
+    resultados = {"importacao_ms": round(importacao * 1000, 2), "startup": []}
+    for aquecimento in args.aquecimento:
+        tempos = [medir_primeira_resposta(args.url, aquecimento, args.porta)
+                  for _ in range(args.repeticoes)]
+        mediana = statistics.median(tempos)
+        resultados["startup"].append({
+            "aquecimento": aquecimento,
+            "primeira_resposta_ms": round(mediana * 1000, 2),
+            "minimo_ms": round(min(tempos) * 1000, 2),
+        })
+        print(f"DB_POOL_AQUECIMENTO={aquecimento}: primeira resposta em "
+              f"{mediana * 1000:.1f}ms (mínimo {min(tempos) * 1000:.1f}ms)")
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
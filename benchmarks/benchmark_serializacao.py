@@ -0,0 +1,97 @@
+"""Compara o caminho de leitura com Pydantic (entidades ORM validadas pelo
+response_model) com o caminho rápido (colunas + orjson) das listagens.
+
+Cada medição inclui a consulta ao banco e a geração do corpo da resposta,
+exatamente como as rotas fazem.
+
+Uso:
+    python -m benchmarks.benchmark_serializacao --tamanhos 1000 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber
+from contas_a_pagar_e_receber.routers.contas_a_pagar_e_receber_router import \
+    COLUNAS_LISTAGEM, ContasPagarReceberResponse
+from shared import Base
+from shared.respostas import resposta_json_rapida
+
+CAMPO_RESPOSTA = create_response_field(
+    name="resposta", type_=list[ContasPagarReceberResponse])
+
+
+def caminho_pydantic(db: Session, quantidade: int) -> bytes:
+    contas = db.scalars(select(ContaPagarReceber).limit(quantidade)).all()
+    conteudo = asyncio.run(serialize_response(field=CAMPO_RESPOSTA,
+                                              response_content=contas))
+    return JSONResponse(conteudo).body
+
+
+def caminho_rapido(db: Session, quantidade: int) -> bytes:
+    linhas = db.execute(select(*COLUNAS_LISTAGEM).limit(quantidade))
+    return resposta_json_rapida(linhas, Response()).body
+
+
+def medir(engine, funcao, quantidade: int, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        with Session(engine) as db:
+            inicio = time.perf_counter()
+            funcao(db, quantidade)
+            tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="sqlite:///./benchmark_serializacao.db",
+                        help="banco descartável: as tabelas são recriadas")
+    parser.add_argument("--tamanhos", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conexao:
+        conexao.execute(insert(ContaPagarReceber), [
+            {"descricao": f"Conta {i}", "valor": i + 0.5,
+             "tipo": "PAGAR" if i % 2 else "RECEBER"}
+            for i in range(max(args.tamanhos))
+        ])
+
+    with Session(engine) as db:
+        assert json.loads(caminho_pydantic(db, 10)) == \
+            json.loads(caminho_rapido(db, 10))
+
+    resultados = []
+    for quantidade in args.tamanhos:
+        pydantic = medir(engine, caminho_pydantic, quantidade, args.repeticoes)
+        rapido = medir(engine, caminho_rapido, quantidade, args.repeticoes)
+        resultados.append({"linhas": quantidade,
+                           "pydantic_ms": round(pydantic * 1000, 2),
+                           "rapido_ms": round(rapido * 1000, 2),
+                           "ganho": round(pydantic / rapido, 2)})
+        print(f"{quantidade:>7} linhas  pydantic={pydantic * 1000:9.2f}ms  "
+              f"rapido={rapido * 1000:9.2f}ms  ({pydantic / rapido:.1f}x)")
+    engine.dispose()
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Mede quanto o trigger de versao_tabela limita as escritas concorrentes
+em contas_a_pagar_e_receber (Postgres).
+
+Cada escritor faz UPDATE de uma conta própria e commit, em laço. A rodada é
+repetida com e sem o trigger de versão; --trabalho-ms simula trabalho na
+transação entre a escrita e o commit, período em que a linha de
+versao_tabela fica travada.
+
+Uso:
+    python -m benchmarks.benchmark_versao_tabela --url postgresql://... --escritores 1 8 32
+"""
+import argparse
+import json
+import threading
+import time
+
+from sqlalchemy import create_engine, insert, text
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber, FornecedorCliente
+from shared import Base
+from shared.versao_tabela import TRIGGER_POSTGRESQL
+
+TABELA = ContaPagarReceber.__tablename__
+
+
+def preparar(engine, contas: int):
+    with engine.begin() as conexao:
+        conexao.execute(text("DROP SCHEMA public CASCADE"))
+        conexao.execute(text("CREATE SCHEMA public"))
+    Base.metadata.create_all(bind=engine)
+    # Um fornecedor por conta: a disputa medida é só a de versao_tabela, não
+    # a das linhas de saldo_fornecedor.
+    with engine.begin() as conexao:
+        conexao.execute(insert(FornecedorCliente), [
+            {"nome": f"Fornecedor {i}"} for i in range(contas)])
+        conexao.execute(insert(ContaPagarReceber), [
+            {"descricao": f"Conta {i}", "valor": 1, "tipo": "PAGAR",
+             "fornecedor_id": i + 1} for i in range(contas)])
+
+
+def medir(engine, escritores: int, escritas: int, trabalho: float) -> float:
+    def escrever(indice: int):
+        with engine.connect() as conexao:
+            for _ in range(escritas):
+                conexao.execute(text(
+                    f"UPDATE {TABELA} SET valor = valor + 1 WHERE id = :id"),
+                    {"id": indice + 1})
+                if trabalho:
+                    conexao.execute(text("SELECT pg_sleep(:segundos)"),
+                                    {"segundos": trabalho})
+                conexao.commit()
+
+    threads = [threading.Thread(target=escrever, args=(indice,))
+               for indice in range(escritores)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return escritores * escritas / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True,
+                        help="banco descartável: o esquema public é recriado")
+    parser.add_argument("--escritores", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--escritas", type=int, default=300,
+                        help="commits por escritor em cada rodada")
+    parser.add_argument("--trabalho-ms", type=float, nargs="+", default=[0, 2])
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url, pool_size=max(args.escritores))
+    preparar(engine, max(args.escritores))
+    resultados = []
+    for trabalho_ms in args.trabalho_ms:
+        for escritores in args.escritores:
+            com_trigger = medir(engine, escritores, args.escritas, trabalho_ms / 1000)
+            with engine.begin() as conexao:
+                conexao.execute(text(f"DROP TRIGGER {TABELA}_versao ON {TABELA}"))
+            sem_trigger = medir(engine, escritores, args.escritas, trabalho_ms / 1000)
+            with engine.begin() as conexao:
+                conexao.execute(text(TRIGGER_POSTGRESQL.format(tabela=TABELA)))
+            resultados.append({"trabalho_ms": trabalho_ms, "escritores": escritores,
+                               "commits_s_com_versao": round(com_trigger),
+                               "commits_s_sem_versao": round(sem_trigger)})
+            print(f"trabalho={trabalho_ms}ms escritores={escritores:>3}  "
+                  f"com versao_tabela={com_trigger:8.0f} commits/s  "
+                  f"sem={sem_trigger:8.0f} commits/s")
+    engine.dispose()
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+
+@dataclass
+class ResultadoCarga:
+    nome: str
+    concorrencia: int
+    requisicoes: int
+    duracao: float
+    latencias: list[float] = field(default_factory=list)
+    erros: int = 0
+
+    @property
+    def requisicoes_por_segundo(self) -> float:
+        return self.requisicoes / self.duracao if self.duracao else 0.0
+
+    def percentil(self, p: float) -> float:
+        if not self.latencias:
+            return 0.0
+        ordenadas = sorted(self.latencias)
+        indice = min(len(ordenadas) - 1, round(p / 100 * (len(ordenadas) - 1)))
+        return ordenadas[indice]
+
+    def como_dict(self) -> dict:
+        return {
+            "nome": self.nome,
+            "concorrencia": self.concorrencia,
+            "requisicoes": self.requisicoes,
+            "erros": self.erros,
+            "duracao_s": round(self.duracao, 4),
+            "rps": round(self.requisicoes_por_segundo, 2),
+            "media_ms": round(statistics.fmean(self.latencias) * 1000, 3)
+            if self.latencias else 0.0,
+            "p50_ms": round(self.percentil(50) * 1000, 3),
+            "p95_ms": round(self.percentil(95) * 1000, 3),
+            "p99_ms": round(self.percentil(99) * 1000, 3),
+        }
+
+
+async def disparar(client: httpx.AsyncClient, nome: str, requisicao,
+                   total: int, concorrencia: int) -> ResultadoCarga:
+    # requisicao(client, i) deve devolver a corrotina da i-ésima chamada.
+    semaforo = asyncio.Semaphore(concorrencia)
+    resultado = ResultadoCarga(nome, concorrencia, total, 0.0)
+
+    async def uma(i: int):
+        async with semaforo:
+            inicio = time.perf_counter()
+            response = await requisicao(client, i)
+            resultado.latencias.append(time.perf_counter() - inicio)
+            if response.status_code >= 400:
+                resultado.erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma(i) for i in range(total)))
+    resultado.duracao = time.perf_counter() - inicio
+    return resultado
+
+
+def cliente_asgi(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                             base_url="http://benchmark")
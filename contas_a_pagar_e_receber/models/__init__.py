@@ -1,2 +1,3 @@
-from .conta_a_pagar_receber_model import ContaPagarReceber
+from .conta_a_pagar_receber_model import ContaPagarReceber, ContaPagarReceberArquivada
 from .fornecedor_cliente_model import FornecedorCliente
+from .saldo_fornecedor_model import SaldoFornecedor, SEM_FORNECEDOR, TOTAL_GERAL
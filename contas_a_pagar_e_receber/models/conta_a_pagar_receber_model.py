@@ -1,7 +1,10 @@
-from sqlalchemy import Integer, String, Numeric, Column, ForeignKey
+from sqlalchemy import Integer, String, Numeric, Column, Date, ForeignKey, Index, \
+    func
 from sqlalchemy.orm import relationship
 
 from shared import Base
+from shared.busca import indexar_para_busca
+from shared.versao_tabela import versionar_tabela
 
 
 class ContaPagarReceber(Base):
@@ -12,5 +15,39 @@ class ContaPagarReceber(Base):
     valor = Column(Numeric)
     tipo = Column(String(30))
 
-    fornecedor_id = Column(Integer, ForeignKey("fornecedor_cliente.id"))
+    fornecedor_id = Column(Integer, ForeignKey("fornecedor_cliente.id"), index=True)
     fornecedor = relationship("FornecedorCliente")
+
+    # Chave do particionamento mensal no Postgres (ver a migração
+    # b9d3f7a2c518): lá a chave primária é (id, data_vencimento) e o id
+    # continua sendo a identidade dos objetos no ORM. Isso tem custo: só a
+    # sequência garante que o id seja único, e as rotas por id (GET, PUT e
+    # DELETE /{id}), que não conhecem a data, consultam o índice da chave
+    # primária de cada partição em vez de um só.
+    data_vencimento = Column(Date, nullable=False,
+                             server_default=func.current_date(), index=True)
+
+    __table_args__ = (
+        # Atende filtros por tipo e o GROUP BY tipo, fornecedor_id do resumo;
+        # no Postgres o INCLUDE permite somar valor com index-only scan.
+        Index("ix_contas_a_pagar_e_receber_tipo_fornecedor_id",
+              "tipo", "fornecedor_id", postgresql_include=["valor"]),
+    )
+
+
+versionar_tabela(ContaPagarReceber.__table__)
+indexar_para_busca(ContaPagarReceber.descricao)
+
+
+# Destino das contas arquivadas (contas_a_pagar_e_receber.particoes). Fica
+# fora das rotas, dos saldos e do versionamento; no Postgres também é
+# particionada por mês e recebe as partições de contas já prontas.
+class ContaPagarReceberArquivada(Base):
+    __tablename__ = "contas_a_pagar_e_receber_arquivo"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    descricao = Column(String(30))
+    valor = Column(Numeric)
+    tipo = Column(String(30))
+    fornecedor_id = Column(Integer)
+    data_vencimento = Column(Date, nullable=False)
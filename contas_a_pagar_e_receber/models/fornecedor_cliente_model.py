@@ -1,6 +1,8 @@
 from sqlalchemy import Integer, String, Column
 
 from shared import Base
+from shared.busca import indexar_para_busca
+from shared.versao_tabela import versionar_tabela
 
 
 class FornecedorCliente(Base):
@@ -8,3 +10,7 @@ class FornecedorCliente(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     nome = Column(String(255))
+
+
+versionar_tabela(FornecedorCliente.__table__)
+indexar_para_busca(FornecedorCliente.nome)
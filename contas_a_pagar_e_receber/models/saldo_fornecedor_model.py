@@ -0,0 +1,101 @@
+from sqlalchemy import Column, DDL, Integer, Numeric, event
+
+from shared import Base
+from .conta_a_pagar_receber_model import ContaPagarReceber
+
+# Contas sem fornecedor são consolidadas nesta chave (a chave primária não
+# aceita NULL).
+SEM_FORNECEDOR = 0
+# Linha com o total de todas as contas, lida pelo saldo geral.
+TOTAL_GERAL = -1
+
+
+# Totais por fornecedor mantidos por trigger, na mesma transação de cada
+# INSERT/UPDATE/DELETE em contas_a_pagar_e_receber (inclusive as rotas em lote
+# e as assíncronas), mais a linha TOTAL_GERAL: o saldo geral lê só ela, sem
+# somar os fornecedores. Cada trigger atualiza as linhas dos fornecedores e
+# por último a do total, então toda transação trava o total depois dos
+# fornecedores e a linha mais disputada não inverte a ordem dos locks. As
+# escritas em contas já fazem commit uma de cada vez por causa de
+# versao_tabela, então o total não cria uma nova fila.
+# contas_a_pagar_e_receber.saldo reconstrói a tabela.
+class SaldoFornecedor(Base):
+    __tablename__ = "saldo_fornecedor"
+
+    fornecedor_id = Column(Integer, primary_key=True, autoincrement=False)
+    quantidade = Column(Integer, nullable=False)
+    total_pagar = Column(Numeric, nullable=False)
+    total_receber = Column(Numeric, nullable=False)
+
+
+# Soma (sinal 1) ou subtrai (sinal -1) a contribuição de uma linha de contas,
+# referenciada como NEW ou OLD dentro do trigger, no fornecedor dela ou, com
+# total=True, na linha do total geral.
+def _aplicar_linha(linha: str, sinal: int, total: bool = False) -> str:
+    chave = TOTAL_GERAL if total else f"COALESCE({linha}.fornecedor_id, {SEM_FORNECEDOR})"
+    return f"""
+    INSERT INTO saldo_fornecedor (fornecedor_id, quantidade, total_pagar, total_receber)
+    VALUES ({chave}, {sinal},
+            CASE WHEN {linha}.tipo = 'PAGAR' THEN {sinal} * COALESCE({linha}.valor, 0) ELSE 0 END,
+            CASE WHEN {linha}.tipo = 'RECEBER' THEN {sinal} * COALESCE({linha}.valor, 0) ELSE 0 END)
+    ON CONFLICT (fornecedor_id) DO UPDATE
+        SET quantidade = saldo_fornecedor.quantidade + excluded.quantidade,
+            total_pagar = saldo_fornecedor.total_pagar + excluded.total_pagar,
+            total_receber = saldo_fornecedor.total_receber + excluded.total_receber;
+"""
+
+
+FUNCAO_POSTGRESQL = DDL(f"""
+CREATE OR REPLACE FUNCTION atualizar_saldo_fornecedor() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        {_aplicar_linha("OLD", -1)}
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        {_aplicar_linha("NEW", 1)}
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        {_aplicar_linha("OLD", -1, total=True)}
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        {_aplicar_linha("NEW", 1, total=True)}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+TRIGGER_POSTGRESQL = DDL("""
+CREATE TRIGGER contas_a_pagar_e_receber_saldo
+AFTER INSERT OR UPDATE OR DELETE ON contas_a_pagar_e_receber
+FOR EACH ROW EXECUTE FUNCTION atualizar_saldo_fornecedor()
+""")
+
+TRIGGERS_SQLITE = {
+    "INSERT": _aplicar_linha("NEW", 1) + _aplicar_linha("NEW", 1, total=True),
+    "UPDATE": _aplicar_linha("OLD", -1) + _aplicar_linha("NEW", 1)
+    + _aplicar_linha("OLD", -1, total=True) + _aplicar_linha("NEW", 1, total=True),
+    "DELETE": _aplicar_linha("OLD", -1) + _aplicar_linha("OLD", -1, total=True),
+}
+
+TRIGGER_SQLITE = """
+CREATE TRIGGER contas_a_pagar_e_receber_saldo_{operacao} AFTER {operacao}
+ON contas_a_pagar_e_receber
+BEGIN
+{corpo}
+END
+"""
+
+
+def _criar_triggers_de_saldo(tabela) -> None:
+    event.listen(tabela, "after_create",
+                 FUNCAO_POSTGRESQL.execute_if(dialect="postgresql"))
+    event.listen(tabela, "after_create",
+                 TRIGGER_POSTGRESQL.execute_if(dialect="postgresql"))
+    for operacao, corpo in TRIGGERS_SQLITE.items():
+        event.listen(tabela, "after_create",
+                     DDL(TRIGGER_SQLITE.format(operacao=operacao, corpo=corpo))
+                     .execute_if(dialect="sqlite"))
+
+
+_criar_triggers_de_saldo(ContaPagarReceber.__table__)
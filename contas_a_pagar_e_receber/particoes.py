@@ -0,0 +1,193 @@
+"""Mantém as partições mensais de contas_a_pagar_e_receber e arquiva as contas
+antigas em contas_a_pagar_e_receber_arquivo.
+
+Uso:
+    python -m contas_a_pagar_e_receber.particoes          # partições dos próximos meses
+    python -m contas_a_pagar_e_receber.particoes --arquivar-antes-de 2024-01
+
+No Postgres cada mês anterior ao corte sai inteiro de contas (DETACH
+PARTITION) e entra no arquivo (ATTACH PARTITION), sem copiar linhas; o que
+estiver na partição padrão, e tudo nos demais bancos, é movido linha a linha.
+As contas arquivadas deixam de aparecer nas rotas e no saldo, mas o cache de
+leitura por id pode devolvê-las até expirar (CACHE_TTL).
+"""
+import argparse
+import re
+from datetime import date, datetime
+
+from sqlalchemy import Connection, create_engine, delete, insert, select, text
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber, \
+    ContaPagarReceberArquivada, SEM_FORNECEDOR, TOTAL_GERAL
+from shared import config
+
+TABELA = ContaPagarReceber.__tablename__
+ARQUIVO = ContaPagarReceberArquivada.__tablename__
+COLUNAS = [coluna.name for coluna in ContaPagarReceberArquivada.__table__.c]
+MESES_A_FRENTE = 3
+
+
+def somar_meses(mes: date, quantidade: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + quantidade
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def mes_de(texto: str) -> date:
+    return datetime.strptime(texto, "%Y-%m").date()
+
+
+def particoes_mensais(conexao: Connection, tabela: str) -> dict[date, str]:
+    padrao = re.compile(rf"^{tabela}_p(\d{{4}})_(\d{{2}})$")
+    nomes = conexao.execute(text(
+        "SELECT filha.relname FROM pg_inherits "
+        "JOIN pg_class filha ON filha.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = CAST(:tabela AS regclass)"),
+        {"tabela": tabela}).scalars()
+    particoes = {}
+    for nome in nomes:
+        encontrado = padrao.match(nome)
+        if encontrado:
+            particoes[date(int(encontrado[1]), int(encontrado[2]), 1)] = nome
+    return particoes
+
+
+# Cria as partições que faltam do mês atual até o mês `ate` (inclusive).
+# Fora do Postgres não há particionamento e nada é feito.
+def criar_particoes(conexao: Connection, ate: date) -> list[str]:
+    if conexao.dialect.name != "postgresql":
+        return []
+    existentes = particoes_mensais(conexao, TABELA)
+    criadas = []
+    mes = date.today().replace(day=1)
+    while mes <= ate:
+        if mes not in existentes:
+            criadas.append(_criar_particao(conexao, mes))
+        mes = somar_meses(mes, 1)
+    return criadas
+
+
+def _criar_particao(conexao: Connection, mes: date) -> str:
+    fim = somar_meses(mes, 1)
+    nome = f"{TABELA}_p{mes:%Y_%m}"
+    do_mes = (ContaPagarReceber.data_vencimento >= mes) & \
+             (ContaPagarReceber.data_vencimento < fim)
+    # O Postgres não cria a partição enquanto a partição padrão tiver linhas
+    # do intervalo. Elas saem pela tabela principal e voltam depois, já para
+    # a partição nova, passando pelos triggers de saldo nos dois sentidos.
+    movidas = []
+    if conexao.execute(select(ContaPagarReceber.id).where(do_mes).limit(1)).first():
+        # Bloqueia as escritas em contas até o commit: ninguém grava entre a
+        # saída e a volta das linhas.
+        conexao.execute(text(f"LOCK TABLE {TABELA} IN SHARE ROW EXCLUSIVE MODE"))
+        movidas = conexao.execute(delete(ContaPagarReceber).where(do_mes).returning(
+            *(ContaPagarReceber.__table__.c[coluna] for coluna in COLUNAS))).all()
+        _conferir_ids_livres(conexao, [linha.id for linha in movidas])
+    conexao.execute(text(f"CREATE TABLE {nome} PARTITION OF {TABELA} "
+                         f"FOR VALUES FROM ('{mes}') TO ('{fim}')"))
+    if movidas:
+        conexao.execute(insert(ContaPagarReceber),
+                        [linha._asdict() for linha in movidas])
+    return nome
+
+
+# As linhas voltam com o id explícito, e a chave primária (id,
+# data_vencimento) não impede que o mesmo id exista em outra partição. Se
+# algum id já estiver em uso, nada é recriado (a transação é desfeita).
+def _conferir_ids_livres(conexao: Connection, ids: list[int]) -> None:
+    repetidos = conexao.execute(select(ContaPagarReceber.id).where(
+        ContaPagarReceber.id.in_(ids)).order_by(ContaPagarReceber.id)).scalars().all()
+    if repetidos:
+        raise RuntimeError(f"Ids já usados em outra partição de {TABELA}: "
+                           f"{repetidos}")
+
+
+def arquivar(conexao: Connection, antes_de: date) -> dict:
+    particoes = []
+    if conexao.dialect.name == "postgresql":
+        for mes, nome in sorted(particoes_mensais(conexao, TABELA).items()):
+            if somar_meses(mes, 1) <= antes_de:
+                particoes.append(_arquivar_particao(conexao, mes, nome))
+        if particoes:
+            _incrementar_versao_contas(conexao)
+    return {"particoes": particoes, "linhas": _mover_linhas(conexao, antes_de)}
+
+
+def _arquivar_particao(conexao: Connection, mes: date, nome: str) -> str:
+    destino = f"{ARQUIVO}_p{mes:%Y_%m}"
+    conexao.execute(text(f"ALTER TABLE {TABELA} DETACH PARTITION {nome}"))
+    # O DETACH não passa pelos triggers: a contribuição da partição para o
+    # saldo é descontada aqui, na mesma transação, nos fornecedores e depois
+    # no total geral (a ordem dos triggers).
+    chave_fornecedor = f"COALESCE(fornecedor_id, {SEM_FORNECEDOR})"
+    for chave, agrupamento in ((chave_fornecedor, f"GROUP BY {chave_fornecedor}"),
+                               (TOTAL_GERAL, "")):
+        conexao.execute(text(f"""
+            INSERT INTO saldo_fornecedor (fornecedor_id, quantidade, total_pagar, total_receber)
+            SELECT {chave}, -count(*),
+                   -COALESCE(sum(CASE WHEN tipo = 'PAGAR' THEN COALESCE(valor, 0) ELSE 0 END), 0),
+                   -COALESCE(sum(CASE WHEN tipo = 'RECEBER' THEN COALESCE(valor, 0) ELSE 0 END), 0)
+            FROM {nome}
+            {agrupamento}
+            ON CONFLICT (fornecedor_id) DO UPDATE
+                SET quantidade = saldo_fornecedor.quantidade + excluded.quantidade,
+                    total_pagar = saldo_fornecedor.total_pagar + excluded.total_pagar,
+                    total_receber = saldo_fornecedor.total_receber + excluded.total_receber
+        """))
+    conexao.execute(text(f"ALTER TABLE {nome} RENAME TO {destino}"))
+    conexao.execute(text(f"ALTER TABLE {ARQUIVO} ATTACH PARTITION {destino} "
+                         f"FOR VALUES FROM ('{mes}') TO ('{somar_meses(mes, 1)}')"))
+    return destino
+
+
+def _incrementar_versao_contas(conexao: Connection) -> None:
+    conexao.execute(text("""
+        INSERT INTO versao_tabela (tabela, versao, atualizado_em)
+        VALUES (:tabela, 1, now())
+        ON CONFLICT (tabela) DO UPDATE
+            SET versao = versao_tabela.versao + 1,
+                atualizado_em = excluded.atualizado_em
+    """), {"tabela": TABELA})
+
+
+# O DELETE passa pelos triggers, então saldo e versão das contas ficam em dia.
+def _mover_linhas(conexao: Connection, antes_de: date) -> int:
+    colunas = [ContaPagarReceber.__table__.c[coluna] for coluna in COLUNAS]
+    antigas = ContaPagarReceber.data_vencimento < antes_de
+    if conexao.dialect.name == "postgresql":
+        # Um único comando: nenhuma conta inserida no meio é apagada sem ir
+        # para o arquivo.
+        movidas = delete(ContaPagarReceber).where(antigas) \
+            .returning(*colunas).cte("movidas")
+        return conexao.execute(
+            insert(ContaPagarReceberArquivada)
+            .from_select(COLUNAS, select(*movidas.c))
+            .add_cte(movidas)).rowcount
+    conexao.execute(insert(ContaPagarReceberArquivada)
+                    .from_select(COLUNAS, select(*colunas).where(antigas)))
+    return conexao.execute(delete(ContaPagarReceber).where(antigas)).rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=config.DATABASE_URL)
+    parser.add_argument("--meses-a-frente", type=int, default=MESES_A_FRENTE,
+                        help="meses futuros que devem ter partição")
+    parser.add_argument("--arquivar-antes-de", type=mes_de, metavar="AAAA-MM",
+                        help="arquiva as contas que vencem antes deste mês")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    with engine.begin() as conexao:
+        ate = somar_meses(date.today().replace(day=1), args.meses_a_frente)
+        for nome in criar_particoes(conexao, ate):
+            print(f"partição {nome} criada")
+        if args.arquivar_antes_de:
+            resultado = arquivar(conexao, args.arquivar_antes_de)
+            for nome in resultado["particoes"]:
+                print(f"partição {nome} arquivada")
+            print(f"{resultado['linhas']} contas movidas linha a linha para {ARQUIVO}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
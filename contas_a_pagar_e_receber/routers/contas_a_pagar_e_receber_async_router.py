@@ -0,0 +1,234 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber, FornecedorCliente
+from contas_a_pagar_e_receber.routers.contas_a_pagar_e_receber_router import \
+    ContasPagarReceberResponse, ContasPagarReceberRequest, \
+    ContasPagarReceberComFornecedorResponse, ContasPagarReceberLoteRequest, \
+    ExpansaoContaEnum, ContaPagarReceberTipoEnum, AgrupamentoResumoEnum, \
+    ResumoContasResponse, SaldoResponse, SaldoFornecedorResponse, \
+    ResultadoLoteResponse, COLUNAS_RESPOSTA, COLUNAS_LISTAGEM, TAMANHO_MAXIMO_LOTE, \
+    consulta_lista_contas, consulta_atualizar_conta, consulta_remover_conta, \
+    consulta_resumo, consulta_saldo, consulta_saldo_por_fornecedor, resposta_saldo, \
+    fornecedores_citados, consulta_travar_fornecedores, contas_com_fornecedor_valido, \
+    consulta_criar_contas, resultados_criacao_lote, consulta_travar_contas_do_lote, \
+    valores_atualizacao_lote, resultados_atualizacao_lote, \
+    consulta_travar_fornecedores_das_contas, consulta_remover_contas, \
+    resultados_remocao_lote, chave_cache_conta, valores_conta
+from contas_a_pagar_e_receber.saldo import bloquear_saldos_async
+from shared.busca import LIMITE_BUSCA_MAXIMO, LIMITE_BUSCA_PADRAO, \
+    TAMANHO_MINIMO_TERMO, buscar_async
+from shared.cache import Cache
+from shared.dependencies import get_async_db, get_async_db_leitura, get_cache
+from shared.exceptions import NotFound
+from shared.idempotencia import Idempotencia, idempotencia
+from shared.instrumentacao import RotaInstrumentada
+from shared.paginacao import LIMITE_MAXIMO, LIMITE_PADRAO, paginar
+from shared.respostas import resposta_json_rapida
+from shared.versao_tabela import requisicao_condicional_async, \
+    validador_de_conteudo
+
+router = APIRouter(prefix="/contas_a_pagar_e_receber", route_class=RotaInstrumentada)
+
+
+@router.get("/", response_model=list[ContasPagarReceberComFornecedorResponse],
+            response_model_exclude_unset=True,
+            dependencies=[Depends(requisicao_condicional_async(
+                ContaPagarReceber.__tablename__, FornecedorCliente.__tablename__))])
+async def lista_contas(response: Response,
+                       cursor: Optional[str] = None,
+                       limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+                       tipo: Optional[ContaPagarReceberTipoEnum] = None,
+                       fornecedor_id: Optional[int] = None,
+                       valor_minimo: Optional[float] = Query(None, ge=0),
+                       valor_maximo: Optional[float] = Query(None, ge=0),
+                       vencimento_de: Optional[date] = None,
+                       vencimento_ate: Optional[date] = None,
+                       expand: Optional[ExpansaoContaEnum] = None,
+                       db: AsyncSession = Depends(get_async_db_leitura)) -> list[
+    ContasPagarReceberComFornecedorResponse]:
+    consulta = consulta_lista_contas(cursor, limite, tipo, fornecedor_id,
+                                     valor_minimo, valor_maximo, expand,
+                                     vencimento_de, vencimento_ate)
+    resultado = await db.execute(consulta)
+    if expand:
+        return paginar(resultado.scalars().all(), limite, response)
+    return resposta_json_rapida(paginar(resultado.all(), limite, response), response)
+
+
+@router.get("/resumo", response_model=list[ResumoContasResponse],
+            response_model_exclude_unset=True,
+            dependencies=[Depends(requisicao_condicional_async(
+                ContaPagarReceber.__tablename__))])
+async def resumo_contas(agrupar_por: list[AgrupamentoResumoEnum] = Query(
+                            [AgrupamentoResumoEnum.TIPO]),
+                        tipo: Optional[ContaPagarReceberTipoEnum] = None,
+                        fornecedor_id: Optional[int] = None,
+                        valor_minimo: Optional[float] = Query(None, ge=0),
+                        valor_maximo: Optional[float] = Query(None, ge=0),
+                        vencimento_de: Optional[date] = None,
+                        vencimento_ate: Optional[date] = None,
+                        db: AsyncSession = Depends(get_async_db_leitura)) -> list[
+    ResumoContasResponse]:
+    linhas = await db.execute(consulta_resumo(agrupar_por, tipo, fornecedor_id,
+                                              valor_minimo, valor_maximo,
+                                              vencimento_de, vencimento_ate))
+    return [ResumoContasResponse(**linha._asdict()) for linha in linhas]
+
+
+@router.get("/busca", response_model=list[ContasPagarReceberResponse])
+async def buscar_contas(response: Response,
+                        q: str = Query(min_length=TAMANHO_MINIMO_TERMO, max_length=30),
+                        limite: int = Query(LIMITE_BUSCA_PADRAO, ge=1,
+                                            le=LIMITE_BUSCA_MAXIMO),
+                        db: AsyncSession = Depends(get_async_db_leitura)) -> list[
+    ContasPagarReceberResponse]:
+    contas = await buscar_async(db, select(*COLUNAS_LISTAGEM),
+                                ContaPagarReceber.descricao, q, limite,
+                                ContaPagarReceber.id)
+    return resposta_json_rapida(contas, response)
+
+
+@router.get("/saldo", response_model=SaldoResponse,
+            dependencies=[Depends(requisicao_condicional_async(
+                ContaPagarReceber.__tablename__))])
+async def saldo_contas(db: AsyncSession = Depends(get_async_db_leitura)) -> SaldoResponse:
+    return resposta_saldo((await db.execute(consulta_saldo())).one_or_none())
+
+
+@router.get("/saldo/fornecedores", response_model=list[SaldoFornecedorResponse],
+            dependencies=[Depends(requisicao_condicional_async(
+                ContaPagarReceber.__tablename__))])
+async def saldo_por_fornecedor(fornecedor_id: Optional[int] = None,
+                               db: AsyncSession = Depends(get_async_db_leitura)) -> list[
+    SaldoFornecedorResponse]:
+    return [SaldoFornecedorResponse(**linha._asdict())
+            for linha in await db.execute(consulta_saldo_por_fornecedor(fornecedor_id))]
+
+
+# Mesmas travas e ordem de locks das rotas em lote síncronas.
+@router.post("/lote", response_model=list[ResultadoLoteResponse],
+             response_model_exclude_none=True, status_code=201)
+async def criar_contas_em_lote(
+        contas: list[ContasPagarReceberRequest] = Body(
+            min_length=1, max_length=TAMANHO_MAXIMO_LOTE),
+        db: AsyncSession = Depends(get_async_db)) -> list[ResultadoLoteResponse]:
+    citados = fornecedores_citados(contas)
+    fornecedores = set(await db.scalars(consulta_travar_fornecedores(citados))) \
+        if citados else set()
+    validas = contas_com_fornecedor_valido(contas, fornecedores)
+    a_criar = [conta for conta, valida in zip(contas, validas) if valida]
+    criadas = []
+    if a_criar:
+        await bloquear_saldos_async(db, (conta.fornecedor_id for conta in a_criar))
+        criadas = (await db.execute(consulta_criar_contas(),
+                                    [valores_conta(conta) for conta in a_criar])).all()
+        await db.commit()
+    return resultados_criacao_lote(validas, criadas)
+
+
+@router.put("/lote", response_model=list[ResultadoLoteResponse],
+            response_model_exclude_none=True, status_code=200)
+async def atualizar_contas_em_lote(
+        contas: list[ContasPagarReceberLoteRequest] = Body(
+            min_length=1, max_length=TAMANHO_MAXIMO_LOTE),
+        db: AsyncSession = Depends(get_async_db),
+        cache: Cache = Depends(get_cache)) -> list[ResultadoLoteResponse]:
+    linhas = (await db.execute(consulta_travar_contas_do_lote(contas))).all()
+    existentes = {linha.id: linha.data_vencimento for linha in linhas}
+    atualizacoes = [conta for conta in contas if conta.id in existentes]
+    if atualizacoes:
+        await bloquear_saldos_async(db, (linha.fornecedor_id for linha in linhas))
+        await db.execute(update(ContaPagarReceber),
+                         valores_atualizacao_lote(atualizacoes))
+    await db.commit()
+    cache.remover(*(chave_cache_conta(conta.id) for conta in atualizacoes))
+    return resultados_atualizacao_lote(contas, existentes)
+
+
+@router.delete("/lote", response_model=list[ResultadoLoteResponse],
+               response_model_exclude_none=True, status_code=200)
+async def remover_contas_em_lote(
+        ids: list[int] = Body(min_length=1, max_length=TAMANHO_MAXIMO_LOTE),
+        db: AsyncSession = Depends(get_async_db),
+        cache: Cache = Depends(get_cache)) -> list[ResultadoLoteResponse]:
+    await bloquear_saldos_async(db, (await db.scalars(
+        consulta_travar_fornecedores_das_contas(ids))).all())
+    removidos = set(await db.scalars(consulta_remover_contas(ids)))
+    await db.commit()
+    cache.remover(*(chave_cache_conta(id_conta) for id_conta in removidos))
+    return resultados_remocao_lote(ids, removidos)
+
+
+@router.get("/{id_conta_a_pagar_e_receber}", response_model=ContasPagarReceberResponse)
+async def obter_conta_por_id(id_conta_a_pagar_e_receber: int,
+                             request: Request, response: Response,
+                             db: AsyncSession = Depends(get_async_db),
+                             cache: Cache = Depends(get_cache)) -> \
+        ContasPagarReceberResponse:
+    chave = chave_cache_conta(id_conta_a_pagar_e_receber)
+    conta = cache.obter(chave)
+    if conta is None:
+        geracao = cache.geracao(chave)
+        conta = ContasPagarReceberResponse.model_validate(
+            await busca_conta_por_id(id_conta_a_pagar_e_receber, db)
+        ).model_dump(mode="json")
+        cache.definir(chave, conta, geracao)
+    validador_de_conteudo(conta).aplicar(request, response)
+    return conta
+
+
+@router.post("/", response_model=ContasPagarReceberResponse, status_code=201)
+async def criar_conta(conta: ContasPagarReceberRequest,
+                      db: AsyncSession = Depends(get_async_db),
+                      idempotente: Idempotencia = Depends(idempotencia("conta"))) -> \
+        ContasPagarReceberResponse:
+    async def inserir() -> dict:
+        contas_a_pagar_e_receber = (await db.execute(
+            insert(ContaPagarReceber).values(**valores_conta(conta))
+            .returning(*COLUNAS_RESPOSTA))).one()
+        return contas_a_pagar_e_receber._asdict()
+
+    return await idempotente.executar_async(db, conta, inserir)
+
+
+@router.put("/{id_conta_a_pagar_e_receber}", response_model=ContasPagarReceberResponse,
+            status_code=200)
+async def atualizar_conta(id_conta_a_pagar_e_receber: int,
+                          conta: ContasPagarReceberRequest,
+                          db: AsyncSession = Depends(get_async_db),
+                          cache: Cache = Depends(get_cache)) -> \
+        ContasPagarReceberResponse:
+    contas_a_pagar_e_receber = (await db.execute(
+        consulta_atualizar_conta(id_conta_a_pagar_e_receber, conta))).one_or_none()
+    if contas_a_pagar_e_receber is None:
+        raise NotFound("Conta a Pagar e Receber")
+    await db.commit()
+    cache.remover(chave_cache_conta(id_conta_a_pagar_e_receber))
+    return contas_a_pagar_e_receber
+
+
+@router.delete("/{id_conta_a_pagar_e_receber}", status_code=204)
+async def remover_conta(id_conta_a_pagar_e_receber: int,
+                        db: AsyncSession = Depends(get_async_db),
+                        cache: Cache = Depends(get_cache)) -> None:
+    conta = (await db.execute(
+        consulta_remover_conta(id_conta_a_pagar_e_receber))).one_or_none()
+    if conta is None:
+        raise NotFound("Conta a Pagar e Receber")
+    await db.commit()
+    cache.remover(chave_cache_conta(id_conta_a_pagar_e_receber))
+    return None
+
+
+async def busca_conta_por_id(id_conta_a_pagar_e_receber: int,
+                             db: AsyncSession) -> ContaPagarReceber:
+    conta_a_pagar_e_receber = await db.get(ContaPagarReceber,
+                                           id_conta_a_pagar_e_receber)
+    if conta_a_pagar_e_receber is None:
+        raise NotFound("Conta a Pagar e Receber")
+    return conta_a_pagar_e_receber
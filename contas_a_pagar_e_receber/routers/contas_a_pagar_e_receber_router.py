@@ -1,15 +1,45 @@
+from datetime import date
 from enum import Enum
 from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import Float, Select, cast, delete, func, insert, select, update
+from sqlalchemy.orm import Session, selectinload
 
-from contas_a_pagar_e_receber.models import ContaPagarReceber
-from shared.dependencies import get_db
+from contas_a_pagar_e_receber.models import ContaPagarReceber, FornecedorCliente, \
+    SaldoFornecedor, SEM_FORNECEDOR, TOTAL_GERAL
+from contas_a_pagar_e_receber.routers.fornecedor_cliente_router import \
+    FornecedorClienteResponse
+from contas_a_pagar_e_receber.saldo import bloquear_saldos
+from contas_a_pagar_e_receber.tarefas import GERAR_CONTAS_RECORRENTES, \
+    RELATORIO_CONCILIACAO
+from shared.busca import LIMITE_BUSCA_MAXIMO, LIMITE_BUSCA_PADRAO, \
+    TAMANHO_MINIMO_TERMO, buscar
+from shared.cache import Cache
+from shared.dependencies import get_db, get_cache, get_db_leitura
 from shared.exceptions import NotFound
+from shared.exportacao import FormatoExportacaoEnum, exportar
+from shared.idempotencia import Idempotencia, idempotencia
+from shared.instrumentacao import RotaInstrumentada
+from shared.paginacao import LIMITE_MAXIMO, LIMITE_PADRAO, decodificar_cursor, \
+    paginar
+from shared.respostas import resposta_json_rapida
+from shared.tarefas import FilaTarefas, get_fila_tarefas
+from shared.tarefas_router import TarefaResponse, tarefa_aceita
+from shared.versao_tabela import requisicao_condicional, validador_de_conteudo
 
-router = APIRouter(prefix="/contas_a_pagar_e_receber")
+router = APIRouter(prefix="/contas_a_pagar_e_receber", route_class=RotaInstrumentada)
+
+COLUNAS_RESPOSTA = (ContaPagarReceber.id, ContaPagarReceber.descricao,
+                    ContaPagarReceber.valor, ContaPagarReceber.tipo,
+                    ContaPagarReceber.data_vencimento)
+# Numeric vira Decimal no Python, que o orjson não serializa; a conversão
+# para float (o tipo do response model) é feita no próprio SELECT.
+COLUNAS_LISTAGEM = (ContaPagarReceber.id, ContaPagarReceber.descricao,
+                    cast(ContaPagarReceber.valor, Float).label("valor"),
+                    ContaPagarReceber.tipo, ContaPagarReceber.data_vencimento)
 
 
 class ContasPagarReceberResponse(BaseModel):
@@ -17,12 +47,21 @@ class ContasPagarReceberResponse(BaseModel):
     descricao: str
     valor: float
     tipo: str
+    data_vencimento: date
 
     class Config:
         # orm_mode = True
         from_attributes = True
 
 
+class ContasPagarReceberComFornecedorResponse(ContasPagarReceberResponse):
+    fornecedor: FornecedorClienteResponse | None = None
+
+
+class ExpansaoContaEnum(str, Enum):
+    FORNECEDOR = "fornecedor"
+
+
 class ContaPagarReceberTipoEnum(str, Enum):
     PAGAR = "PAGAR"
     RECEBER = "RECEBER"
@@ -33,55 +72,520 @@ class ContasPagarReceberRequest(BaseModel):
     valor: float = Field(gt=0)
     tipo: ContaPagarReceberTipoEnum
     fornecedor_id: int | None = None
+    # Sem data, a conta vence no dia da criação; na alteração, mantém a atual.
+    data_vencimento: date | None = None
+
+
+class ContasPagarReceberLoteRequest(ContasPagarReceberRequest):
+    id: int
+
+
+class ResultadoLoteResponse(BaseModel):
+    # Sem id nos itens do POST que não foram criados.
+    id: int | None = None
+    status: int
+    conta: ContasPagarReceberResponse | None = None
+    message: str | None = None
+
+
+TAMANHO_MAXIMO_LOTE = 1000
+
+
+class AgrupamentoResumoEnum(str, Enum):
+    TIPO = "tipo"
+    FORNECEDOR = "fornecedor"
+
+
+class ResumoContasResponse(BaseModel):
+    tipo: str | None = None
+    fornecedor_id: int | None = None
+    quantidade: int
+    total: float
+
+
+class SaldoResponse(BaseModel):
+    quantidade: int
+    total_pagar: float
+    total_receber: float
+    saldo: float
+
+
+class SaldoFornecedorResponse(SaldoResponse):
+    fornecedor_id: int | None = None
+
+
+PADRAO_MES = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+class ContasRecorrentesRequest(BaseModel):
+    mes_origem: str = Field(pattern=PADRAO_MES)
+    mes_destino: str = Field(pattern=PADRAO_MES)
 
 
-@router.get("/", response_model=list[ContasPagarReceberResponse])
-def lista_contas(db: Session = Depends(get_db)) -> list[ContasPagarReceberResponse]:
-    contas = db.query(ContaPagarReceber).all()
-    return contas
+# O campo fornecedor só aparece com ?expand=fornecedor (exclude_unset): sem
+# a expansão as linhas não têm esse atributo e o campo fica sem valor.
+@router.get("/", response_model=list[ContasPagarReceberComFornecedorResponse],
+            response_model_exclude_unset=True,
+            dependencies=[Depends(requisicao_condicional(
+                ContaPagarReceber.__tablename__, FornecedorCliente.__tablename__))])
+def lista_contas(response: Response,
+                 cursor: Optional[str] = None,
+                 limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+                 tipo: Optional[ContaPagarReceberTipoEnum] = None,
+                 fornecedor_id: Optional[int] = None,
+                 valor_minimo: Optional[float] = Query(None, ge=0),
+                 valor_maximo: Optional[float] = Query(None, ge=0),
+                 vencimento_de: Optional[date] = None,
+                 vencimento_ate: Optional[date] = None,
+                 expand: Optional[ExpansaoContaEnum] = None,
+                 db: Session = Depends(get_db_leitura)) -> list[
+    ContasPagarReceberComFornecedorResponse]:
+    consulta = consulta_lista_contas(cursor, limite, tipo, fornecedor_id,
+                                     valor_minimo, valor_maximo, expand,
+                                     vencimento_de, vencimento_ate)
+    resultado = db.execute(consulta)
+    if expand:
+        return paginar(resultado.scalars().all(), limite, response)
+    return resposta_json_rapida(paginar(resultado.all(), limite, response), response)
+
+
+@router.get("/exportar", response_class=StreamingResponse)
+def exportar_contas(formato: FormatoExportacaoEnum = FormatoExportacaoEnum.NDJSON,
+                    tipo: Optional[ContaPagarReceberTipoEnum] = None,
+                    fornecedor_id: Optional[int] = None,
+                    vencimento_de: Optional[date] = None,
+                    vencimento_ate: Optional[date] = None,
+                    db: Session = Depends(get_db_leitura)) -> StreamingResponse:
+    consulta = filtrar_contas(
+        select(ContaPagarReceber.id, ContaPagarReceber.descricao,
+               ContaPagarReceber.valor, ContaPagarReceber.tipo,
+               ContaPagarReceber.fornecedor_id, ContaPagarReceber.data_vencimento),
+        tipo, fornecedor_id, vencimento_de=vencimento_de,
+        vencimento_ate=vencimento_ate)
+    return exportar(db, consulta.order_by(ContaPagarReceber.id), formato,
+                    "contas_a_pagar_e_receber")
+
+
+@router.get("/resumo", response_model=list[ResumoContasResponse],
+            response_model_exclude_unset=True,
+            dependencies=[Depends(requisicao_condicional(
+                ContaPagarReceber.__tablename__))])
+def resumo_contas(agrupar_por: list[AgrupamentoResumoEnum] = Query(
+                      [AgrupamentoResumoEnum.TIPO]),
+                  tipo: Optional[ContaPagarReceberTipoEnum] = None,
+                  fornecedor_id: Optional[int] = None,
+                  valor_minimo: Optional[float] = Query(None, ge=0),
+                  valor_maximo: Optional[float] = Query(None, ge=0),
+                  vencimento_de: Optional[date] = None,
+                  vencimento_ate: Optional[date] = None,
+                  db: Session = Depends(get_db_leitura)) -> list[ResumoContasResponse]:
+    linhas = db.execute(consulta_resumo(agrupar_por, tipo, fornecedor_id,
+                                        valor_minimo, valor_maximo, vencimento_de,
+                                        vencimento_ate))
+    return [ResumoContasResponse(**linha._asdict()) for linha in linhas]
+
+
+@router.get("/busca", response_model=list[ContasPagarReceberResponse])
+def buscar_contas(response: Response,
+                  q: str = Query(min_length=TAMANHO_MINIMO_TERMO, max_length=30),
+                  limite: int = Query(LIMITE_BUSCA_PADRAO, ge=1, le=LIMITE_BUSCA_MAXIMO),
+                  db: Session = Depends(get_db_leitura)) -> list[
+    ContasPagarReceberResponse]:
+    contas = buscar(db, select(*COLUNAS_LISTAGEM), ContaPagarReceber.descricao, q,
+                    limite, ContaPagarReceber.id)
+    return resposta_json_rapida(contas, response)
+
+
+# O saldo vem da tabela saldo_fornecedor, mantida por trigger a cada escrita
+# em contas: é uma leitura da linha TOTAL_GERAL, que só não existe antes da
+# primeira conta.
+@router.get("/saldo", response_model=SaldoResponse,
+            dependencies=[Depends(requisicao_condicional(
+                ContaPagarReceber.__tablename__))])
+def saldo_contas(db: Session = Depends(get_db_leitura)) -> SaldoResponse:
+    return resposta_saldo(db.execute(consulta_saldo()).one_or_none())
+
+
+@router.get("/saldo/fornecedores", response_model=list[SaldoFornecedorResponse],
+            dependencies=[Depends(requisicao_condicional(
+                ContaPagarReceber.__tablename__))])
+def saldo_por_fornecedor(fornecedor_id: Optional[int] = None,
+                         db: Session = Depends(get_db_leitura)) -> list[
+    SaldoFornecedorResponse]:
+    return [SaldoFornecedorResponse(**linha._asdict())
+            for linha in db.execute(consulta_saldo_por_fornecedor(fornecedor_id))]
+
+
+# Trabalho pesado vai para a fila de tarefas: a rota responde 202 com o id
+# da tarefa, que é acompanhada em GET /tarefas/{id}.
+@router.post("/recorrentes", response_model=TarefaResponse, status_code=202)
+def agendar_contas_recorrentes(pedido: ContasRecorrentesRequest, response: Response,
+                               db: Session = Depends(get_db),
+                               fila: FilaTarefas = Depends(get_fila_tarefas)) -> \
+        TarefaResponse:
+    return tarefa_aceita(
+        fila.enfileirar(db, GERAR_CONTAS_RECORRENTES, pedido.model_dump()), response)
+
+
+@router.post("/conciliacao", response_model=TarefaResponse, status_code=202)
+def agendar_relatorio_conciliacao(response: Response, db: Session = Depends(get_db),
+                                  fila: FilaTarefas = Depends(get_fila_tarefas)) -> \
+        TarefaResponse:
+    return tarefa_aceita(fila.enfileirar(db, RELATORIO_CONCILIACAO, {}), response)
+
+
+@router.post("/lote", response_model=list[ResultadoLoteResponse],
+             response_model_exclude_none=True, status_code=201)
+def criar_contas_em_lote(
+        contas: list[ContasPagarReceberRequest] = Body(
+            min_length=1, max_length=TAMANHO_MAXIMO_LOTE),
+        db: Session = Depends(get_db)) -> list[ResultadoLoteResponse]:
+    # Os fornecedores citados são conferidos em uma consulta e ficam travados
+    # (FOR KEY SHARE, o mesmo lock da checagem da FK) até o commit; os itens
+    # com fornecedor inexistente voltam com 422 em vez de derrubar o lote.
+    # Os demais saem em um único INSERT ... RETURNING em lote
+    # (insertmanyvalues) e um commit, preservando a ordem recebida.
+    citados = fornecedores_citados(contas)
+    fornecedores = set(db.scalars(consulta_travar_fornecedores(citados))) \
+        if citados else set()
+    validas = contas_com_fornecedor_valido(contas, fornecedores)
+    a_criar = [conta for conta, valida in zip(contas, validas) if valida]
+    criadas = []
+    if a_criar:
+        bloquear_saldos(db, (conta.fornecedor_id for conta in a_criar))
+        criadas = db.execute(consulta_criar_contas(),
+                             [valores_conta(conta) for conta in a_criar]).all()
+        db.commit()
+    return resultados_criacao_lote(validas, criadas)
+
+
+@router.put("/lote", response_model=list[ResultadoLoteResponse],
+            response_model_exclude_none=True, status_code=200)
+def atualizar_contas_em_lote(
+        contas: list[ContasPagarReceberLoteRequest] = Body(
+            min_length=1, max_length=TAMANHO_MAXIMO_LOTE),
+        db: Session = Depends(get_db),
+        cache: Cache = Depends(get_cache)) -> list[ResultadoLoteResponse]:
+    # Trava as contas por id e depois os saldos dos fornecedores delas (ver
+    # bloquear_saldos). id -> vencimento atual, usado na resposta quando o
+    # lote não altera a data.
+    linhas = db.execute(consulta_travar_contas_do_lote(contas)).all()
+    existentes = {linha.id: linha.data_vencimento for linha in linhas}
+    atualizacoes = [conta for conta in contas if conta.id in existentes]
+    if atualizacoes:
+        bloquear_saldos(db, (linha.fornecedor_id for linha in linhas))
+        # UPDATE em lote pela chave primária (executemany).
+        db.execute(update(ContaPagarReceber), valores_atualizacao_lote(atualizacoes))
+    db.commit()
+    cache.remover(*(chave_cache_conta(conta.id) for conta in atualizacoes))
+    return resultados_atualizacao_lote(contas, existentes)
+
+
+@router.delete("/lote", response_model=list[ResultadoLoteResponse],
+               response_model_exclude_none=True, status_code=200)
+def remover_contas_em_lote(
+        ids: list[int] = Body(min_length=1, max_length=TAMANHO_MAXIMO_LOTE),
+        db: Session = Depends(get_db),
+        cache: Cache = Depends(get_cache)) -> list[ResultadoLoteResponse]:
+    # Mesma ordem de locks do PUT /lote: contas por id, depois os saldos.
+    bloquear_saldos(db, db.scalars(consulta_travar_fornecedores_das_contas(ids)).all())
+    removidos = set(db.scalars(consulta_remover_contas(ids)))
+    db.commit()
+    cache.remover(*(chave_cache_conta(id_conta) for id_conta in removidos))
+    return resultados_remocao_lote(ids, removidos)
 
 
 @router.get("/{id_conta_a_pagar_e_receber}", response_model=ContasPagarReceberResponse)
 def obter_conta_por_id(id_conta_a_pagar_e_receber: int,
-                       db: Session = Depends(get_db)) -> ContasPagarReceberResponse:
-    return busca_conta_por_id(id_conta_a_pagar_e_receber, db)
+                       request: Request, response: Response,
+                       db: Session = Depends(get_db),
+                       cache: Cache = Depends(get_cache)) -> ContasPagarReceberResponse:
+    chave = chave_cache_conta(id_conta_a_pagar_e_receber)
+    conta = cache.obter(chave)
+    if conta is None:
+        geracao = cache.geracao(chave)
+        # mode="json": a data vira texto e o valor pode ir para o Redis.
+        conta = ContasPagarReceberResponse.model_validate(
+            busca_conta_por_id(id_conta_a_pagar_e_receber, db)).model_dump(mode="json")
+        cache.definir(chave, conta, geracao)
+    validador_de_conteudo(conta).aplicar(request, response)
+    return conta
 
 
+# Com Idempotency-Key, a retentativa recebe a resposta da primeira
+# requisição sem executar outro INSERT. O commit fica com a Idempotencia,
+# que grava a chave na mesma transação.
 @router.post("/", response_model=ContasPagarReceberResponse, status_code=201)
 def criar_conta(conta: ContasPagarReceberRequest,
-                db: Session = Depends(get_db)) -> ContasPagarReceberResponse:
-    contas_a_pagar_e_receber = ContaPagarReceber(**conta.dict())
+                db: Session = Depends(get_db),
+                idempotente: Idempotencia = Depends(idempotencia("conta"))) -> \
+        ContasPagarReceberResponse:
+    def inserir() -> dict:
+        contas_a_pagar_e_receber = db.execute(
+            insert(ContaPagarReceber).values(**valores_conta(conta))
+            .returning(*COLUNAS_RESPOSTA)).one()
+        return contas_a_pagar_e_receber._asdict()
 
-    db.add(contas_a_pagar_e_receber)
-    db.commit()
-    db.refresh(contas_a_pagar_e_receber)
-
-    return contas_a_pagar_e_receber
+    return idempotente.executar(db, conta, inserir)
 
 
 @router.put("/{id_conta_a_pagar_e_receber}", response_model=ContasPagarReceberResponse,
             status_code=200)
 def atualizar_conta(id_conta_a_pagar_e_receber: int, conta: ContasPagarReceberRequest,
-                    db: Session = Depends(get_db)) -> ContasPagarReceberResponse:
-    contas_a_pagar_e_receber = busca_conta_por_id(id_conta_a_pagar_e_receber, db)
-    contas_a_pagar_e_receber.descricao = conta.descricao
-    contas_a_pagar_e_receber.valor = conta.valor
-    contas_a_pagar_e_receber.tipo = conta.tipo
-    db.add(contas_a_pagar_e_receber)
+                    db: Session = Depends(get_db),
+                    cache: Cache = Depends(get_cache)) -> ContasPagarReceberResponse:
+    contas_a_pagar_e_receber = db.execute(
+        consulta_atualizar_conta(id_conta_a_pagar_e_receber, conta)).one_or_none()
+    if contas_a_pagar_e_receber is None:
+        raise NotFound("Conta a Pagar e Receber")
     db.commit()
-    db.refresh(contas_a_pagar_e_receber)
+    cache.remover(chave_cache_conta(id_conta_a_pagar_e_receber))
     return contas_a_pagar_e_receber
 
 
 @router.delete("/{id_conta_a_pagar_e_receber}", status_code=204)
 def remover_conta(id_conta_a_pagar_e_receber: int,
-                  db: Session = Depends(get_db)) -> None:
-    conta = busca_conta_por_id(id_conta_a_pagar_e_receber, db)
-    db.delete(conta)
+                  db: Session = Depends(get_db),
+                  cache: Cache = Depends(get_cache)) -> None:
+    conta = db.execute(consulta_remover_conta(id_conta_a_pagar_e_receber)).one_or_none()
+    if conta is None:
+        raise NotFound("Conta a Pagar e Receber")
     db.commit()
+    cache.remover(chave_cache_conta(id_conta_a_pagar_e_receber))
     return None
 
 
+# As escritas usam INSERT/UPDATE/DELETE ... RETURNING: cada requisição faz
+# um único comando no banco, sem o SELECT prévio para checar a existência
+# nem o refresh() depois do commit.
+def consulta_atualizar_conta(id_conta_a_pagar_e_receber: int,
+                             conta: ContasPagarReceberRequest):
+    return update(ContaPagarReceber) \
+        .where(ContaPagarReceber.id == id_conta_a_pagar_e_receber) \
+        .values(**valores_alterados_conta(conta)) \
+        .returning(*COLUNAS_RESPOSTA) \
+        .execution_options(synchronize_session=False)
+
+
+def consulta_remover_conta(id_conta_a_pagar_e_receber: int):
+    return delete(ContaPagarReceber) \
+        .where(ContaPagarReceber.id == id_conta_a_pagar_e_receber) \
+        .returning(ContaPagarReceber.id) \
+        .execution_options(synchronize_session=False)
+
+
+# Consultas e respostas das rotas em lote, compartilhadas com as versões
+# assíncronas.
+def fornecedores_citados(contas: list[ContasPagarReceberRequest]) -> set[int]:
+    return {conta.fornecedor_id for conta in contas} - {None}
+
+
+def consulta_travar_fornecedores(ids: set[int]) -> Select:
+    return select(FornecedorCliente.id) \
+        .where(FornecedorCliente.id.in_(ids)) \
+        .order_by(FornecedorCliente.id) \
+        .with_for_update(read=True, key_share=True)
+
+
+def contas_com_fornecedor_valido(contas: list[ContasPagarReceberRequest],
+                                 fornecedores: set[int]) -> list[bool]:
+    return [conta.fornecedor_id is None or conta.fornecedor_id in fornecedores
+            for conta in contas]
+
+
+def consulta_criar_contas():
+    return insert(ContaPagarReceber).returning(*COLUNAS_RESPOSTA,
+                                               sort_by_parameter_order=True)
+
+
+def resultados_criacao_lote(validas: list[bool],
+                            criadas: list) -> list[ResultadoLoteResponse]:
+    resultados = []
+    criadas = iter(criadas)
+    for valida in validas:
+        if valida:
+            criada = next(criadas)
+            resultados.append(ResultadoLoteResponse(id=criada.id, status=201, conta=criada))
+        else:
+            resultados.append(ResultadoLoteResponse(
+                status=422, message="Fornecedor não encontrado"))
+    return resultados
+
+
+def consulta_travar_contas_do_lote(contas: list[ContasPagarReceberLoteRequest]) -> Select:
+    return select(ContaPagarReceber.id, ContaPagarReceber.data_vencimento,
+                  ContaPagarReceber.fornecedor_id) \
+        .where(ContaPagarReceber.id.in_({conta.id for conta in contas})) \
+        .order_by(ContaPagarReceber.id).with_for_update()
+
+
+def valores_atualizacao_lote(contas: list[ContasPagarReceberLoteRequest]) -> list[dict]:
+    return [{"id": conta.id, **valores_alterados_conta(conta)} for conta in contas]
+
+
+def resultados_atualizacao_lote(contas: list[ContasPagarReceberLoteRequest],
+                                existentes: dict[int, date]) -> list[ResultadoLoteResponse]:
+    return [
+        ResultadoLoteResponse(id=conta.id, status=200,
+                              conta=ContasPagarReceberResponse(
+                                  id=conta.id, descricao=conta.descricao,
+                                  valor=conta.valor, tipo=conta.tipo,
+                                  data_vencimento=conta.data_vencimento or
+                                  existentes[conta.id]))
+        if conta.id in existentes else _resultado_nao_encontrado(conta.id)
+        for conta in contas
+    ]
+
+
+def consulta_travar_fornecedores_das_contas(ids: list[int]) -> Select:
+    return select(ContaPagarReceber.fornecedor_id) \
+        .where(ContaPagarReceber.id.in_(set(ids))) \
+        .order_by(ContaPagarReceber.id).with_for_update()
+
+
+def consulta_remover_contas(ids: list[int]):
+    return delete(ContaPagarReceber) \
+        .where(ContaPagarReceber.id.in_(set(ids))) \
+        .returning(ContaPagarReceber.id) \
+        .execution_options(synchronize_session=False)
+
+
+# Um id repetido no lote é removido uma vez: as repetições dão 404, como se
+# o mesmo DELETE fosse enviado de novo.
+def resultados_remocao_lote(ids: list[int],
+                            removidos: set[int]) -> list[ResultadoLoteResponse]:
+    resultados = []
+    for id_conta in ids:
+        if id_conta in removidos:
+            removidos.discard(id_conta)
+            resultados.append(ResultadoLoteResponse(id=id_conta, status=204))
+        else:
+            resultados.append(_resultado_nao_encontrado(id_conta))
+    return resultados
+
+
+def valores_conta(conta: ContasPagarReceberRequest) -> dict:
+    return {**conta.dict(),
+            "data_vencimento": conta.data_vencimento or date.today()}
+
+
+def valores_alterados_conta(conta: ContasPagarReceberRequest) -> dict:
+    valores = {"descricao": conta.descricao, "valor": conta.valor,
+               "tipo": conta.tipo}
+    if conta.data_vencimento is not None:
+        valores["data_vencimento"] = conta.data_vencimento
+    return valores
+
+
+def _resultado_nao_encontrado(id_conta_a_pagar_e_receber: int) -> ResultadoLoteResponse:
+    return ResultadoLoteResponse(id=id_conta_a_pagar_e_receber, status=404,
+                                 message="Conta a Pagar e Receber não encontrado")
+
+
+def consulta_lista_contas(cursor: Optional[str], limite: int,
+                          tipo: Optional[ContaPagarReceberTipoEnum] = None,
+                          fornecedor_id: Optional[int] = None,
+                          valor_minimo: Optional[float] = None,
+                          valor_maximo: Optional[float] = None,
+                          expand: Optional[ExpansaoContaEnum] = None,
+                          vencimento_de: Optional[date] = None,
+                          vencimento_ate: Optional[date] = None) -> Select:
+    if expand == ExpansaoContaEnum.FORNECEDOR:
+        # selectinload: uma consulta para a página de contas e outra com
+        # IN (...) para os fornecedores dela, qualquer que seja o tamanho.
+        consulta = select(ContaPagarReceber).options(
+            selectinload(ContaPagarReceber.fornecedor))
+    else:
+        consulta = select(*COLUNAS_LISTAGEM)
+    consulta = filtrar_contas(consulta, tipo, fornecedor_id,
+                              valor_minimo, valor_maximo, vencimento_de,
+                              vencimento_ate)
+    if cursor is not None:
+        consulta = consulta.where(ContaPagarReceber.id > decodificar_cursor(cursor))
+    # Busca um registro a mais apenas para saber se existe uma próxima página.
+    return consulta.order_by(ContaPagarReceber.id).limit(limite + 1)
+
+
+# A agregação roda no banco (coberta pelo índice tipo, fornecedor_id) e só
+# as linhas agrupadas trafegam até a aplicação.
+def consulta_resumo(agrupar_por: list[AgrupamentoResumoEnum],
+                    tipo: Optional[ContaPagarReceberTipoEnum] = None,
+                    fornecedor_id: Optional[int] = None,
+                    valor_minimo: Optional[float] = None,
+                    valor_maximo: Optional[float] = None,
+                    vencimento_de: Optional[date] = None,
+                    vencimento_ate: Optional[date] = None) -> Select:
+    colunas_agrupamento = {
+        AgrupamentoResumoEnum.TIPO: ContaPagarReceber.tipo,
+        AgrupamentoResumoEnum.FORNECEDOR: ContaPagarReceber.fornecedor_id,
+    }
+    agrupamento = [colunas_agrupamento[campo] for campo in
+                   dict.fromkeys(agrupar_por)]
+    consulta = filtrar_contas(
+        select(*agrupamento,
+               func.count().label("quantidade"),
+               func.coalesce(func.sum(ContaPagarReceber.valor), 0).label("total")),
+        tipo, fornecedor_id, valor_minimo, valor_maximo, vencimento_de,
+        vencimento_ate)
+    return consulta.group_by(*agrupamento).order_by(*agrupamento)
+
+
+def _colunas_saldo():
+    return (SaldoFornecedor.quantidade, SaldoFornecedor.total_pagar,
+            SaldoFornecedor.total_receber,
+            (SaldoFornecedor.total_receber - SaldoFornecedor.total_pagar).label("saldo"))
+
+
+def consulta_saldo() -> Select:
+    return select(*_colunas_saldo()).where(SaldoFornecedor.fornecedor_id == TOTAL_GERAL)
+
+
+def resposta_saldo(saldo) -> SaldoResponse:
+    if saldo is None:
+        return SaldoResponse(quantidade=0, total_pagar=0, total_receber=0, saldo=0)
+    return SaldoResponse(**saldo._asdict())
+
+
+def consulta_saldo_por_fornecedor(fornecedor_id: Optional[int] = None) -> Select:
+    consulta = select(
+        func.nullif(SaldoFornecedor.fornecedor_id, SEM_FORNECEDOR).label("fornecedor_id"),
+        *_colunas_saldo(),
+    ).where(SaldoFornecedor.quantidade > 0,
+            SaldoFornecedor.fornecedor_id != TOTAL_GERAL) \
+        .order_by(SaldoFornecedor.fornecedor_id)
+    if fornecedor_id is not None:
+        consulta = consulta.where(SaldoFornecedor.fornecedor_id == fornecedor_id)
+    return consulta
+
+
+def filtrar_contas(consulta: Select,
+                   tipo: Optional[ContaPagarReceberTipoEnum] = None,
+                   fornecedor_id: Optional[int] = None,
+                   valor_minimo: Optional[float] = None,
+                   valor_maximo: Optional[float] = None,
+                   vencimento_de: Optional[date] = None,
+                   vencimento_ate: Optional[date] = None) -> Select:
+    if tipo is not None:
+        consulta = consulta.where(ContaPagarReceber.tipo == tipo)
+    if fornecedor_id is not None:
+        consulta = consulta.where(ContaPagarReceber.fornecedor_id == fornecedor_id)
+    if valor_minimo is not None:
+        consulta = consulta.where(ContaPagarReceber.valor >= valor_minimo)
+    if valor_maximo is not None:
+        consulta = consulta.where(ContaPagarReceber.valor <= valor_maximo)
+    # Filtro pela chave de partição: no Postgres só as partições dos meses
+    # do período são lidas.
+    if vencimento_de is not None:
+        consulta = consulta.where(ContaPagarReceber.data_vencimento >= vencimento_de)
+    if vencimento_ate is not None:
+        consulta = consulta.where(ContaPagarReceber.data_vencimento <= vencimento_ate)
+    return consulta
+
+
+def chave_cache_conta(id_conta_a_pagar_e_receber: int) -> str:
+    return f"conta:{id_conta_a_pagar_e_receber}"
+
+
 def busca_conta_por_id(id_conta_a_pagar_e_receber: int,
                        db: Session) -> ContaPagarReceber:
     conta_a_pagar_e_receber = db.query(ContaPagarReceber).get(
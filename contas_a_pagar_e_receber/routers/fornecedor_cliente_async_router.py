@@ -0,0 +1,144 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contas_a_pagar_e_receber.models import FornecedorCliente
+from contas_a_pagar_e_receber.routers.fornecedor_cliente_router import \
+    FornecedorClienteResponse, FornecedorClienteRequest, COLUNAS_RESPOSTA, \
+    PADRAO_IDS_LOTE, ResultadoBuscaLoteResponse, consulta_atualizar_fornecedor, \
+    consulta_deletar_fornecedor, consulta_fornecedores_por_ids, \
+    chave_cache_fornecedor, fornecedores_em_cache, geracao_fornecedores, \
+    guardar_fornecedores_em_cache, resultados_lote_fornecedores
+from shared.busca import LIMITE_BUSCA_MAXIMO, LIMITE_BUSCA_PADRAO, \
+    TAMANHO_MINIMO_TERMO, buscar_async
+from shared.cache import Cache
+from shared.carregador_lote import CarregadorEmLoteAsync
+from shared.dependencies import get_async_db, get_async_db_leitura, get_cache
+from shared.exceptions import NotFound
+from shared.idempotencia import Idempotencia, idempotencia
+from shared.instrumentacao import RotaInstrumentada
+from shared.respostas import resposta_json_rapida
+from shared.versao_tabela import requisicao_condicional_async, \
+    validador_de_conteudo
+
+router = APIRouter(prefix="/fornecedor-cliente", route_class=RotaInstrumentada)
+
+
+@router.get("", response_model=List[FornecedorClienteResponse],
+            dependencies=[Depends(requisicao_condicional_async(
+                FornecedorCliente.__tablename__))])
+async def listar_fornecedor_cliente(response: Response,
+                                    db: AsyncSession = Depends(
+                                        get_async_db_leitura)) -> \
+        List[FornecedorClienteResponse]:
+    fornecedores = await db.execute(
+        select(*COLUNAS_RESPOSTA).order_by(FornecedorCliente.id))
+    return resposta_json_rapida(fornecedores, response)
+
+
+@router.get("/lote", response_model=List[ResultadoBuscaLoteResponse],
+            response_model_exclude_none=True)
+async def buscar_fornecedores_em_lote(
+        ids: str = Query(pattern=PADRAO_IDS_LOTE),
+        db: AsyncSession = Depends(get_async_db),
+        cache: Cache = Depends(get_cache)) -> List[ResultadoBuscaLoteResponse]:
+    ids_pedidos = [int(id_fornecedor) for id_fornecedor in ids.split(",")]
+    encontrados = fornecedores_em_cache(ids_pedidos, cache)
+    faltantes = set(ids_pedidos) - encontrados.keys()
+    if faltantes:
+        geracao = geracao_fornecedores(faltantes, cache)
+        carregados = await carregador_fornecedores.carregar(db, faltantes)
+        guardar_fornecedores_em_cache(carregados, cache, geracao)
+        encontrados.update(carregados)
+    return resultados_lote_fornecedores(ids_pedidos, encontrados)
+
+
+@router.get("/busca", response_model=List[FornecedorClienteResponse])
+async def buscar_fornecedor_cliente(
+        response: Response,
+        q: str = Query(min_length=TAMANHO_MINIMO_TERMO, max_length=255),
+        limite: int = Query(LIMITE_BUSCA_PADRAO, ge=1, le=LIMITE_BUSCA_MAXIMO),
+        db: AsyncSession = Depends(get_async_db_leitura)) -> List[
+    FornecedorClienteResponse]:
+    fornecedores = await buscar_async(db, select(*COLUNAS_RESPOSTA),
+                                      FornecedorCliente.nome, q, limite,
+                                      FornecedorCliente.id)
+    return resposta_json_rapida(fornecedores, response)
+
+
+@router.get("/{id_fornecedor}", response_model=FornecedorClienteResponse)
+async def obter_fornecedor(id_fornecedor: int,
+                           request: Request, response: Response,
+                           db: AsyncSession = Depends(get_async_db),
+                           cache: Cache = Depends(get_cache)) -> \
+        FornecedorClienteResponse:
+    chave = chave_cache_fornecedor(id_fornecedor)
+    fornecedor = cache.obter(chave)
+    if fornecedor is None:
+        geracao = cache.geracao(chave)
+        fornecedor = FornecedorClienteResponse.model_validate(
+            await buscar_fornecedor_por_id(id_fornecedor, db)).model_dump()
+        cache.definir(chave, fornecedor, geracao)
+    validador_de_conteudo(fornecedor).aplicar(request, response)
+    return fornecedor
+
+
+@router.post("", response_model=FornecedorClienteResponse, status_code=201)
+async def criar_fornecedor(fornecedor: FornecedorClienteRequest,
+                           db: AsyncSession = Depends(get_async_db),
+                           idempotente: Idempotencia = Depends(
+                               idempotencia("fornecedor"))) -> \
+        FornecedorClienteResponse:
+    async def inserir() -> dict:
+        novo_fornecedor = (await db.execute(
+            insert(FornecedorCliente).values(**fornecedor.dict())
+            .returning(*COLUNAS_RESPOSTA))).one()
+        return novo_fornecedor._asdict()
+
+    return await idempotente.executar_async(db, fornecedor, inserir)
+
+
+@router.put("/{id_fornecedor}", response_model=FornecedorClienteResponse,
+            status_code=200)
+async def atualizar_fornecedor(id_fornecedor: int,
+                               fornecedor: FornecedorClienteRequest,
+                               db: AsyncSession = Depends(get_async_db),
+                               cache: Cache = Depends(
+                                   get_cache)) -> FornecedorClienteResponse:
+    fornecedor_alterado = (await db.execute(
+        consulta_atualizar_fornecedor(id_fornecedor, fornecedor))).one_or_none()
+    if fornecedor_alterado is None:
+        raise NotFound("Fornecedor")
+    await db.commit()
+    cache.remover(chave_cache_fornecedor(id_fornecedor))
+    return fornecedor_alterado
+
+
+@router.delete("/{id_fornecedor}", status_code=204)
+async def deletar_fornecedor(id_fornecedor: int,
+                             db: AsyncSession = Depends(get_async_db),
+                             cache: Cache = Depends(get_cache)):
+    fornecedor_deletado = (await db.execute(
+        consulta_deletar_fornecedor(id_fornecedor))).one_or_none()
+    if fornecedor_deletado is None:
+        raise NotFound("Fornecedor")
+    await db.commit()
+    cache.remover(chave_cache_fornecedor(id_fornecedor))
+
+
+async def buscar_fornecedor_por_id(id_fornecedor: int,
+                                   db: AsyncSession) -> FornecedorCliente:
+    fornecedor = await db.get(FornecedorCliente, id_fornecedor)
+    if fornecedor is None:
+        raise NotFound("Fornecedor")
+    return fornecedor
+
+
+async def carregar_fornecedores(db: AsyncSession, ids: set[int]) -> dict[int, dict]:
+    return {fornecedor.id: fornecedor._asdict()
+            for fornecedor in await db.execute(consulta_fornecedores_por_ids(ids))}
+
+
+carregador_fornecedores = CarregadorEmLoteAsync(carregar_fornecedores)
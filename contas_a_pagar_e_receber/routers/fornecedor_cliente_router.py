@@ -1,14 +1,27 @@
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
 
 from contas_a_pagar_e_receber.models import FornecedorCliente
-from shared.dependencies import get_db
+from shared.busca import LIMITE_BUSCA_MAXIMO, LIMITE_BUSCA_PADRAO, \
+    TAMANHO_MINIMO_TERMO, buscar
+from shared.cache import Cache
+from shared.carregador_lote import CarregadorEmLote
+from shared.dependencies import get_db, get_cache, get_db_leitura
 from shared.exceptions import NotFound
+from shared.exportacao import FormatoExportacaoEnum, exportar
+from shared.idempotencia import Idempotencia, idempotencia
+from shared.instrumentacao import RotaInstrumentada
+from shared.respostas import resposta_json_rapida
+from shared.versao_tabela import requisicao_condicional, validador_de_conteudo
 
-router = APIRouter(prefix="/fornecedor-cliente")
+router = APIRouter(prefix="/fornecedor-cliente", route_class=RotaInstrumentada)
+
+COLUNAS_RESPOSTA = (FornecedorCliente.id, FornecedorCliente.nome)
 
 
 class FornecedorClienteResponse(BaseModel):
@@ -23,48 +36,193 @@ class FornecedorClienteRequest(BaseModel):
     nome: str = Field(min_length=3, max_length=30)
 
 
-@router.get("", response_model=List[FornecedorClienteResponse])
-def listar_fornecedor_cliente(db: Session = Depends(get_db)) -> List[
+class ResultadoBuscaLoteResponse(BaseModel):
+    id: int
+    status: int
+    fornecedor: FornecedorClienteResponse | None = None
+    message: str | None = None
+
+
+LIMITE_IDS_LOTE = 500
+# Lista de ids separados por vírgula, com no máximo LIMITE_IDS_LOTE itens.
+PADRAO_IDS_LOTE = rf"^\d+(,\d+){{0,{LIMITE_IDS_LOTE - 1}}}$"
+
+
+@router.get("", response_model=List[FornecedorClienteResponse],
+            dependencies=[Depends(requisicao_condicional(
+                FornecedorCliente.__tablename__))])
+def listar_fornecedor_cliente(response: Response,
+                              db: Session = Depends(get_db_leitura)) -> List[
     FornecedorClienteResponse]:
-    return db.query(FornecedorCliente).all()
+    fornecedores = db.execute(
+        select(*COLUNAS_RESPOSTA).order_by(FornecedorCliente.id))
+    return resposta_json_rapida(fornecedores, response)
+
+
+@router.get("/exportar", response_class=StreamingResponse)
+def exportar_fornecedor_cliente(
+        formato: FormatoExportacaoEnum = FormatoExportacaoEnum.NDJSON,
+        db: Session = Depends(get_db_leitura)) -> StreamingResponse:
+    consulta = select(FornecedorCliente.id, FornecedorCliente.nome) \
+        .order_by(FornecedorCliente.id)
+    return exportar(db, consulta, formato, "fornecedor_cliente")
+
+
+# Busca vários fornecedores de uma vez (?ids=1,2,3). Os que estão no cache
+# não vão ao banco; os demais saem em um único SELECT ... IN, compartilhado
+# com as requisições concorrentes (CarregadorEmLote). Ids inexistentes
+# aparecem no resultado com status 404. Lê do primário, como a busca por id:
+# o que é carregado aqui vai para o cache por id, que não pode guardar uma
+# versão atrasada da réplica.
+@router.get("/lote", response_model=List[ResultadoBuscaLoteResponse],
+            response_model_exclude_none=True)
+def buscar_fornecedores_em_lote(
+        ids: str = Query(pattern=PADRAO_IDS_LOTE),
+        db: Session = Depends(get_db),
+        cache: Cache = Depends(get_cache)) -> List[ResultadoBuscaLoteResponse]:
+    ids_pedidos = [int(id_fornecedor) for id_fornecedor in ids.split(",")]
+    encontrados = fornecedores_em_cache(ids_pedidos, cache)
+    faltantes = set(ids_pedidos) - encontrados.keys()
+    if faltantes:
+        geracao = geracao_fornecedores(faltantes, cache)
+        carregados = carregador_fornecedores.carregar(db, faltantes)
+        guardar_fornecedores_em_cache(carregados, cache, geracao)
+        encontrados.update(carregados)
+    return resultados_lote_fornecedores(ids_pedidos, encontrados)
+
+
+# Resultados ordenados do nome mais parecido com o termo para o menos
+# parecido (índice de trigramas no Postgres).
+@router.get("/busca", response_model=List[FornecedorClienteResponse])
+def buscar_fornecedor_cliente(
+        response: Response,
+        q: str = Query(min_length=TAMANHO_MINIMO_TERMO, max_length=255),
+        limite: int = Query(LIMITE_BUSCA_PADRAO, ge=1, le=LIMITE_BUSCA_MAXIMO),
+        db: Session = Depends(get_db_leitura)) -> List[FornecedorClienteResponse]:
+    fornecedores = buscar(db, select(*COLUNAS_RESPOSTA), FornecedorCliente.nome,
+                          q, limite, FornecedorCliente.id)
+    return resposta_json_rapida(fornecedores, response)
 
 
 @router.get("/{id_fornecedor}", response_model=FornecedorClienteResponse)
-def obter_fornecedor(id_fornecedor: int, db: Session = Depends(get_db)) -> \
+def obter_fornecedor(id_fornecedor: int, request: Request, response: Response,
+                     db: Session = Depends(get_db),
+                     cache: Cache = Depends(get_cache)) -> \
         List[FornecedorClienteResponse]:
-    return buscar_fornecedor_por_id(id_fornecedor, db)
+    chave = chave_cache_fornecedor(id_fornecedor)
+    fornecedor = cache.obter(chave)
+    if fornecedor is None:
+        geracao = cache.geracao(chave)
+        fornecedor = FornecedorClienteResponse.model_validate(
+            buscar_fornecedor_por_id(id_fornecedor, db)).model_dump()
+        cache.definir(chave, fornecedor, geracao)
+    validador_de_conteudo(fornecedor).aplicar(request, response)
+    return fornecedor
 
 
 @router.post("", response_model=FornecedorClienteResponse, status_code=201)
 def criar_fornecedor(fornecedor: FornecedorClienteRequest,
-                     db: Session = Depends(
-                         get_db)) -> FornecedorClienteResponse:
-    novo_fornecedor = FornecedorCliente(**fornecedor.dict())
-    db.add(novo_fornecedor)
-    db.commit()
-    db.refresh(novo_fornecedor)
-    return novo_fornecedor
+                     db: Session = Depends(get_db),
+                     idempotente: Idempotencia = Depends(
+                         idempotencia("fornecedor"))) -> FornecedorClienteResponse:
+    def inserir() -> dict:
+        novo_fornecedor = db.execute(
+            insert(FornecedorCliente).values(**fornecedor.dict())
+            .returning(*COLUNAS_RESPOSTA)).one()
+        return novo_fornecedor._asdict()
+
+    return idempotente.executar(db, fornecedor, inserir)
 
 
 @router.put("/{id_fornecedor}", response_model=FornecedorClienteResponse,
             status_code=200)
 def atualizar_fornecedor(id_fornecedor: int,
                          fornecedor: FornecedorClienteRequest,
-                         db: Session = Depends(
-                             get_db)) -> FornecedorClienteResponse:
-    fornecedor_a_ser_alterado = buscar_fornecedor_por_id(id_fornecedor, db)
-    fornecedor_a_ser_alterado.nome = fornecedor.nome
-    db.add(fornecedor_a_ser_alterado)
+                         db: Session = Depends(get_db),
+                         cache: Cache = Depends(
+                             get_cache)) -> FornecedorClienteResponse:
+    fornecedor_alterado = db.execute(
+        consulta_atualizar_fornecedor(id_fornecedor, fornecedor)).one_or_none()
+    if fornecedor_alterado is None:
+        raise NotFound("Fornecedor")
     db.commit()
-    db.refresh(fornecedor_a_ser_alterado)
-    return fornecedor_a_ser_alterado
+    cache.remover(chave_cache_fornecedor(id_fornecedor))
+    return fornecedor_alterado
 
 
 @router.delete("/{id_fornecedor}", status_code=204)
-def deletar_fornecedor(id_fornecedor: int, db: Session = Depends(get_db)):
-    fornecedor_a_ser_deletado = buscar_fornecedor_por_id(id_fornecedor, db)
-    db.delete(fornecedor_a_ser_deletado)
+def deletar_fornecedor(id_fornecedor: int, db: Session = Depends(get_db),
+                       cache: Cache = Depends(get_cache)):
+    fornecedor_deletado = db.execute(
+        consulta_deletar_fornecedor(id_fornecedor)).one_or_none()
+    if fornecedor_deletado is None:
+        raise NotFound("Fornecedor")
     db.commit()
+    cache.remover(chave_cache_fornecedor(id_fornecedor))
+
+
+# Assim como nas contas, cada escrita é um único comando com RETURNING.
+def consulta_atualizar_fornecedor(id_fornecedor: int,
+                                  fornecedor: FornecedorClienteRequest):
+    return update(FornecedorCliente) \
+        .where(FornecedorCliente.id == id_fornecedor) \
+        .values(nome=fornecedor.nome) \
+        .returning(*COLUNAS_RESPOSTA) \
+        .execution_options(synchronize_session=False)
+
+
+def consulta_deletar_fornecedor(id_fornecedor: int):
+    return delete(FornecedorCliente) \
+        .where(FornecedorCliente.id == id_fornecedor) \
+        .returning(FornecedorCliente.id) \
+        .execution_options(synchronize_session=False)
+
+
+def chave_cache_fornecedor(id_fornecedor: int) -> str:
+    return f"fornecedor:{id_fornecedor}"
+
+
+def consulta_fornecedores_por_ids(ids: set[int]):
+    return select(*COLUNAS_RESPOSTA).where(FornecedorCliente.id.in_(ids))
+
+
+def carregar_fornecedores(db: Session, ids: set[int]) -> dict[int, dict]:
+    return {fornecedor.id: fornecedor._asdict()
+            for fornecedor in db.execute(consulta_fornecedores_por_ids(ids))}
+
+
+carregador_fornecedores = CarregadorEmLote(carregar_fornecedores)
+
+
+def fornecedores_em_cache(ids: list[int], cache: Cache) -> dict[int, dict]:
+    encontrados = {}
+    for id_fornecedor in dict.fromkeys(ids):
+        fornecedor = cache.obter(chave_cache_fornecedor(id_fornecedor))
+        if fornecedor is not None:
+            encontrados[id_fornecedor] = fornecedor
+    return encontrados
+
+
+def geracao_fornecedores(ids: set[int], cache: Cache):
+    return cache.geracao(*(chave_cache_fornecedor(id_fornecedor) for id_fornecedor in ids))
+
+
+def guardar_fornecedores_em_cache(fornecedores: dict[int, dict], cache: Cache,
+                                  geracao) -> None:
+    for id_fornecedor, fornecedor in fornecedores.items():
+        cache.definir(chave_cache_fornecedor(id_fornecedor), fornecedor, geracao)
+
+
+def resultados_lote_fornecedores(ids: list[int], encontrados: dict[int, dict]) -> \
+        List[ResultadoBuscaLoteResponse]:
+    return [
+        ResultadoBuscaLoteResponse(id=id_fornecedor, status=200,
+                                   fornecedor=encontrados[id_fornecedor])
+        if id_fornecedor in encontrados else
+        ResultadoBuscaLoteResponse(id=id_fornecedor, status=404,
+                                   message="Fornecedor não encontrado")
+        for id_fornecedor in ids
+    ]
 
 
 def buscar_fornecedor_por_id(id_fornecedor: int,
@@ -0,0 +1,147 @@
+"""Confere a tabela saldo_fornecedor contra as contas e, se pedido, a
+reconstrói do zero.
+
+Uso:
+    python -m contas_a_pagar_e_receber.saldo               # só verifica
+    python -m contas_a_pagar_e_receber.saldo --reconstruir
+
+Sai com código 1 quando encontra divergências e não reconstrói.
+"""
+import argparse
+import sys
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import Connection, case, create_engine, delete, func, insert, \
+    literal, select, text, union_all
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber, SaldoFornecedor, \
+    SEM_FORNECEDOR, TOTAL_GERAL
+from shared import config
+
+TOLERANCIA = Decimal("0.000001")
+
+
+def _total_por_tipo(tipo: str):
+    return func.coalesce(func.sum(case(
+        (ContaPagarReceber.tipo == tipo, func.coalesce(ContaPagarReceber.valor, 0)),
+        else_=0)), 0)
+
+
+# Uma linha por fornecedor e a do total geral, como os triggers mantêm.
+def consulta_saldo_calculado():
+    fornecedor_id = func.coalesce(ContaPagarReceber.fornecedor_id, SEM_FORNECEDOR)
+    totais = (func.count().label("quantidade"),
+              _total_por_tipo("PAGAR").label("total_pagar"),
+              _total_por_tipo("RECEBER").label("total_receber"))
+    return union_all(
+        select(fornecedor_id.label("fornecedor_id"), *totais).group_by(fornecedor_id),
+        select(literal(TOTAL_GERAL).label("fornecedor_id"), *totais))
+
+
+def verificar_saldo(conexao: Connection) -> list[dict]:
+    esperado = {linha.fornecedor_id: linha
+                for linha in conexao.execute(consulta_saldo_calculado())}
+    atual = {linha.fornecedor_id: linha
+             for linha in conexao.execute(select(SaldoFornecedor.__table__))
+             if linha.quantidade}
+
+    divergencias = []
+    for fornecedor_id in sorted(esperado.keys() | atual.keys()):
+        valores_esperados = _valores(esperado.get(fornecedor_id))
+        valores_atuais = _valores(atual.get(fornecedor_id))
+        if any(abs(a - b) > TOLERANCIA
+               for a, b in zip(valores_esperados, valores_atuais)):
+            divergencias.append({"fornecedor_id": fornecedor_id,
+                                 "esperado": valores_esperados,
+                                 "atual": valores_atuais})
+    return divergencias
+
+
+def _valores(linha) -> tuple[Decimal, Decimal, Decimal]:
+    if linha is None:
+        return Decimal(0), Decimal(0), Decimal(0)
+    return (Decimal(linha.quantidade), Decimal(str(linha.total_pagar)),
+            Decimal(str(linha.total_receber)))
+
+
+# Trava as linhas de saldo_fornecedor de um lote em ordem de fornecedor_id,
+# antes do INSERT/UPDATE/DELETE nas contas. Sem isso o trigger de cada linha
+# trava os saldos na ordem em que as contas são escritas, e dois lotes
+# concorrentes com fornecedores em ordens opostas morrem por deadlock. As
+# linhas que faltam são criadas zeradas (verificar_saldo ignora as que têm
+# quantidade 0). Quem também trava contas deve travá-las antes, por id: é a
+# mesma ordem das rotas de uma conta (a conta e depois o saldo, pelo
+# trigger). A linha TOTAL_GERAL não entra aqui: os triggers sempre a travam
+# depois dos fornecedores. No SQLite a escrita já é exclusiva no banco
+# inteiro.
+def bloquear_saldos(db: Session, fornecedores: Iterable[Optional[int]]) -> None:
+    for consulta in _consultas_bloqueio_saldos(db, fornecedores):
+        db.execute(consulta)
+
+
+async def bloquear_saldos_async(db: AsyncSession,
+                                fornecedores: Iterable[Optional[int]]) -> None:
+    for consulta in _consultas_bloqueio_saldos(db, fornecedores):
+        await db.execute(consulta)
+
+
+def _consultas_bloqueio_saldos(db: Session | AsyncSession,
+                               fornecedores: Iterable[Optional[int]]) -> list:
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+    chaves = sorted({SEM_FORNECEDOR if fornecedor is None else fornecedor
+                     for fornecedor in fornecedores})
+    if not chaves:
+        return []
+    return [
+        postgresql.insert(SaldoFornecedor).values([
+            {"fornecedor_id": chave, "quantidade": 0, "total_pagar": 0,
+             "total_receber": 0}
+            for chave in chaves]).on_conflict_do_nothing(),
+        select(SaldoFornecedor.fornecedor_id)
+        .where(SaldoFornecedor.fornecedor_id.in_(chaves))
+        .order_by(SaldoFornecedor.fornecedor_id).with_for_update(),
+    ]
+
+
+def reconstruir_saldo(conexao: Connection) -> None:
+    # No Postgres o lock SHARE bloqueia escritas em contas (leituras seguem)
+    # até o commit, então nenhum trigger roda no meio da reconstrução.
+    if conexao.dialect.name == "postgresql":
+        conexao.execute(text("LOCK TABLE contas_a_pagar_e_receber IN SHARE MODE"))
+    conexao.execute(delete(SaldoFornecedor))
+    conexao.execute(insert(SaldoFornecedor).from_select(
+        ["fornecedor_id", "quantidade", "total_pagar", "total_receber"],
+        consulta_saldo_calculado()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=config.DATABASE_URL)
+    parser.add_argument("--reconstruir", action="store_true",
+                        help="recria a tabela a partir das contas")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    with engine.begin() as conexao:
+        divergencias = verificar_saldo(conexao)
+        for divergencia in divergencias:
+            print("fornecedor {fornecedor_id}: esperado={esperado} "
+                  "atual={atual}".format(**divergencia))
+        if args.reconstruir:
+            reconstruir_saldo(conexao)
+            print("saldo_fornecedor reconstruída")
+        elif not divergencias:
+            print("saldo_fornecedor consistente")
+    engine.dispose()
+
+    if divergencias and not args.reconstruir:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
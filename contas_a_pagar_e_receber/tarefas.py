@@ -0,0 +1,105 @@
+"""Executa a fila de tarefas em segundo plano (contas recorrentes e
+relatórios de conciliação) em um processo separado da API.
+
+Uso:
+    python -m contas_a_pagar_e_receber.tarefas --workers 4
+
+Útil com TAREFAS_WORKERS=0 na API, para que os workers HTTP só atendam
+requisições. Sem isso, cada processo da API já executa a fila com
+TAREFAS_WORKERS threads.
+"""
+import argparse
+import calendar
+import signal
+import threading
+from datetime import date
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber, SaldoFornecedor, \
+    TOTAL_GERAL
+from contas_a_pagar_e_receber.particoes import mes_de, somar_meses
+from contas_a_pagar_e_receber.saldo import verificar_saldo
+from shared import config
+from shared.tarefas import FilaTarefas, bloquear_por_chave, tarefa
+
+GERAR_CONTAS_RECORRENTES = "gerar_contas_recorrentes"
+RELATORIO_CONCILIACAO = "relatorio_conciliacao"
+
+
+def mesmo_dia_no_mes(vencimento: date, mes: date) -> date:
+    ultimo_dia = calendar.monthrange(mes.year, mes.month)[1]
+    return mes.replace(day=min(vencimento.day, ultimo_dia))
+
+
+# Repete no mês de destino as contas que vencem no mês de origem, no mesmo
+# dia (ou no último dia do mês, se ele for mais curto). Contas que já existem
+# no destino com a mesma descrição, tipo e fornecedor não são duplicadas,
+# então a tarefa pode ser reenviada para o mesmo mês. As execuções para o
+# mesmo mês de destino (de qualquer origem) rodam uma de cada vez: a segunda
+# só lê as contas existentes depois do commit da primeira.
+@tarefa(GERAR_CONTAS_RECORRENTES)
+def gerar_contas_recorrentes(db: Session, mes_origem: str, mes_destino: str) -> dict:
+    origem, destino = mes_de(mes_origem), mes_de(mes_destino)
+    bloquear_por_chave(db, f"{GERAR_CONTAS_RECORRENTES}:{destino:%Y-%m}")
+    colunas = (ContaPagarReceber.descricao, ContaPagarReceber.valor,
+               ContaPagarReceber.tipo, ContaPagarReceber.fornecedor_id,
+               ContaPagarReceber.data_vencimento)
+
+    def do_mes(mes: date):
+        return select(*colunas).where(
+            ContaPagarReceber.data_vencimento >= mes,
+            ContaPagarReceber.data_vencimento < somar_meses(mes, 1))
+
+    existentes = {(conta.descricao, conta.tipo, conta.fornecedor_id)
+                  for conta in db.execute(do_mes(destino))}
+    recorrentes = db.execute(do_mes(origem).order_by(ContaPagarReceber.id)).all()
+    novas = [{"descricao": conta.descricao, "valor": conta.valor,
+              "tipo": conta.tipo, "fornecedor_id": conta.fornecedor_id,
+              "data_vencimento": mesmo_dia_no_mes(conta.data_vencimento, destino)}
+             for conta in recorrentes
+             if (conta.descricao, conta.tipo, conta.fornecedor_id) not in existentes]
+    if novas:
+        db.execute(insert(ContaPagarReceber), novas)
+    return {"geradas": len(novas), "ja_existentes": len(recorrentes) - len(novas)}
+
+
+# Confere saldo_fornecedor contra as contas (a mesma verificação do comando
+# contas_a_pagar_e_receber.saldo) e devolve os totais gerais.
+@tarefa(RELATORIO_CONCILIACAO)
+def relatorio_conciliacao(db: Session) -> dict:
+    divergencias = verificar_saldo(db.connection())
+    totais = db.execute(select(
+        SaldoFornecedor.quantidade, SaldoFornecedor.total_pagar,
+        SaldoFornecedor.total_receber,
+    ).where(SaldoFornecedor.fornecedor_id == TOTAL_GERAL)).one_or_none()
+    # Decimal vira número para caber na coluna JSON da tarefa.
+    return jsonable_encoder({"consistente": not divergencias,
+                             "divergencias": divergencias,
+                             "totais": totais._asdict() if totais else
+                             {"quantidade": 0, "total_pagar": 0, "total_receber": 0}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=config.DATABASE_URL)
+    parser.add_argument("--workers", type=int, default=max(config.TAREFAS_WORKERS, 1))
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    fila = FilaTarefas(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    parar = threading.Event()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *_: parar.set())
+
+    fila.iniciar(args.workers)
+    print(f"{args.workers} workers aguardando tarefas")
+    parar.wait()
+    fila.parar()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Uso: gunicorn main:app
+# (o gunicorn carrega este arquivo automaticamente a partir do diretório atual)
+import glob
+import os
+import tempfile
+
+# Cada worker tem as suas métricas; no modo multiprocesso do
+# prometheus_client elas vão para arquivos neste diretório e /metricas soma
+# todos os workers. Tem que ser definido antes de qualquer import de shared
+# (que importa o prometheus_client), e os arquivos de uma execução anterior
+# são apagados.
+if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    for arquivo in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(arquivo)
+else:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="metricas-")
+
+from shared.config import WEB_BACKLOG, WEB_HOST, WEB_KEEPALIVE, WEB_PORT, \
+    WEB_WORKERS
+
+bind = f"{WEB_HOST}:{WEB_PORT}"
+workers = WEB_WORKERS
+worker_class = "shared.servidor.UvicornWorkerOtimizado"
+keepalive = WEB_KEEPALIVE
+backlog = WEB_BACKLOG
+
+# A aplicação é importada uma vez no master e compartilhada com os workers
+# (copy-on-write). Os engines só são criados no startup de cada worker; o
+# post_fork descarta, por garantia, qualquer conexão herdada do master.
+preload_app = True
+graceful_timeout = 30
+
+
+def on_starting(server):
+    from shared.servidor import desativar_cache_local
+
+    desativar_cache_local(server.cfg.workers)
+
+
+def post_fork(server, worker):
+    from shared.database import descartar_conexoes_herdadas
+
+    descartar_conexoes_herdadas()
+
+
+# Worker que morreu sem passar pelo shutdown: os gauges dele saem da soma.
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,10 +1,20 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 
 # from shared.database import Base, engine
 from contas_a_pagar_e_receber.routers import contas_a_pagar_e_receber_router, \
     fornecedor_cliente_router
-from shared.exceptions import NotFound
-from shared.exceptions_handler import not_found_exception_handler
+from shared import config, database, metricas, metricas_router, tarefas_router
+from shared.exceptions import NotFound, CursorInvalido, NaoModificado, \
+    ChaveIdempotenciaReutilizada
+from shared.exceptions_handler import not_found_exception_handler, \
+    cursor_invalido_exception_handler, nao_modificado_exception_handler, \
+    chave_idempotencia_reutilizada_exception_handler
+from shared.compressao import MiddlewareCompressao
+from shared.instrumentacao import MiddlewareInstrumentacao
+from shared.tarefas import fila
 
 # from contas_a_pagar_e_receber.models import (
 #     ContaPagarReceber,
@@ -12,11 +22,72 @@ from shared.exceptions_handler import not_found_exception_handler
 # Base.metadata.drop_all(bind=engine)
 # Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
 
-app.include_router(contas_a_pagar_e_receber_router.router)
-app.include_router(fornecedor_cliente_router.router)
-app.add_exception_handler(NotFound, not_found_exception_handler)
+def criar_app(database_async: bool = config.DATABASE_ASYNC) -> FastAPI:
+    # Os engines nascem no startup de cada worker e são descartados no
+    # shutdown; importar este módulo não toca no banco. A fila de tarefas
+    # para antes dos engines, esperando as tarefas em andamento.
+    @asynccontextmanager
+    async def ciclo_de_vida(_: FastAPI):
+        database.iniciar_engines(database_async)
+        await database.aquecer_engines(config.DB_POOL_AQUECIMENTO)
+        fila.iniciar(config.TAREFAS_WORKERS)
+        try:
+            yield
+        finally:
+            await run_in_threadpool(fila.parar)
+            await database.encerrar_engines()
+            metricas.encerrar_metricas_do_processo()
+
+    app = FastAPI(lifespan=ciclo_de_vida)
+
+    app.include_router(contas_a_pagar_e_receber_router.router)
+    app.include_router(fornecedor_cliente_router.router)
+    app.include_router(metricas_router.router)
+    app.include_router(tarefas_router.router)
+    if database_async:
+        # Importados só no modo async, fora do caminho de importação padrão.
+        from contas_a_pagar_e_receber.routers import \
+            contas_a_pagar_e_receber_async_router, fornecedor_cliente_async_router
+
+        app.include_router(contas_a_pagar_e_receber_async_router.router)
+        app.include_router(fornecedor_cliente_async_router.router)
+    _remover_rotas_substituidas(app)
+
+    app.add_exception_handler(NotFound, not_found_exception_handler)
+    app.add_exception_handler(CursorInvalido, cursor_invalido_exception_handler)
+    app.add_exception_handler(NaoModificado, nao_modificado_exception_handler)
+    app.add_exception_handler(ChaveIdempotenciaReutilizada,
+                              chave_idempotencia_reutilizada_exception_handler)
+    # O último middleware adicionado é o mais externo: a compressão fica
+    # dentro da instrumentação e entra no tempo total da requisição.
+    app.add_middleware(MiddlewareCompressao)
+    app.add_middleware(MiddlewareInstrumentacao)
+    return app
+
+
+# No modo async as rotas assíncronas são registradas por último e ocupam a
+# posição da versão síncrona equivalente (mesmo caminho e método). Manter a
+# ordem dos routers síncronos garante que as rotas sem versão async
+# continuem antes de /{id}. Ficam síncronas, no threadpool: /exportar, que
+# mantém um cursor no servidor enquanto o corpo é enviado (ver
+# shared.exportacao), as rotas que enfileiram tarefas (/recorrentes,
+# /conciliacao), porque FilaTarefas usa Session e acorda workers em threads,
+# e /tarefas/{id}.
+def _remover_rotas_substituidas(app: FastAPI) -> None:
+    posicoes = {}
+    rotas = []
+    for rota in app.router.routes:
+        chave = (rota.path, frozenset(getattr(rota, "methods", None) or ()))
+        if chave in posicoes:
+            rotas[posicoes[chave]] = rota
+        else:
+            posicoes[chave] = len(rotas)
+            rotas.append(rota)
+    app.router.routes[:] = rotas
+
+
+app = criar_app()
 
 if __name__ == "__main__":
     import uvicorn
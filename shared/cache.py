@@ -0,0 +1,249 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from prometheus_client import Counter
+
+from shared import config
+
+logger = logging.getLogger(__name__)
+
+CACHE_ACERTOS = Counter("cache_acertos", "Leituras atendidas pelo cache",
+                        ["backend"])
+CACHE_FALHAS = Counter("cache_falhas", "Leituras que precisaram ir ao banco",
+                       ["backend"])
+CACHE_ERROS = Counter("cache_erros", "Operações que falharam no backend do cache",
+                      ["backend"])
+
+
+# Leitura com cache (read-through): obter; se faltar, geracao antes de ler
+# do banco e definir com ela. Sem a geração, uma leitura que carregou a
+# linha antes de um PUT/DELETE concorrente gravaria a versão antiga depois da
+# invalidação, e ela seria servida até o TTL.
+class Cache:
+    backend = "nulo"
+
+    def __init__(self):
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave: str) -> Optional[Any]:
+        valor = self._obter(chave)
+        if valor is None:
+            self.falhas += 1
+            CACHE_FALHAS.labels(self.backend).inc()
+        else:
+            self.acertos += 1
+            CACHE_ACERTOS.labels(self.backend).inc()
+        return valor
+
+    # Marca opaca do estado de invalidação de `chaves`; definir com ela não
+    # grava a chave se ela foi invalidada depois que a marca foi tirada.
+    def geracao(self, *chaves: str) -> Any:
+        return None
+
+    def definir(self, chave: str, valor: Any, geracao: Any = None) -> None:
+        pass
+
+    def remover(self, *chaves: str) -> None:
+        pass
+
+    def limpar(self) -> None:
+        pass
+
+    def _obter(self, chave: str) -> Optional[Any]:
+        return None
+
+    def status(self) -> dict:
+        return {"backend": self.backend, "acertos": self.acertos,
+                "falhas": self.falhas}
+
+
+class CacheEmMemoria(Cache):
+    backend = "memoria"
+
+    def __init__(self, max_itens: int = config.CACHE_MAX_ITENS,
+                 ttl: float = config.CACHE_TTL,
+                 relogio: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._relogio = relogio
+        self._itens: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        # A geração é o número de invalidações. Cada chave invalidada guarda
+        # o número da sua última invalidação, com no máximo max_itens chaves;
+        # as descartadas sobem o piso, que vale para todas as chaves.
+        self._invalidacoes = 0
+        self._invalidadas: OrderedDict[str, int] = OrderedDict()
+        self._piso = 0
+
+    def _obter(self, chave: str) -> Optional[Any]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em <= self._relogio():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def geracao(self, *chaves: str) -> int:
+        with self._lock:
+            return self._invalidacoes
+
+    def definir(self, chave: str, valor: Any, geracao: Optional[int] = None) -> None:
+        with self._lock:
+            if geracao is not None and \
+                    self._invalidadas.get(chave, self._piso) > geracao:
+                return
+            self._itens[chave] = (self._relogio() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def remover(self, *chaves: str) -> None:
+        with self._lock:
+            for chave in chaves:
+                self._itens.pop(chave, None)
+                self._invalidacoes += 1
+                self._invalidadas[chave] = self._invalidacoes
+                self._invalidadas.move_to_end(chave)
+            while len(self._invalidadas) > self.max_itens:
+                _, invalidacao = self._invalidadas.popitem(last=False)
+                self._piso = max(self._piso, invalidacao)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self._invalidacoes += 1
+            self._invalidadas.clear()
+            self._piso = self._invalidacoes
+
+    def status(self) -> dict:
+        return {**super().status(), "itens": len(self._itens),
+                "max_itens": self.max_itens}
+
+
+class CacheRedis(Cache):
+    backend = "redis"
+
+    # cliente: qualquer objeto com a interface do redis.Redis (get, set com
+    # ex=, delete e scan_iter), o que permite usar um fake local nos testes.
+    # excecoes: exceções do cliente tratadas como Redis indisponível (padrão:
+    # redis.RedisError). Nesse caso a leitura vira falha e vai ao banco, e a
+    # escrita e a invalidação são ignoradas: o que ficou no Redis expira
+    # pelo ttl.
+    #
+    # A geração de cada chave é um contador no Redis, incrementado a cada
+    # invalidação e gravado junto com o valor; na leitura, valor de geração
+    # diferente da atual é descartado. O contador dura o dobro do ttl, mais
+    # que qualquer valor gravado com a geração anterior.
+    def __init__(self, cliente, ttl: float = config.CACHE_TTL,
+                 prefixo: str = "curso-fastapi:",
+                 excecoes: Optional[tuple[type[Exception], ...]] = None):
+        super().__init__()
+        if excecoes is None:
+            import redis
+
+            excecoes = (redis.RedisError,)
+        self.cliente = cliente
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self.excecoes = excecoes
+        self.erros = 0
+
+    def _obter(self, chave: str) -> Optional[Any]:
+        try:
+            valor, geracao = self.cliente.mget(
+                [self.prefixo + chave, self._chave_geracao(chave)])
+        except self.excecoes:
+            self._registrar_erro("ler", chave)
+            return None
+        if valor is None:
+            return None
+        geracao_gravada, valor = json.loads(valor)
+        return valor if geracao_gravada == int(geracao or 0) else None
+
+    # {chave: geração}; vazio com o Redis indisponível, e aí definir não grava.
+    def geracao(self, *chaves: str) -> dict[str, int]:
+        try:
+            geracoes = self.cliente.mget([self._chave_geracao(chave) for chave in chaves])
+        except self.excecoes:
+            self._registrar_erro("ler a geração de", *chaves)
+            return {}
+        return {chave: int(geracao or 0) for chave, geracao in zip(chaves, geracoes)}
+
+    def definir(self, chave: str, valor: Any,
+                geracao: Optional[dict[str, int]] = None) -> None:
+        if geracao is not None and chave not in geracao:
+            return
+        try:
+            if geracao is None:
+                atual = int(self.cliente.get(self._chave_geracao(chave)) or 0)
+            else:
+                atual = geracao[chave]
+            self.cliente.set(self.prefixo + chave, json.dumps([atual, valor]),
+                             ex=max(int(self.ttl), 1))
+        except self.excecoes:
+            self._registrar_erro("gravar", chave)
+
+    def remover(self, *chaves: str) -> None:
+        if not chaves:
+            return
+        try:
+            pipeline = self.cliente.pipeline()
+            for chave in chaves:
+                pipeline.incr(self._chave_geracao(chave))
+                pipeline.expire(self._chave_geracao(chave), 2 * max(int(self.ttl), 1))
+            pipeline.delete(*(self.prefixo + chave for chave in chaves))
+            pipeline.execute()
+        except self.excecoes:
+            self._registrar_erro("invalidar", *chaves)
+
+    def limpar(self) -> None:
+        try:
+            chaves = list(self.cliente.scan_iter(match=self.prefixo + "*"))
+            if chaves:
+                self.cliente.delete(*chaves)
+        except self.excecoes:
+            self._registrar_erro("limpar")
+
+    def _chave_geracao(self, chave: str) -> str:
+        return f"{self.prefixo}geracao:{chave}"
+
+    def _registrar_erro(self, operacao: str, *chaves: str) -> None:
+        self.erros += 1
+        CACHE_ERROS.labels(self.backend).inc()
+        logger.warning("Redis indisponível ao %s o cache %s", operacao,
+                       ", ".join(chaves), exc_info=True)
+
+    def status(self) -> dict:
+        return {**super().status(), "erros": self.erros}
+
+
+def criar_cache(backend: str = config.CACHE_BACKEND) -> Cache:
+    if backend == "memoria":
+        return CacheEmMemoria()
+    if backend == "redis":
+        import redis
+
+        return CacheRedis(redis.Redis.from_url(
+            config.REDIS_URL, socket_timeout=config.REDIS_TIMEOUT,
+            socket_connect_timeout=config.REDIS_TIMEOUT))
+    return Cache()
+
+
+cache = criar_cache()
+
+
+# Troca o cache de todo o processo; get_cache e /metricas/cache leem o
+# atributo deste módulo a cada requisição.
+def substituir_cache(novo: Cache) -> None:
+    global cache
+    cache = novo
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Iterable
+
+
+class _Lote:
+    def __init__(self):
+        self.ids: set = set()
+        self.resultado: dict = {}
+        self.erro: Exception | None = None
+        self.pronto = threading.Event()
+
+
+# Junta em uma só consulta os ids pedidos por requisições concorrentes, no
+# estilo do DataLoader. Enquanto um lote está no banco, as requisições que
+# chegam acumulam seus ids no lote seguinte; a primeira delas (a líder)
+# espera o lote atual terminar e busca todos de uma vez, e as demais só
+# aguardam o resultado. Sem concorrência a consulta sai na hora, sem janela
+# de espera.
+#
+# carregar(db, ids) recebe a sessão da líder e devolve {id: valor}; ids sem
+# valor no dicionário não foram encontrados.
+class CarregadorEmLote:
+    def __init__(self, carregar: Callable[[Any, set], dict]):
+        self._carregar = carregar
+        self._pendente: _Lote | None = None
+        self._lock = threading.Lock()
+        self._execucao = threading.Lock()
+        self.consultas = 0
+
+    def carregar(self, db, ids: Iterable) -> dict:
+        ids = set(ids)
+        with self._lock:
+            lider = self._pendente is None
+            if lider:
+                self._pendente = _Lote()
+            lote = self._pendente
+            lote.ids.update(ids)
+
+        if lider:
+            with self._execucao:
+                with self._lock:
+                    self._pendente = None
+                try:
+                    self.consultas += 1
+                    lote.resultado = self._carregar(db, lote.ids)
+                except Exception as erro:
+                    lote.erro = erro
+                finally:
+                    lote.pronto.set()
+        else:
+            lote.pronto.wait()
+
+        if lote.erro is not None:
+            raise lote.erro
+        return {id_: lote.resultado[id_] for id_ in ids if id_ in lote.resultado}
+
+
+class _LoteAsync:
+    def __init__(self):
+        self.ids: set = set()
+        self.resultado: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+# Mesma ideia para as rotas assíncronas, com um Future por lote.
+class CarregadorEmLoteAsync:
+    def __init__(self, carregar: Callable[[Any, set], Awaitable[dict]]):
+        self._carregar = carregar
+        self._pendente: _LoteAsync | None = None
+        self._execucao: asyncio.Lock | None = None
+        self.consultas = 0
+
+    async def carregar(self, db, ids: Iterable) -> dict:
+        ids = set(ids)
+        # O lock é criado no primeiro uso, já dentro do event loop do worker.
+        if self._execucao is None:
+            self._execucao = asyncio.Lock()
+        while True:
+            lider = self._pendente is None
+            if lider:
+                self._pendente = _LoteAsync()
+            lote = self._pendente
+            lote.ids.update(ids)
+
+            if lider:
+                try:
+                    # Cede a vez uma rodada para que as requisições que
+                    # chegaram no mesmo ciclo do event loop entrem neste lote.
+                    await asyncio.sleep(0)
+                    async with self._execucao:
+                        if self._pendente is lote:
+                            self._pendente = None
+                        self.consultas += 1
+                        lote.resultado.set_result(await self._carregar(db, lote.ids))
+                except Exception as erro:
+                    lote.resultado.set_exception(erro)
+                finally:
+                    # Líder cancelada antes ou durante a consulta: o lote sai
+                    # de _pendente (senão as próximas chamadas esperariam por
+                    # ele para sempre) e o Future é cancelado.
+                    if self._pendente is lote:
+                        self._pendente = None
+                    if not lote.resultado.done():
+                        lote.resultado.cancel()
+            try:
+                resultado = await asyncio.shield(lote.resultado)
+            except asyncio.CancelledError:
+                # As demais não foram canceladas: refazem o pedido em um
+                # novo lote.
+                if lote.resultado.cancelled() and \
+                        not asyncio.current_task().cancelling():
+                    continue
+                raise
+            return {id_: resultado[id_] for id_ in ids if id_ in resultado}
@@ -0,0 +1,194 @@
+import zlib
+from typing import Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from shared import config
+
+# Brotli e zstd vêm do extra "compressao" (poetry install -E compressao); sem
+# eles a negociação fica só com o gzip da biblioteca padrão.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Níveis pensados para respostas geradas a cada requisição: boa parte do
+# ganho de tamanho com pouco custo de CPU (benchmarks/benchmark_compressao).
+NIVEIS = {"gzip": 6, "br": 4, "zstd": 3}
+
+TIPOS_COMPRIMIVEIS = ("text/", "application/json", "application/x-ndjson",
+                      "application/problem+json", "application/xml")
+
+
+class _Gzip:
+    def __init__(self, nivel: int):
+        # wbits=31: formato gzip (cabeçalho e CRC), não zlib puro.
+        self._compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._compressor.compress(dados)
+
+    def finalizar(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, nivel: int):
+        self._compressor = brotli.Compressor(quality=nivel)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._compressor.process(dados)
+
+    def finalizar(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self, nivel: int):
+        self._compressor = zstandard.ZstdCompressor(level=nivel).compressobj()
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._compressor.compress(dados)
+
+    def finalizar(self) -> bytes:
+        return self._compressor.flush()
+
+
+COMPRESSORES = {"gzip": _Gzip}
+if brotli is not None:
+    COMPRESSORES["br"] = _Brotli
+if zstandard is not None:
+    COMPRESSORES["zstd"] = _Zstd
+
+
+def comprimir(codificacao: str, dados: bytes, nivel: Optional[int] = None) -> bytes:
+    compressor = COMPRESSORES[codificacao](nivel if nivel is not None
+                                           else NIVEIS[codificacao])
+    return compressor.comprimir(dados) + compressor.finalizar()
+
+
+# Escolhe, entre as codificações do servidor, a de maior q no Accept-Encoding
+# do cliente; no empate vale a ordem do servidor. None = sem compressão.
+def escolher_codificacao(accept_encoding: str,
+                         codificacoes: Sequence[str]) -> Optional[str]:
+    aceitas = {}
+    for item in accept_encoding.split(","):
+        nome, *parametros = item.split(";")
+        peso = 1.0
+        for parametro in parametros:
+            chave, _, valor = parametro.strip().partition("=")
+            if chave == "q":
+                try:
+                    peso = float(valor)
+                except ValueError:
+                    peso = 0.0
+        if nome.strip():
+            aceitas[nome.strip().lower()] = peso
+    candidatas = [(aceitas.get(nome, aceitas.get("*", 0.0)), -indice, nome)
+                  for indice, nome in enumerate(codificacoes)]
+    peso, _, nome = max(candidatas, default=(0.0, 0, None))
+    return nome if peso > 0 else None
+
+
+def comprimivel(tipo_conteudo: str) -> bool:
+    return tipo_conteudo.startswith(TIPOS_COMPRIMIVEIS)
+
+
+# Comprime as respostas conforme o Accept-Encoding. Corpos completos abaixo
+# de `minimo` bytes saem como estão; respostas em partes (StreamingResponse,
+# exportações) são comprimidas parte a parte, sem juntar o corpo em memória,
+# e vão sem Content-Length. O ETag de uma resposta comprimida vira fraco: os
+# bytes mudaram, mas o conteúdo é o mesmo (o Validador ignora o W/).
+# Toda resposta de tipo comprimível leva Vary: Accept-Encoding, comprimida ou
+# não: sem isso um cache compartilhado guardaria a versão sem compressão (de
+# um cliente sem Accept-Encoding) e a serviria a todos, ou o contrário.
+class MiddlewareCompressao:
+    def __init__(self, app, codificacoes: Sequence[str] = config.COMPRESSAO_ALGORITMOS,
+                 minimo: int = config.COMPRESSAO_MINIMO,
+                 niveis: Optional[dict[str, int]] = None):
+        self.app = app
+        self.codificacoes = [nome for nome in codificacoes if nome in COMPRESSORES]
+        self.minimo = minimo
+        self.niveis = {**NIVEIS, **(niveis or {})}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.codificacoes:
+            await self.app(scope, receive, send)
+            return
+        codificacao = escolher_codificacao(
+            Headers(scope=scope).get("accept-encoding", ""), self.codificacoes)
+        nivel = self.niveis[codificacao] if codificacao else None
+        envio = _EnvioComprimido(send, codificacao, nivel, self.minimo)
+        await self.app(scope, receive, envio.enviar)
+
+
+# codificacao None: o cliente não aceita nenhuma das do servidor; a resposta
+# passa sem compressão, mas ainda recebe o Vary.
+class _EnvioComprimido:
+    def __init__(self, send, codificacao: Optional[str], nivel: Optional[int],
+                 minimo: int):
+        self._send = send
+        self._codificacao = codificacao
+        self._nivel = nivel
+        self._minimo = max(minimo, 1)
+        self._inicio = None
+        # None enquanto o primeiro pedaço do corpo não chega.
+        self._comprimir: Optional[bool] = None
+        self._compressor = None
+
+    async def enviar(self, message):
+        tipo = message["type"]
+        if tipo == "http.response.start":
+            self._inicio = message
+            cabecalhos = MutableHeaders(scope=message)
+            if "content-encoding" in cabecalhos or \
+                    not comprimivel(cabecalhos.get("content-type", "")):
+                self._comprimir = False
+                await self._send(message)
+                return
+            cabecalhos.add_vary_header("Accept-Encoding")
+            if self._codificacao is None:
+                self._comprimir = False
+                await self._send(message)
+            return
+        if tipo != "http.response.body" or self._comprimir is False:
+            await self._send(message)
+            return
+
+        corpo = message.get("body", b"")
+        mais = message.get("more_body", False)
+        if self._comprimir is None:
+            if not mais and len(corpo) < self._minimo:
+                self._comprimir = False
+                await self._send(self._inicio)
+                await self._send(message)
+                return
+            self._comprimir = True
+            self._compressor = COMPRESSORES[self._codificacao](self._nivel)
+            cabecalhos = MutableHeaders(scope=self._inicio)
+            cabecalhos["Content-Encoding"] = self._codificacao
+            etag = cabecalhos.get("etag")
+            if etag and not etag.startswith("W/"):
+                cabecalhos["ETag"] = f"W/{etag}"
+            if not mais:
+                corpo = self._compressor.comprimir(corpo) + self._compressor.finalizar()
+                cabecalhos["Content-Length"] = str(len(corpo))
+                await self._send(self._inicio)
+                await self._send({"type": tipo, "body": corpo, "more_body": False})
+                return
+            if "content-length" in cabecalhos:
+                del cabecalhos["Content-Length"]
+            await self._send(self._inicio)
+
+        # O compressor devolve bytes à medida que enche os blocos internos;
+        # pedaços que ainda não produziram saída não geram envio vazio.
+        dados = self._compressor.comprimir(corpo)
+        if not mais:
+            dados += self._compressor.finalizar()
+        if dados or not mais:
+            await self._send({"type": tipo, "body": dados, "more_body": mais})
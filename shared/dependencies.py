@@ -1,4 +1,8 @@
-from shared.database import SessionLocal
+import shared.cache
+from shared.cache import Cache
+from shared import database
+from shared.database import SessionLocal, AsyncSessionLocal, SessionLeitura, \
+    AsyncSessionLeitura
 
 
 def get_db():
@@ -7,3 +11,29 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Sessões somente leitura, ligadas a uma réplica (ou ao primário quando não
+# há réplica disponível). Não use para escritas. Os roteadores são lidos do
+# módulo database a cada chamada porque só existem depois do startup.
+def get_db_leitura():
+    db = SessionLeitura(bind=database.roteador_leitura.escolher())
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db_leitura():
+    bind = await database.roteador_leitura_async.escolher_async()
+    async with AsyncSessionLeitura(bind=bind) as db:
+        yield db
+
+
+def get_cache() -> Cache:
+    return shared.cache.cache
@@ -1,3 +1,18 @@
 class NotFound(Exception):
     def __init__(self, name: str):
         self.name = name
+
+
+class CursorInvalido(Exception):
+    def __init__(self, cursor: str):
+        self.cursor = cursor
+
+
+class NaoModificado(Exception):
+    def __init__(self, headers: dict[str, str]):
+        self.headers = headers
+
+
+class ChaveIdempotenciaReutilizada(Exception):
+    def __init__(self, chave: str):
+        self.chave = chave
@@ -1,9 +1,28 @@
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
-from shared.exceptions import NotFound
+from shared.exceptions import NotFound, CursorInvalido, NaoModificado, \
+    ChaveIdempotenciaReutilizada
 
 
 async def not_found_exception_handler(request: Request, exc: NotFound):
     return JSONResponse(status_code=404,
                         content={"message": f"{exc.name} não encontrado"})
+
+
+async def cursor_invalido_exception_handler(request: Request,
+                                            exc: CursorInvalido):
+    return JSONResponse(status_code=400,
+                        content={"message": "Cursor de paginação inválido"})
+
+
+async def nao_modificado_exception_handler(request: Request,
+                                           exc: NaoModificado):
+    return Response(status_code=304, headers=exc.headers)
+
+
+async def chave_idempotencia_reutilizada_exception_handler(
+        request: Request, exc: ChaveIdempotenciaReutilizada):
+    return JSONResponse(status_code=422,
+                        content={"message": "Idempotency-Key já usada com "
+                                            "outro conteúdo"})
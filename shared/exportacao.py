@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from enum import Enum
+from typing import Iterator
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+TAMANHO_LOTE_EXPORTACAO = 1000
+
+
+class FormatoExportacaoEnum(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    FormatoExportacaoEnum.NDJSON: "application/x-ndjson",
+    FormatoExportacaoEnum.CSV: "text/csv; charset=utf-8",
+}
+
+
+def _valor_json(valor):
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return float(valor)
+
+
+def _gerar_ndjson(lotes, colunas: list[str]) -> Iterator[str]:
+    for lote in lotes:
+        yield "".join(
+            json.dumps(dict(zip(colunas, linha)), default=_valor_json,
+                       ensure_ascii=False) + "\n"
+            for linha in lote
+        )
+
+
+def _gerar_csv(lotes, colunas: list[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for lote in lotes:
+        escritor.writerows(
+            [float(valor) if isinstance(valor, Decimal) else valor
+             for valor in linha]
+            for linha in lote
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Garante o envio do cabeçalho mesmo quando não há nenhuma linha.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def exportar(db: Session, consulta: Select, formato: FormatoExportacaoEnum,
+             nome_arquivo: str) -> StreamingResponse:
+    colunas = [coluna.key for coluna in consulta.selected_columns]
+    gerador = _gerar_ndjson if formato == FormatoExportacaoEnum.NDJSON \
+        else _gerar_csv
+
+    def conteudo() -> Iterator[str]:
+        # A dependência get_db já fechou a sessão quando o corpo começa a
+        # ser enviado; ela é reaberta aqui e mantém um cursor no servidor
+        # até a última linha, lendo TAMANHO_LOTE_EXPORTACAO linhas por vez.
+        try:
+            resultado = db.execute(
+                consulta.execution_options(yield_per=TAMANHO_LOTE_EXPORTACAO))
+            yield from gerador(resultado.partitions(), colunas)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        conteudo(),
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition":
+                 f'attachment; filename="{nome_arquivo}.{formato.value}"'},
+    )
@@ -0,0 +1,210 @@
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Depends, Header, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import JSON, Column, DateTime, Index, String, delete, insert, \
+    select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from shared import config
+from shared.database import Base
+from shared.exceptions import ChaveIdempotenciaReutilizada
+
+CABECALHO_REPETIDA = "Idempotent-Replayed"
+TAMANHO_MAXIMO_CHAVE = 255
+# Intervalo, em segundos, entre as limpezas das chaves vencidas em cada
+# processo.
+INTERVALO_LIMPEZA = 3600
+
+
+# Uma linha por Idempotency-Key, gravada na mesma transação do INSERT que ela
+# protege: ou as duas ficam, ou nenhuma. A chave primária é o que impede o
+# segundo INSERT entre workers e processos.
+class ChaveIdempotencia(Base):
+    __tablename__ = "chave_idempotencia"
+    __table_args__ = (Index("ix_chave_idempotencia_criada_em", "criada_em"),)
+
+    escopo = Column(String(60), primary_key=True)
+    chave = Column(String(TAMANHO_MAXIMO_CHAVE), primary_key=True)
+    impressao = Column(String(32), nullable=False)
+    resposta = Column(JSON)
+    criada_em = Column(DateTime(timezone=True), nullable=False)
+
+
+# A primeira requisição com uma chave insere a linha da chave antes de
+# executar a operação e só faz commit depois dela, junto com a resposta. Uma
+# retentativa concorrente, em qualquer worker, fica esperando no índice
+# único até esse commit e então recebe a violação de unicidade: lê a
+# resposta guardada em vez de repetir o INSERT. Se a primeira falhar, o
+# rollback leva a chave junto e a retentativa executa normalmente.
+class RegistroIdempotencia:
+    def __init__(self, ttl: float = config.IDEMPOTENCIA_TTL):
+        self.ttl = timedelta(seconds=ttl)
+        self._ultima_limpeza = float("-inf")
+
+    def executar(self, db: Session, escopo: str, chave: str, requisicao: BaseModel,
+                 operacao: Callable[[], dict]) -> tuple[dict, bool]:
+        impressao = impressao_requisicao(requisicao)
+        if self._limpeza_pendente():
+            db.execute(self._remover_vencidas())
+            db.commit()
+        while True:
+            try:
+                db.execute(self._reservar(escopo, chave, impressao))
+                break
+            except IntegrityError:
+                db.rollback()
+            # A chave já existe: se venceu, é descartada e a reserva é
+            # tentada de novo; senão a resposta guardada é repetida.
+            if db.execute(self._remover_vencidas(escopo, chave)).rowcount:
+                db.commit()
+                continue
+            guardada = db.execute(self._buscar(escopo, chave)).first()
+            db.rollback()
+            if guardada is not None:
+                return self._repetir(guardada, chave, impressao), True
+        try:
+            resposta = operacao()
+            db.execute(self._guardar(escopo, chave, resposta))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return resposta, False
+
+    async def executar_async(self, db: AsyncSession, escopo: str, chave: str,
+                             requisicao: BaseModel,
+                             operacao: Callable[[], Awaitable[dict]]) -> \
+            tuple[dict, bool]:
+        impressao = impressao_requisicao(requisicao)
+        if self._limpeza_pendente():
+            await db.execute(self._remover_vencidas())
+            await db.commit()
+        while True:
+            try:
+                await db.execute(self._reservar(escopo, chave, impressao))
+                break
+            except IntegrityError:
+                await db.rollback()
+            if (await db.execute(self._remover_vencidas(escopo, chave))).rowcount:
+                await db.commit()
+                continue
+            guardada = (await db.execute(self._buscar(escopo, chave))).first()
+            await db.rollback()
+            if guardada is not None:
+                return self._repetir(guardada, chave, impressao), True
+        try:
+            resposta = await operacao()
+            await db.execute(self._guardar(escopo, chave, resposta))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        return resposta, False
+
+    def _limpeza_pendente(self) -> bool:
+        agora = time.monotonic()
+        if agora - self._ultima_limpeza < INTERVALO_LIMPEZA:
+            return False
+        self._ultima_limpeza = agora
+        return True
+
+    def _reservar(self, escopo: str, chave: str, impressao: str):
+        return insert(ChaveIdempotencia).values(
+            escopo=escopo, chave=chave, impressao=impressao,
+            criada_em=datetime.now(timezone.utc))
+
+    def _guardar(self, escopo: str, chave: str, resposta: dict):
+        # Datas e afins viram texto, no formato em que iriam para o cliente.
+        return update(ChaveIdempotencia).where(
+            ChaveIdempotencia.escopo == escopo, ChaveIdempotencia.chave == chave
+        ).values(resposta=jsonable_encoder(resposta))
+
+    def _buscar(self, escopo: str, chave: str):
+        return select(ChaveIdempotencia.impressao, ChaveIdempotencia.resposta).where(
+            ChaveIdempotencia.escopo == escopo, ChaveIdempotencia.chave == chave)
+
+    # Sem escopo e chave, remove todas as chaves vencidas.
+    def _remover_vencidas(self, escopo: Optional[str] = None,
+                          chave: Optional[str] = None):
+        comando = delete(ChaveIdempotencia).where(
+            ChaveIdempotencia.criada_em < datetime.now(timezone.utc) - self.ttl)
+        if escopo is not None:
+            comando = comando.where(ChaveIdempotencia.escopo == escopo,
+                                    ChaveIdempotencia.chave == chave)
+        return comando
+
+    # A mesma chave com outro corpo é erro do cliente, não retentativa.
+    def _repetir(self, guardada, chave: str, impressao: str) -> dict:
+        if guardada.impressao != impressao:
+            raise ChaveIdempotenciaReutilizada(chave)
+        return guardada.resposta
+
+
+def impressao_requisicao(requisicao: BaseModel) -> str:
+    return hashlib.blake2b(requisicao.model_dump_json().encode(),
+                           digest_size=16).hexdigest()
+
+
+registro = RegistroIdempotencia()
+
+
+# Objeto entregue à rota pela dependência idempotencia(escopo). A operação
+# não faz commit: ele é feito aqui, junto com a chave quando a requisição
+# traz o cabeçalho Idempotency-Key.
+class Idempotencia:
+    def __init__(self, registro: RegistroIdempotencia, escopo: str,
+                 chave: Optional[str], response: Response):
+        self.registro = registro
+        self.escopo = escopo
+        self.chave = chave
+        self.response = response
+
+    def executar(self, db: Session, requisicao: BaseModel,
+                 operacao: Callable[[], dict]) -> dict:
+        if self.chave is None:
+            resposta = operacao()
+            db.commit()
+            return resposta
+        resposta, repetida = self.registro.executar(
+            db, self.escopo, self.chave, requisicao, operacao)
+        self._marcar(repetida)
+        return resposta
+
+    async def executar_async(self, db: AsyncSession, requisicao: BaseModel,
+                             operacao: Callable[[], Awaitable[dict]]) -> dict:
+        if self.chave is None:
+            resposta = await operacao()
+            await db.commit()
+            return resposta
+        resposta, repetida = await self.registro.executar_async(
+            db, self.escopo, self.chave, requisicao, operacao)
+        self._marcar(repetida)
+        return resposta
+
+    def _marcar(self, repetida: bool) -> None:
+        if repetida:
+            self.response.headers[CABECALHO_REPETIDA] = "true"
+
+
+def get_registro_idempotencia() -> RegistroIdempotencia:
+    return registro
+
+
+# O escopo separa as chaves de cada rota: a mesma chave usada em
+# /fornecedor-cliente e em /contas_a_pagar_e_receber não se confunde.
+def idempotencia(escopo: str):
+    def dependencia(response: Response,
+                    idempotency_key: Optional[str] = Header(
+                        None, min_length=1, max_length=TAMANHO_MAXIMO_CHAVE),
+                    registro: RegistroIdempotencia = Depends(
+                        get_registro_idempotencia)) -> Idempotencia:
+        return Idempotencia(registro, escopo, idempotency_key, response)
+
+    return dependencia
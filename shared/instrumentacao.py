@@ -0,0 +1,178 @@
+import asyncio
+import functools
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from prometheus_client import Histogram
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+
+from shared import config
+from shared.rotas import RotaSessaoCurta
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5,
+                    5, 10)
+
+REQUISICAO_DURACAO = Histogram(
+    "http_requisicao_duracao_segundos", "Latência total da requisição",
+    ["metodo", "rota", "status"], buckets=BUCKETS_SEGUNDOS)
+REQUISICAO_ESPERA_CONEXAO = Histogram(
+    "http_requisicao_espera_conexao_segundos",
+    "Tempo da requisição esperando conexões do pool",
+    ["metodo", "rota"], buckets=BUCKETS_SEGUNDOS)
+REQUISICAO_COMANDOS_SQL = Histogram(
+    "http_requisicao_comandos_sql", "Comandos SQL executados por requisição",
+    ["metodo", "rota"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+REQUISICAO_TEMPO_SQL = Histogram(
+    "http_requisicao_tempo_sql_segundos",
+    "Tempo da requisição executando SQL", ["metodo", "rota"],
+    buckets=BUCKETS_SEGUNDOS)
+REQUISICAO_SERIALIZACAO = Histogram(
+    "http_requisicao_serializacao_segundos",
+    "Tempo entre o fim do endpoint e a resposta pronta", ["metodo", "rota"],
+    buckets=BUCKETS_SEGUNDOS)
+
+
+@dataclass
+class MetricasRequisicao:
+    metodo: str
+    inicio: float
+    rota: str = "nao_encontrada"
+    status: int = 0
+    espera_conexao: float = 0.0
+    comandos_sql: int = 0
+    tempo_sql: float = 0.0
+    fim_endpoint: Optional[float] = None
+    serializacao: float = 0.0
+
+    def server_timing(self) -> str:
+        decorrido = time.perf_counter() - self.inicio
+        return ", ".join((
+            f"db-espera;dur={self.espera_conexao * 1000:.2f}",
+            f'sql;dur={self.tempo_sql * 1000:.2f};desc="{self.comandos_sql} comandos"',
+            f"serializacao;dur={self.serializacao * 1000:.2f}",
+            f"app;dur={decorrido * 1000:.2f}",
+        ))
+
+
+# Objeto mutável por requisição: o threadpool e os greenlets do SQLAlchemy
+# recebem uma cópia do contexto, mas enxergam o mesmo objeto.
+_metricas_atuais: ContextVar[Optional[MetricasRequisicao]] = ContextVar(
+    "metricas_requisicao", default=None)
+
+
+def registrar_espera_conexao(duracao: float) -> None:
+    metricas = _metricas_atuais.get()
+    if metricas is not None:
+        metricas.espera_conexao += duracao
+
+
+def _antes_do_comando(conn, cursor, statement, parameters, context, executemany):
+    context._inicio_instrumentacao = time.perf_counter()
+
+
+def _depois_do_comando(conn, cursor, statement, parameters, context, executemany):
+    metricas = _metricas_atuais.get()
+    if metricas is not None:
+        metricas.comandos_sql += 1
+        metricas.tempo_sql += time.perf_counter() - context._inicio_instrumentacao
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _antes_do_comando):
+        event.listen(engine, "before_cursor_execute", _antes_do_comando)
+        event.listen(engine, "after_cursor_execute", _depois_do_comando)
+
+
+class RotaInstrumentada(RotaSessaoCurta):
+    # Marca o fim do endpoint para separar o tempo de serialização (validação
+    # do response_model e geração do corpo) do tempo do próprio handler. O
+    # fim inclui a devolução das conexões feita por RotaSessaoCurta.
+    def envolver_endpoint(self, endpoint: Callable) -> Callable:
+        endpoint = super().envolver_endpoint(endpoint)
+
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def endpoint_instrumentado(**valores):
+                try:
+                    return await endpoint(**valores)
+                finally:
+                    _marcar_fim_endpoint()
+        else:
+            @functools.wraps(endpoint)
+            def endpoint_instrumentado(**valores):
+                try:
+                    return endpoint(**valores)
+                finally:
+                    _marcar_fim_endpoint()
+
+        return endpoint_instrumentado
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def handler_instrumentado(request):
+            metricas = _metricas_atuais.get()
+            if metricas is not None:
+                metricas.rota = self.path_format
+            response = await handler(request)
+            if metricas is not None and metricas.fim_endpoint is not None:
+                metricas.serializacao = time.perf_counter() - metricas.fim_endpoint
+            return response
+
+        return handler_instrumentado
+
+
+def _marcar_fim_endpoint() -> None:
+    metricas = _metricas_atuais.get()
+    if metricas is not None:
+        metricas.fim_endpoint = time.perf_counter()
+
+
+class MiddlewareInstrumentacao:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metricas = MetricasRequisicao(metodo=scope["method"],
+                                      inicio=time.perf_counter())
+        token = _metricas_atuais.set(metricas)
+
+        async def send_instrumentado(message):
+            if message["type"] == "http.response.start":
+                metricas.status = message["status"]
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", metricas.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_instrumentado)
+        finally:
+            _metricas_atuais.reset(token)
+            _registrar(metricas, time.perf_counter() - metricas.inicio)
+
+
+def _registrar(metricas: MetricasRequisicao, duracao: float) -> None:
+    rotulos = (metricas.metodo, metricas.rota)
+    REQUISICAO_DURACAO.labels(*rotulos, str(metricas.status or 500)).observe(duracao)
+    REQUISICAO_ESPERA_CONEXAO.labels(*rotulos).observe(metricas.espera_conexao)
+    REQUISICAO_COMANDOS_SQL.labels(*rotulos).observe(metricas.comandos_sql)
+    REQUISICAO_TEMPO_SQL.labels(*rotulos).observe(metricas.tempo_sql)
+    REQUISICAO_SERIALIZACAO.labels(*rotulos).observe(metricas.serializacao)
+
+    if duracao * 1000 >= config.LIMITE_REQUISICAO_LENTA_MS:
+        logger.warning(
+            "Requisição lenta: %s %s status=%s total=%.1fms espera_conexao=%.1fms "
+            "sql=%.1fms (%d comandos) serializacao=%.1fms",
+            metricas.metodo, metricas.rota, metricas.status, duracao * 1000,
+            metricas.espera_conexao * 1000, metricas.tempo_sql * 1000,
+            metricas.comandos_sql, metricas.serializacao * 1000)
@@ -0,0 +1,135 @@
+import os
+import time
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, \
+    Histogram, multiprocess
+from sqlalchemy import Engine, event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from shared.instrumentacao import registrar_espera_conexao
+
+# Com PROMETHEUS_MULTIPROC_DIR definido (o gunicorn.conf.py define), cada
+# worker grava as suas métricas em arquivos nesse diretório e /metricas soma
+# as de todos os workers. Os gauges do pool somam só os workers vivos: os
+# arquivos de um worker saem no shutdown dele (ou no child_exit do gunicorn).
+MULTIPROCESSO = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+POOL_TAMANHO = Gauge(
+    "db_pool_tamanho", "Conexões permanentes configuradas no pool", ["pool"],
+    multiprocess_mode="livesum")
+POOL_CONEXOES_EM_USO = Gauge(
+    "db_pool_conexoes_em_uso", "Conexões emprestadas (checked out)", ["pool"],
+    multiprocess_mode="livesum")
+POOL_CONEXOES_OCIOSAS = Gauge(
+    "db_pool_conexoes_ociosas", "Conexões disponíveis no pool", ["pool"],
+    multiprocess_mode="livesum")
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Conexões abertas além de pool_size", ["pool"],
+    multiprocess_mode="livesum")
+POOL_ESPERA_CHECKOUT = Histogram(
+    "db_pool_espera_checkout_segundos",
+    "Tempo esperando uma conexão do pool",
+    ["pool"],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5,
+             5, 10, 30),
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Checkouts que estouraram pool_timeout", ["pool"])
+POOL_RETENCAO_CONEXAO = Histogram(
+    "db_pool_retencao_conexao_segundos",
+    "Tempo entre o checkout e a devolução de uma conexão ao pool",
+    ["pool"],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5,
+             5, 10, 30),
+)
+
+
+# Os gauges do pool são atualizados a cada empréstimo e devolução, já com o
+# estado final do pool: set_function (ler o pool na coleta) não funciona no
+# modo multiprocesso, em que a coleta só lê os arquivos dos workers.
+def atualizar_gauges_pool(pool: QueuePool) -> None:
+    status = status_pool(pool)
+    POOL_TAMANHO.labels(pool.logging_name).set(status["tamanho"])
+    POOL_CONEXOES_EM_USO.labels(pool.logging_name).set(status["em_uso"])
+    POOL_CONEXOES_OCIOSAS.labels(pool.logging_name).set(status["ociosas"])
+    POOL_OVERFLOW.labels(pool.logging_name).set(status["overflow"])
+
+
+# O nome do pool nas métricas é o pool_logging_name do engine, que o
+# SQLAlchemy preserva quando o pool é recriado por engine.dispose().
+class _CheckoutInstrumentado:
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(self.logging_name).inc()
+            raise
+        finally:
+            duracao = time.perf_counter() - inicio
+            POOL_ESPERA_CHECKOUT.labels(self.logging_name).observe(duracao)
+            registrar_espera_conexao(duracao)
+            atualizar_gauges_pool(self)
+
+    def _do_return_conn(self, registro):
+        try:
+            super()._do_return_conn(registro)
+        finally:
+            atualizar_gauges_pool(self)
+
+
+class QueuePoolInstrumentado(_CheckoutInstrumentado, QueuePool):
+    pass
+
+
+class AsyncQueuePoolInstrumentado(_CheckoutInstrumentado, AsyncAdaptedQueuePool):
+    pass
+
+
+ENGINES_MONITORADOS: dict[str, Engine] = {}
+
+
+def registrar_engine(engine: Engine) -> None:
+    nome = engine.pool.logging_name
+    ENGINES_MONITORADOS[nome] = engine
+    atualizar_gauges_pool(engine.pool)
+
+    def checkout(conexao_dbapi, registro, proxy):
+        registro.info["emprestada_em"] = time.perf_counter()
+
+    def checkin(conexao_dbapi, registro):
+        emprestada_em = registro.info.pop("emprestada_em", None)
+        if emprestada_em is not None:
+            POOL_RETENCAO_CONEXAO.labels(nome).observe(
+                time.perf_counter() - emprestada_em)
+
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", checkin)
+
+
+def status_pool(pool: QueuePool) -> dict:
+    return {
+        "tamanho": pool.size(),
+        "em_uso": pool.checkedout(),
+        "ociosas": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout": pool.timeout(),
+    }
+
+
+# Registro usado por /metricas: o global, com um worker só, ou a soma dos
+# arquivos de todos os workers no modo multiprocesso.
+def registro_metricas() -> CollectorRegistry:
+    if not MULTIPROCESSO:
+        return REGISTRY
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro)
+    return registro
+
+
+# Chamado no shutdown do worker: tira os gauges dele da soma. Contadores e
+# histogramas continuam somando o que o worker já registrou.
+def encerrar_metricas_do_processo() -> None:
+    if MULTIPROCESSO:
+        multiprocess.mark_process_dead(os.getpid())
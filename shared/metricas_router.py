@@ -0,0 +1,30 @@
+import os
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+import shared.cache
+from shared.instrumentacao import RotaInstrumentada
+from shared.metricas import ENGINES_MONITORADOS, registro_metricas, status_pool
+
+router = APIRouter(prefix="/metricas", route_class=RotaInstrumentada)
+
+
+@router.get("", response_class=Response)
+def exportar_metricas() -> Response:
+    return Response(generate_latest(registro_metricas()),
+                    media_type=CONTENT_TYPE_LATEST)
+
+
+# /metricas/pool e /metricas/cache mostram só o worker que atendeu a
+# requisição (identificado pelo pid); a soma de todos está em /metricas.
+@router.get("/pool")
+def obter_status_pool() -> dict:
+    return {"worker": os.getpid(),
+            "pools": {nome: status_pool(engine.pool)
+                      for nome, engine in ENGINES_MONITORADOS.items()}}
+
+
+@router.get("/cache")
+def obter_status_cache() -> dict:
+    return {"worker": os.getpid(), **shared.cache.cache.status()}
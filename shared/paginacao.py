@@ -0,0 +1,45 @@
+import base64
+import binascii
+import json
+from typing import Sequence, TypeVar
+
+from fastapi import Response
+
+from shared.exceptions import CursorInvalido
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+# Faixa da coluna Integer dos ids; fora dela o banco recusaria o parâmetro.
+ID_MINIMO = -2 ** 31
+ID_MAXIMO = 2 ** 31 - 1
+
+T = TypeVar("T")
+
+
+def codificar_cursor(ultimo_id: int) -> str:
+    conteudo = json.dumps({"id": ultimo_id}).encode()
+    return base64.urlsafe_b64encode(conteudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> int:
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        conteudo = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        ultimo_id = conteudo["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise CursorInvalido(cursor)
+    # type() e não isinstance(): true/false no JSON viram bool, subclasse de int.
+    if type(ultimo_id) is not int or not ID_MINIMO <= ultimo_id <= ID_MAXIMO:
+        raise CursorInvalido(cursor)
+    return ultimo_id
+
+
+# Recebe até limite + 1 registros ordenados por id; se vier o registro
+# excedente, ele é descartado e o cursor da próxima página vai no cabeçalho.
+def paginar(registros: Sequence[T], limite: int, response: Response) -> list[T]:
+    registros = list(registros)
+    if len(registros) > limite:
+        registros = registros[:limite]
+        response.headers["X-Proximo-Cursor"] = codificar_cursor(registros[-1].id)
+    return registros
@@ -0,0 +1,70 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Sequence
+
+from sqlalchemy import Engine, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from shared import config
+
+logger = logging.getLogger(__name__)
+
+# Falhas que tiram a réplica da rotação: erro ao conectar (DBAPIError) ou
+# pool esgotado (TimeoutError). Nos dois casos a leitura vai para a próxima
+# réplica ou, sem nenhuma disponível, para o primário.
+FALHAS_DE_CONEXAO = (exc.DBAPIError, exc.TimeoutError)
+
+
+class RoteadorLeitura:
+    # Distribui as sessões de leitura entre as réplicas em round-robin. Cada
+    # escolha faz um checkout rápido do pool da réplica (validado pelo
+    # pool_pre_ping, se ativo); a conexão volta ao pool na hora e a sessão só
+    # pega outra quando executar a primeira consulta.
+    def __init__(self, replicas: Sequence, primario,
+                 retentar_apos: float = config.DB_REPLICA_RETENTAR_APOS,
+                 relogio: Callable[[], float] = time.monotonic):
+        self.replicas = list(replicas)
+        self.primario = primario
+        self.retentar_apos = retentar_apos
+        self._relogio = relogio
+        self._proxima = itertools.cycle(range(len(self.replicas)))
+        self._indisponivel_ate: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def _candidatas(self):
+        with self._lock:
+            inicio = next(self._proxima) if self.replicas else 0
+        agora = self._relogio()
+        for deslocamento in range(len(self.replicas)):
+            indice = (inicio + deslocamento) % len(self.replicas)
+            if self._indisponivel_ate.get(indice, 0) <= agora:
+                yield indice, self.replicas[indice]
+
+    def _marcar_indisponivel(self, indice: int, erro: Exception) -> None:
+        self._indisponivel_ate[indice] = self._relogio() + self.retentar_apos
+        logger.warning("Réplica de leitura %d indisponível por %.0fs: %s",
+                       indice, self.retentar_apos, erro)
+
+    def escolher(self) -> Engine:
+        for indice, replica in self._candidatas():
+            try:
+                with replica.connect():
+                    pass
+            except FALHAS_DE_CONEXAO as erro:
+                self._marcar_indisponivel(indice, erro)
+                continue
+            return replica
+        return self.primario
+
+    async def escolher_async(self) -> AsyncEngine:
+        for indice, replica in self._candidatas():
+            try:
+                async with replica.connect():
+                    pass
+            except FALHAS_DE_CONEXAO as erro:
+                self._marcar_indisponivel(indice, erro)
+                continue
+            return replica
+        return self.primario
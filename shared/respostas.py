@@ -0,0 +1,16 @@
+from typing import Iterable
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Row
+
+
+# Caminho rápido das listagens: as linhas chegam do banco só com as colunas
+# da resposta, já nos tipos do JSON, e vão direto para o orjson sem passar
+# por um modelo Pydantic por linha. O response_model da rota continua
+# descrevendo o formato no OpenAPI.
+def resposta_json_rapida(linhas: Iterable[Row], response: Response) -> ORJSONResponse:
+    # Ao devolver uma Response pronta o FastAPI ignora os cabeçalhos
+    # definidos pelas dependências (ETag, cursor), então eles são copiados.
+    return ORJSONResponse([linha._asdict() for linha in linhas],
+                          headers=dict(response.headers))
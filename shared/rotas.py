@@ -0,0 +1,52 @@
+import asyncio
+import functools
+from typing import Callable
+
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+class RotaSessaoCurta(APIRoute):
+    # A sessão de get_db só pega uma conexão do pool na primeira consulta e a
+    # devolve no commit (as fábricas de sessão não expiram os objetos, então
+    # a resposta não volta ao banco). Nas rotas que só leem não há commit, e
+    # o fechamento da dependência só roda depois da serialização da resposta
+    # (response_model e JSON). Esta rota fecha as sessões recebidas pelo
+    # endpoint assim que ele retorna, devolvendo a conexão ao pool antes de
+    # serializar. A sessão fechada continua utilizável: a exportação em
+    # streaming, por exemplo, pega outra conexão ao começar a enviar o corpo.
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, self.envolver_endpoint(endpoint), **kwargs)
+
+    # O endpoint é envolvido antes de chegar ao APIRoute: functools.wraps
+    # preserva a assinatura (o FastAPI a lê seguindo __wrapped__), então
+    # parâmetros, dependências e response_model continuam os do endpoint.
+    # Subclasses envolvem o resultado de super().envolver_endpoint().
+    def envolver_endpoint(self, endpoint: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def endpoint_com_sessao_curta(**valores):
+                try:
+                    return await endpoint(**valores)
+                finally:
+                    for sessao in _sessoes(valores):
+                        if isinstance(sessao, AsyncSession):
+                            await sessao.close()
+                        else:
+                            sessao.close()
+        else:
+            @functools.wraps(endpoint)
+            def endpoint_com_sessao_curta(**valores):
+                try:
+                    return endpoint(**valores)
+                finally:
+                    for sessao in _sessoes(valores):
+                        sessao.close()
+
+        return endpoint_com_sessao_curta
+
+
+def _sessoes(valores: dict) -> list:
+    return [valor for valor in valores.values()
+            if isinstance(valor, (Session, AsyncSession))]
@@ -0,0 +1,66 @@
+import glob
+import logging
+import os
+import tempfile
+
+import uvicorn
+
+from shared import config
+from shared.cache import Cache, substituir_cache
+
+logger = logging.getLogger(__name__)
+
+# uvloop e httptools vêm com uvicorn[standard]; fixar os dois evita cair em
+# silêncio no asyncio/h11 puro quando faltar alguma dependência.
+OPCOES_UVICORN = {"loop": "uvloop", "http": "httptools"}
+
+try:
+    from uvicorn.workers import UvicornWorker
+except ImportError:  # gunicorn não instalado: apenas o modo uvicorn --workers
+    UvicornWorker = None
+
+if UvicornWorker is not None:
+    class UvicornWorkerOtimizado(UvicornWorker):
+        CONFIG_KWARGS = OPCOES_UVICORN
+
+
+# Com CACHE_BACKEND=memoria e vários workers, uma escrita só invalidaria o
+# cache do worker que a recebeu e os outros serviriam o valor antigo até o
+# TTL. Nesse caso o cache é desativado: no processo atual (aplicação já
+# importada pelo preload do gunicorn) e, pela variável de ambiente, nos
+# workers que importarem a aplicação depois.
+def desativar_cache_local(workers: int) -> None:
+    if workers > 1 and config.CACHE_BACKEND == "memoria":
+        logger.warning(
+            "CACHE_BACKEND=memoria com %d workers: cache desativado, porque "
+            "cada worker teria o seu e uma escrita só invalidaria o do worker "
+            "que a recebeu. Use CACHE_BACKEND=redis para compartilhar o cache.",
+            workers)
+        os.environ["CACHE_BACKEND"] = "desativado"
+        substituir_cache(Cache())
+
+
+# Mesmo diretório de métricas do gunicorn.conf.py. Os workers do uvicorn
+# herdam a variável e ligam o modo multiprocesso ao importar a aplicação.
+def preparar_metricas_multiprocesso() -> None:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        for arquivo in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+            os.remove(arquivo)
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="metricas-")
+
+
+# Alternativa sem gunicorn: o uvicorn sobe os workers com spawn, então cada
+# um importa a aplicação do zero e não herda conexões do processo pai.
+def main():
+    desativar_cache_local(config.WEB_WORKERS)
+    if config.WEB_WORKERS > 1:
+        preparar_metricas_multiprocesso()
+    uvicorn.run("main:app", host=config.WEB_HOST, port=config.WEB_PORT,
+                workers=config.WEB_WORKERS, backlog=config.WEB_BACKLOG,
+                timeout_keep_alive=config.WEB_KEEPALIVE, proxy_headers=True,
+                **OPCOES_UVICORN)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import logging
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Callable, Optional
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text, \
+    false, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from shared import config
+from shared.database import Base, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class StatusTarefaEnum(str, Enum):
+    PENDENTE = "PENDENTE"
+    EXECUTANDO = "EXECUTANDO"
+    CONCLUIDA = "CONCLUIDA"
+    FALHOU = "FALHOU"
+
+
+# Fila de tarefas no próprio banco da aplicação: funciona com SQLite nos
+# testes e com Postgres em produção, sem broker externo. A tarefa só sai de
+# EXECUTANDO no mesmo commit do trabalho que ela fez, e só se ainda estiver
+# reservada para o worker que fez o trabalho (tentativas serve de fencing
+# token).
+class Tarefa(Base):
+    __tablename__ = "tarefa"
+    __table_args__ = (Index("ix_tarefa_status_disponivel_em", "status", "disponivel_em"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tipo = Column(String(60), nullable=False)
+    parametros = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False)
+    tentativas = Column(Integer, nullable=False, default=0)
+    max_tentativas = Column(Integer, nullable=False)
+    resultado = Column(JSON)
+    erro = Column(Text)
+    criada_em = Column(DateTime(timezone=True), nullable=False)
+    disponivel_em = Column(DateTime(timezone=True), nullable=False)
+    iniciada_em = Column(DateTime(timezone=True))
+    concluida_em = Column(DateTime(timezone=True))
+
+
+# tipo -> função(db, **parametros) que devolve o resultado (JSON). A função
+# não faz commit: o resultado e a mudança de status são gravados juntos.
+TAREFAS: dict[str, Callable[..., dict]] = {}
+
+
+def tarefa(tipo: str):
+    def registrar(funcao: Callable[..., dict]) -> Callable[..., dict]:
+        TAREFAS[tipo] = funcao
+        return funcao
+
+    return registrar
+
+
+# Falhas que não adiantam repetir: tipo sem função registrada ou tarefa que
+# já estourou o tempo limite em todas as tentativas.
+class FalhaDefinitiva(Exception):
+    pass
+
+
+def agora_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Serializa, até o commit, as transações que pedem a mesma chave: para
+# tarefas que leem o que já existe antes de inserir e não podem rodar em
+# paralelo com outra igual. No Postgres é um advisory lock de transação; no
+# SQLite a escrita já é exclusiva no banco inteiro, e um UPDATE sem efeito
+# basta para pegar esse lock antes das leituras.
+def bloquear_por_chave(db: Session, chave: str) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(zlib.crc32(chave.encode()))))
+    else:
+        db.execute(update(Tarefa).where(false()).values(status=Tarefa.status))
+
+
+class FilaTarefas:
+    def __init__(self, fabrica_sessao: Callable[[], Session] = SessionLocal,
+                 max_tentativas: int = config.TAREFAS_MAX_TENTATIVAS,
+                 espera_base: float = config.TAREFAS_ESPERA_BASE,
+                 tempo_limite: float = config.TAREFAS_TEMPO_LIMITE,
+                 intervalo: float = config.TAREFAS_INTERVALO,
+                 relogio: Callable[[], datetime] = agora_utc):
+        self.fabrica_sessao = fabrica_sessao
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.tempo_limite = timedelta(seconds=tempo_limite)
+        self.intervalo = intervalo
+        self._relogio = relogio
+        self._aviso = threading.Event()
+        self._parar = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def enfileirar(self, db: Session, tipo: str, parametros: dict) -> Tarefa:
+        if tipo not in TAREFAS:
+            raise ValueError(f"Tarefa desconhecida: {tipo}")
+        agora = self._relogio()
+        nova = Tarefa(tipo=tipo, parametros=parametros,
+                      status=StatusTarefaEnum.PENDENTE.value, tentativas=0,
+                      max_tentativas=self.max_tentativas, criada_em=agora,
+                      disponivel_em=agora)
+        db.add(nova)
+        db.commit()
+        # Acorda os workers deste processo; os dos demais encontram a
+        # tarefa na próxima consulta (TAREFAS_INTERVALO).
+        self._aviso.set()
+        return nova
+
+    # Executa a próxima tarefa disponível. Devolve False quando não há
+    # nenhuma.
+    def executar_proxima(self) -> bool:
+        with self.fabrica_sessao() as db:
+            reservada = self._reservar(db)
+            if reservada is None:
+                return False
+            self._executar(db, reservada)
+            return True
+
+    def processar_pendentes(self) -> int:
+        executadas = 0
+        while self.executar_proxima():
+            executadas += 1
+        return executadas
+
+    # Disponíveis: pendentes cuja espera já passou e as que ficaram em
+    # EXECUTANDO além do tempo limite (worker que morreu no meio). O UPDATE
+    # só vale se a linha ainda estiver como foi lida: entre processos, só um
+    # worker consegue reservar cada tarefa. No Postgres o SKIP LOCKED evita
+    # que os workers disputem a mesma linha.
+    def _reservar(self, db: Session) -> Optional[Tarefa]:
+        while True:
+            agora = self._relogio()
+            candidata = db.execute(
+                select(Tarefa.id, Tarefa.status, Tarefa.tentativas).where(or_(
+                    (Tarefa.status == StatusTarefaEnum.PENDENTE.value) &
+                    (Tarefa.disponivel_em <= agora),
+                    (Tarefa.status == StatusTarefaEnum.EXECUTANDO.value) &
+                    (Tarefa.iniciada_em < agora - self.tempo_limite),
+                )).order_by(Tarefa.disponivel_em, Tarefa.id).limit(1)
+                .with_for_update(skip_locked=True)).first()
+            if candidata is None:
+                db.rollback()
+                return None
+            reserva = db.execute(
+                update(Tarefa).where(Tarefa.id == candidata.id,
+                                     Tarefa.status == candidata.status,
+                                     Tarefa.tentativas == candidata.tentativas)
+                .values(status=StatusTarefaEnum.EXECUTANDO.value, iniciada_em=agora,
+                        tentativas=Tarefa.tentativas + 1))
+            db.commit()
+            if reserva.rowcount == 1:
+                return db.get(Tarefa, candidata.id)
+
+    def _executar(self, db: Session, reservada: Tarefa) -> None:
+        id_tarefa, tipo, tentativa = reservada.id, reservada.tipo, reservada.tentativas
+        try:
+            funcao = TAREFAS.get(tipo)
+            if funcao is None:
+                raise FalhaDefinitiva(f"Tarefa desconhecida: {tipo}")
+            if reservada.tentativas > reservada.max_tentativas:
+                raise FalhaDefinitiva("Tempo limite de execução esgotado")
+            resultado = funcao(db, **reservada.parametros)
+            concluida = db.execute(self._da_reserva(id_tarefa, tentativa).values(
+                status=StatusTarefaEnum.CONCLUIDA.value, resultado=resultado,
+                erro=None, concluida_em=self._relogio()))
+            if concluida.rowcount != 1:
+                # Passou do tempo limite e outro worker reservou a tarefa: o
+                # trabalho desta execução é desfeito e vale o da outra.
+                db.rollback()
+                logger.warning("Tarefa %s (%s) reservada por outro worker; "
+                               "resultado descartado", id_tarefa, tipo)
+                return
+            db.commit()
+        except Exception as erro:
+            db.rollback()
+            logger.exception("Falha na tarefa %s (%s)", id_tarefa, tipo)
+            self._registrar_falha(db, id_tarefa, tentativa, erro)
+
+    # Só altera a tarefa se ela ainda estiver na reserva feita por este
+    # worker (mesmo número de tentativas), que é o que impede um worker que
+    # passou do tempo limite de concluir por cima de quem a reservou depois.
+    @staticmethod
+    def _da_reserva(id_tarefa: int, tentativa: int):
+        return update(Tarefa).where(
+            Tarefa.id == id_tarefa,
+            Tarefa.status == StatusTarefaEnum.EXECUTANDO.value,
+            Tarefa.tentativas == tentativa)
+
+    # Nova tentativa com espera exponencial (espera_base, 2x, 4x...) até
+    # max_tentativas; depois disso a tarefa fica como FALHOU.
+    def _registrar_falha(self, db: Session, id_tarefa: int, tentativa: int,
+                         erro: Exception) -> None:
+        falhou = db.get(Tarefa, id_tarefa)
+        agora = self._relogio()
+        valores = {"erro": f"{type(erro).__name__}: {erro}"}
+        if tentativa < falhou.max_tentativas and \
+                not isinstance(erro, FalhaDefinitiva):
+            valores["status"] = StatusTarefaEnum.PENDENTE.value
+            valores["disponivel_em"] = agora + timedelta(
+                seconds=self.espera_base * 2 ** (tentativa - 1))
+        else:
+            valores["status"] = StatusTarefaEnum.FALHOU.value
+            valores["concluida_em"] = agora
+        db.execute(self._da_reserva(id_tarefa, tentativa).values(**valores))
+        db.commit()
+
+    def iniciar(self, workers: int) -> None:
+        self._parar.clear()
+        for indice in range(workers):
+            thread = threading.Thread(target=self._trabalhar, daemon=True,
+                                      name=f"tarefas-{indice}")
+            thread.start()
+            self._threads.append(thread)
+
+    # Espera as tarefas em execução terminarem (até `espera` segundos).
+    def parar(self, espera: float = 30) -> None:
+        self._parar.set()
+        self._aviso.set()
+        for thread in self._threads:
+            thread.join(espera)
+        self._threads = []
+
+    def _trabalhar(self) -> None:
+        while not self._parar.is_set():
+            try:
+                if self.executar_proxima():
+                    continue
+            except Exception:
+                logger.exception("Falha ao buscar tarefas")
+            self._aviso.wait(self.intervalo)
+            self._aviso.clear()
+
+
+fila = FilaTarefas()
+
+
+def get_fila_tarefas() -> FilaTarefas:
+    return fila
@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Depends, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from shared.dependencies import get_db
+from shared.exceptions import NotFound
+from shared.instrumentacao import RotaInstrumentada
+from shared.tarefas import StatusTarefaEnum, Tarefa
+
+router = APIRouter(prefix="/tarefas", route_class=RotaInstrumentada)
+
+
+class TarefaResponse(BaseModel):
+    id: int
+    tipo: str
+    status: StatusTarefaEnum
+    tentativas: int
+    resultado: Any = None
+    erro: str | None = None
+    criada_em: datetime
+    concluida_em: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+# Resposta das rotas que enfileiram trabalho: 202 com o estado inicial da
+# tarefa e o endereço para acompanhá-la.
+def tarefa_aceita(tarefa: Tarefa, response: Response) -> TarefaResponse:
+    response.headers["Location"] = f"{router.prefix}/{tarefa.id}"
+    return TarefaResponse.model_validate(tarefa)
+
+
+# Lê do primário: numa réplica o status poderia chegar atrasado.
+@router.get("/{id_da_tarefa}", response_model=TarefaResponse)
+def obter_tarefa(id_da_tarefa: int, db: Session = Depends(get_db)) -> TarefaResponse:
+    tarefa = db.get(Tarefa, id_da_tarefa)
+    if tarefa is None:
+        raise NotFound("Tarefa")
+    return tarefa
@@ -0,0 +1,182 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import Column, DDL, DateTime, Integer, String, Table, event, \
+    select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from shared.database import Base
+from shared.dependencies import get_async_db_leitura, get_db_leitura
+from shared.exceptions import NaoModificado
+
+
+# Uma linha por tabela versionada, incrementada por trigger no mesmo
+# transaction de cada INSERT/UPDATE/DELETE. Com isso as rotas de listagem
+# conseguem responder 304 lendo uma única linha, sem consultar os registros.
+#
+# Custo nas escritas: o trigger trava a linha da tabela até o commit, então
+# as transações que escrevem na mesma tabela fazem commit uma de cada vez,
+# e o que uma transação faz entre a escrita e o commit atrasa todas as
+# outras. No Postgres (benchmarks/benchmark_versao_tabela.py, 8 escritores,
+# UPDATE de uma linha por commit) foram ~1900 commits/s com o trigger contra
+# ~2950 sem ele; com 2 ms de trabalho antes do commit, ~380/s (1 / 2 ms)
+# contra ~1850/s. Por isso as rotas escrevem e fazem commit logo em seguida.
+# Uma sequence (nextval) não trava, mas não é transacional: a versão nova
+# ficaria visível antes do commit, e um leitor poderia responder o corpo
+# antigo com o ETag novo, que continuaria dando 304 com dados velhos até a
+# próxima escrita.
+#
+# Cada escrita avança atualizado_em ao menos um segundo: o Last-Modified e o
+# If-Modified-Since só têm segundos, e duas escritas no mesmo segundo dariam
+# o mesmo Last-Modified, com 304 para quem leu entre elas. Com mais de uma
+# escrita por segundo atualizado_em fica à frente do relógio; o Validador
+# publica no máximo a hora atual, e até o relógio alcançar os clientes só
+# recebem 200.
+class VersaoTabela(Base):
+    __tablename__ = "versao_tabela"
+
+    tabela = Column(String(63), primary_key=True)
+    versao = Column(Integer, nullable=False)
+    atualizado_em = Column(DateTime(timezone=True), nullable=False)
+
+
+FUNCAO_POSTGRESQL = DDL("""
+CREATE OR REPLACE FUNCTION incrementar_versao_tabela() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO versao_tabela (tabela, versao, atualizado_em)
+    VALUES (TG_TABLE_NAME, 1, now())
+    ON CONFLICT (tabela) DO UPDATE
+        SET versao = versao_tabela.versao + 1,
+            atualizado_em = greatest(excluded.atualizado_em,
+                date_trunc('second', versao_tabela.atualizado_em) + interval '1 second');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+TRIGGER_POSTGRESQL = """
+CREATE TRIGGER {tabela}_versao
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabela}
+FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_tabela()
+"""
+
+# O SQLite só tem triggers FOR EACH ROW, por isso um por operação.
+TRIGGER_SQLITE = """
+CREATE TRIGGER {tabela}_versao_{operacao} AFTER {operacao} ON {tabela}
+BEGIN
+    INSERT INTO versao_tabela (tabela, versao, atualizado_em)
+    VALUES ('{tabela}', 1, strftime('%%Y-%%m-%%d %%H:%%M:%%S', 'now'))
+    ON CONFLICT (tabela) DO UPDATE
+        SET versao = versao + 1,
+            atualizado_em = max(excluded.atualizado_em,
+                strftime('%%Y-%%m-%%d %%H:%%M:%%S', atualizado_em, '+1 second'));
+END
+"""
+
+
+def versionar_tabela(tabela: Table) -> None:
+    event.listen(tabela, "after_create",
+                 FUNCAO_POSTGRESQL.execute_if(dialect="postgresql"))
+    event.listen(tabela, "after_create",
+                 DDL(TRIGGER_POSTGRESQL.format(tabela=tabela.name))
+                 .execute_if(dialect="postgresql"))
+    for operacao in ("INSERT", "UPDATE", "DELETE"):
+        event.listen(tabela, "after_create",
+                     DDL(TRIGGER_SQLITE.format(tabela=tabela.name,
+                                               operacao=operacao))
+                     .execute_if(dialect="sqlite"))
+
+
+class Validador:
+    def __init__(self, etag: str, ultima_modificacao: Optional[datetime] = None):
+        self.etag = etag
+        self.ultima_modificacao = ultima_modificacao
+
+    def cabecalhos(self) -> dict[str, str]:
+        cabecalhos = {"ETag": self.etag}
+        if self.ultima_modificacao is not None:
+            # Um Last-Modified no futuro não pode ser publicado (RFC 9110).
+            cabecalhos["Last-Modified"] = format_datetime(
+                min(self.ultima_modificacao, datetime.now(timezone.utc)), usegmt=True)
+        return cabecalhos
+
+    def nao_modificado(self, request: Request) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            etags = {etag.strip().removeprefix("W/")
+                     for etag in if_none_match.split(",")}
+            return "*" in etags or self.etag.removeprefix("W/") in etags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.ultima_modificacao is not None:
+            try:
+                desde = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return self.ultima_modificacao.replace(microsecond=0) <= desde
+        return False
+
+    # Responde 304 (via exceção) ou publica ETag/Last-Modified na resposta.
+    def aplicar(self, request: Request, response: Response) -> None:
+        if self.nao_modificado(request):
+            raise NaoModificado(self.cabecalhos())
+        response.headers.update(self.cabecalhos())
+
+
+def validador_de_conteudo(conteudo: dict) -> Validador:
+    resumo = hashlib.blake2b(repr(sorted(conteudo.items())).encode(),
+                             digest_size=8).hexdigest()
+    return Validador(f'"{resumo}"')
+
+
+def _validador_de_versoes(tabelas: tuple[str, ...], linhas) -> Validador:
+    versoes = {linha.tabela: linha for linha in linhas}
+    partes = []
+    ultima_modificacao = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    for tabela in tabelas:
+        linha = versoes.get(tabela)
+        if linha is None:
+            partes.append(f"{tabela}:0")
+            continue
+        atualizado_em = linha.atualizado_em
+        if atualizado_em.tzinfo is None:
+            atualizado_em = atualizado_em.replace(tzinfo=timezone.utc)
+        ultima_modificacao = max(ultima_modificacao, atualizado_em)
+        partes.append(f"{tabela}:{linha.versao}:{atualizado_em.timestamp()}")
+    resumo = hashlib.blake2b(";".join(partes).encode(),
+                             digest_size=8).hexdigest()
+    return Validador(f'W/"{resumo}"', ultima_modificacao)
+
+
+def _consulta_versoes(tabelas: tuple[str, ...]):
+    return select(VersaoTabela.tabela, VersaoTabela.versao,
+                  VersaoTabela.atualizado_em) \
+        .where(VersaoTabela.tabela.in_(tabelas))
+
+
+# Dependências para as rotas de listagem: o ETag muda sempre que qualquer
+# uma das tabelas informadas sofre uma escrita. A versão é lida na mesma
+# sessão de leitura da rota, então ETag e corpo vêm da mesma réplica.
+def requisicao_condicional(*tabelas: str):
+    def dependencia(request: Request, response: Response,
+                    db: Session = Depends(get_db_leitura)) -> Validador:
+        validador = _validador_de_versoes(
+            tabelas, db.execute(_consulta_versoes(tabelas)))
+        validador.aplicar(request, response)
+        return validador
+
+    return dependencia
+
+
+def requisicao_condicional_async(*tabelas: str):
+    async def dependencia(request: Request, response: Response,
+                          db: AsyncSession = Depends(get_async_db_leitura)) -> Validador:
+        validador = _validador_de_versoes(
+            tabelas, await db.execute(_consulta_versoes(tabelas)))
+        validador.aplicar(request, response)
+        return validador
+
+    return dependencia
@@ -0,0 +1,12 @@
+import pytest
+
+import shared.cache
+
+
+# Os testes recriam o banco a cada caso e reaproveitam os mesmos ids, então
+# o cache de leitura não pode sobreviver de um teste para o outro.
+@pytest.fixture(autouse=True)
+def limpar_cache():
+    shared.cache.cache.limpar()
+    yield
+    shared.cache.cache.limpar()
@@ -0,0 +1,19 @@
+from contextlib import contextmanager
+
+from sqlalchemy import Engine, event
+
+
+# Escuta todos os engines: os módulos de teste sobrescrevem get_db no mesmo
+# app e o engine efetivamente usado depende da ordem de importação.
+@contextmanager
+def contar_comandos_sql():
+    comandos = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        comandos.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", registrar)
+    try:
+        yield comandos
+    finally:
+        event.remove(Engine, "before_cursor_execute", registrar)
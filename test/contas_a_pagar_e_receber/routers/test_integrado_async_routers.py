@@ -0,0 +1,234 @@
+from datetime import date
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, StaticPool, NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from main import criar_app
+from shared import Base
+from shared.dependencies import get_db, get_async_db, get_db_leitura, \
+    get_async_db_leitura
+
+app = criar_app(database_async=True)
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL,
+                                   poolclass=NullPool)
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False,
+                                   bind=engine)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False,
+                                              expire_on_commit=False)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_db_leitura] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_async_db_leitura] = override_get_async_db
+
+client = TestClient(app)
+
+HOJE = date.today().isoformat()
+
+
+def test_deve_usar_rotas_async_no_lugar_das_sincronas():
+    rotas = {(rota.path, tuple(sorted(rota.methods))): rota.endpoint
+             for rota in app.routes if hasattr(rota, "methods")}
+    assert len(rotas) == len([rota for rota in app.routes
+                              if hasattr(rota, "methods")])
+    for rota in (("/contas_a_pagar_e_receber/", ("GET",)),
+                 ("/contas_a_pagar_e_receber/resumo", ("GET",)),
+                 ("/contas_a_pagar_e_receber/busca", ("GET",)),
+                 ("/contas_a_pagar_e_receber/saldo", ("GET",)),
+                 ("/contas_a_pagar_e_receber/saldo/fornecedores", ("GET",)),
+                 ("/contas_a_pagar_e_receber/lote", ("POST",)),
+                 ("/contas_a_pagar_e_receber/lote", ("PUT",)),
+                 ("/contas_a_pagar_e_receber/lote", ("DELETE",)),
+                 ("/fornecedor-cliente/busca", ("GET",))):
+        assert rotas[rota].__module__.endswith("_async_router"), rota
+    # Exportação e rotas que enfileiram tarefas continuam síncronas.
+    for rota in (("/contas_a_pagar_e_receber/exportar", ("GET",)),
+                 ("/contas_a_pagar_e_receber/recorrentes", ("POST",)),
+                 ("/contas_a_pagar_e_receber/conciliacao", ("POST",)),
+                 ("/fornecedor-cliente/exportar", ("GET",))):
+        assert rotas[rota].__module__.endswith("_router"), rota
+        assert not rotas[rota].__module__.endswith("_async_router"), rota
+
+
+def test_deve_manter_rotas_sincronas_antes_das_rotas_com_id():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    assert client.get("/contas_a_pagar_e_receber/resumo").status_code == 200
+    assert client.get("/contas_a_pagar_e_receber/exportar").status_code == 200
+    assert client.get("/fornecedor-cliente/exportar").status_code == 200
+
+
+def test_deve_criar_e_listar_contas_a_pagar_e_receber():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    response = client.post("/contas_a_pagar_e_receber",
+                           json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"})
+    assert response.status_code == 201
+    assert response.json() == {'id': 1, "descricao": "Aluguel", "valor": 1000.5,
+                               "tipo": "PAGAR", "data_vencimento": HOJE}
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"})
+
+    response = client.get("/contas_a_pagar_e_receber", params={"limite": 1})
+    assert response.status_code == 200
+    assert response.json() == [
+        {'id': 1, "descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR",
+         "data_vencimento": HOJE},
+    ]
+    response = client.get("/contas_a_pagar_e_receber",
+                          params={"cursor": response.headers["X-Proximo-Cursor"]})
+    assert response.json() == [
+        {'id': 2, "descricao": "Salário", "valor": 5000, "tipo": "RECEBER",
+         "data_vencimento": HOJE}
+    ]
+
+
+def test_deve_atualizar_e_remover_conta_a_pagar_e_receber():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    response = client.post("/contas_a_pagar_e_receber", json={
+        "descricao": "Curso de Python",
+        "valor": 333.0,
+        "tipo": "PAGAR"
+    })
+    id_conta_a_pagar_e_receber = response.json()["id"]
+
+    response = client.put(f"/contas_a_pagar_e_receber/{id_conta_a_pagar_e_receber}",
+                          json={"descricao": "Curso de FastAPI", "valor": 333.0,
+                                "tipo": "PAGAR"})
+    assert response.status_code == 200
+    assert response.json()["descricao"] == "Curso de FastAPI"
+
+    response = client.get(f"/contas_a_pagar_e_receber/{id_conta_a_pagar_e_receber}")
+    assert response.json()["descricao"] == "Curso de FastAPI"
+
+    response = client.delete(f"/contas_a_pagar_e_receber/{id_conta_a_pagar_e_receber}")
+    assert response.status_code == 204
+    response = client.get(f"/contas_a_pagar_e_receber/{id_conta_a_pagar_e_receber}")
+    assert response.status_code == 404
+    assert response.json() == {"message": "Conta a Pagar e Receber não encontrado"}
+
+
+def test_deve_criar_alterar_e_remover_fornecedor():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    response = client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    assert response.status_code == 201
+    id_fornecedor = response.json()["id"]
+
+    response = client.put(f"/fornecedor-cliente/{id_fornecedor}",
+                          json={"nome": "Fornecedor 2"})
+    assert response.json() == {"id": id_fornecedor, "nome": "Fornecedor 2"}
+    assert client.get("/fornecedor-cliente").json() == [
+        {"id": id_fornecedor, "nome": "Fornecedor 2"}
+    ]
+
+    response = client.delete(f"/fornecedor-cliente/{id_fornecedor}")
+    assert response.status_code == 204
+    response = client.get(f"/fornecedor-cliente/{id_fornecedor}")
+    assert response.json() == {"message": "Fornecedor não encontrado"}
+
+
+def test_deve_responder_304_na_listagem_de_fornecedores():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    etag = client.get("/fornecedor-cliente").headers["ETag"]
+
+    response = client.get("/fornecedor-cliente", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_deve_repetir_resposta_do_post_async_com_a_mesma_idempotency_key():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    cabecalhos = {"Idempotency-Key": "conta-repetida"}
+    conta = {"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"}
+
+    primeira = client.post("/contas_a_pagar_e_receber", json=conta, headers=cabecalhos)
+    repetida = client.post("/contas_a_pagar_e_receber", json=conta, headers=cabecalhos)
+    assert primeira.status_code == repetida.status_code == 201
+    assert repetida.json() == primeira.json()
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert len(client.get("/contas_a_pagar_e_receber").json()) == 1
+
+    outra_conta = {**conta, "valor": 10}
+    response = client.post("/contas_a_pagar_e_receber", json=outra_conta,
+                           headers=cabecalhos)
+    assert response.status_code == 422
+
+
+def test_deve_escrever_em_lote_e_ler_saldo_resumo_e_busca_async():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+
+    response = client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": "Aluguel", "valor": 1000, "tipo": "PAGAR", "fornecedor_id": 1},
+        {"descricao": "Energia", "valor": 200, "tipo": "PAGAR", "fornecedor_id": 99},
+        {"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"},
+    ])
+    assert response.status_code == 201
+    assert [(item.get("id"), item["status"]) for item in response.json()] == [
+        (1, 201), (None, 422), (2, 201)]
+
+    response = client.put("/contas_a_pagar_e_receber/lote", json=[
+        {"id": 1, "descricao": "Aluguel", "valor": 1200, "tipo": "PAGAR"},
+        {"id": 99, "descricao": "Inexistente", "valor": 1, "tipo": "PAGAR"},
+    ])
+    assert [(item["id"], item["status"]) for item in response.json()] == [
+        (1, 200), (99, 404)]
+    assert client.get("/contas_a_pagar_e_receber/1").json()["valor"] == 1200
+
+    assert client.get("/contas_a_pagar_e_receber/saldo").json() == {
+        "quantidade": 2, "total_pagar": 1200, "total_receber": 5000, "saldo": 3800}
+    assert client.get("/contas_a_pagar_e_receber/saldo/fornecedores").json() == [
+        {"fornecedor_id": None, "quantidade": 1, "total_pagar": 0,
+         "total_receber": 5000, "saldo": 5000},
+        {"fornecedor_id": 1, "quantidade": 1, "total_pagar": 1200,
+         "total_receber": 0, "saldo": -1200},
+    ]
+    assert client.get("/contas_a_pagar_e_receber/resumo").json() == [
+        {"tipo": "PAGAR", "quantidade": 1, "total": 1200},
+        {"tipo": "RECEBER", "quantidade": 1, "total": 5000},
+    ]
+    response = client.get("/contas_a_pagar_e_receber/busca", params={"q": "alug"})
+    assert [conta["id"] for conta in response.json()] == [1]
+    response = client.get("/fornecedor-cliente/busca", params={"q": "forn"})
+    assert response.json() == [{"id": 1, "nome": "Fornecedor 1"}]
+
+    response = client.request("DELETE", "/contas_a_pagar_e_receber/lote", json=[2, 2, 3])
+    assert [(item["id"], item["status"]) for item in response.json()] == [
+        (2, 204), (2, 404), (3, 404)]
+    assert client.get("/contas_a_pagar_e_receber/saldo").json()["quantidade"] == 1
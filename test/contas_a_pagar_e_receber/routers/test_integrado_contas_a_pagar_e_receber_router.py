@@ -1,10 +1,16 @@
+import json
+from datetime import date
+
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, StaticPool
 from sqlalchemy.orm import sessionmaker
 
 from main import app
 from shared import Base
-from shared.dependencies import get_db
+from shared.dependencies import get_db, get_db_leitura
+from shared.paginacao import codificar_cursor
+from shared.tarefas import FilaTarefas, get_fila_tarefas
+from test.contador_sql import contar_comandos_sql
 
 client = TestClient(app=app)
 
@@ -31,9 +37,16 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_db_leitura] = override_get_db
+# Sem workers em segundo plano: os testes executam a fila explicitamente.
+fila_de_teste = FilaTarefas(TestingSessionLocal)
+app.dependency_overrides[get_fila_tarefas] = lambda: fila_de_teste
 
 client = TestClient(app)
 
+# Contas criadas sem data_vencimento vencem no dia da criação.
+HOJE = date.today().isoformat()
+
 
 def test_deve_listar_contas_a_pagar_e_receber():
     Base.metadata.drop_all(bind=engine)
@@ -47,8 +60,10 @@ def test_deve_listar_contas_a_pagar_e_receber():
     response = client.get("/contas_a_pagar_e_receber")
     assert response.status_code == 200
     assert response.json() == [
-        {'id': 1, "descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"},
-        {'id': 2, "descricao": "Salário", "valor": 5000, "tipo": "RECEBER"}
+        {'id': 1, "descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR",
+         "data_vencimento": HOJE},
+        {'id': 2, "descricao": "Salário", "valor": 5000, "tipo": "RECEBER",
+         "data_vencimento": HOJE}
     ]
 
 
@@ -62,6 +77,7 @@ def test_deve_criar_conta_a_pagar_e_receber():
     }
     nova_conta_copy = nova_conta.copy()
     nova_conta_copy["id"] = 1
+    nova_conta_copy["data_vencimento"] = HOJE
 
     response = client.post("/contas_a_pagar_e_receber", json=nova_conta)
     assert response.status_code == 201
@@ -86,7 +102,8 @@ def test_deve_obter_uma_unica_conta_a_pagar_e_receber():
         "id": id_conta_a_pagar_e_receber,
         "descricao": "Curso de Python",
         "valor": 333.0,
-        "tipo": "PAGAR"
+        "tipo": "PAGAR",
+        "data_vencimento": HOJE
     }
 
 
@@ -121,7 +138,8 @@ def test_deve_atualizar_conta_a_pagar_e_receber():
         "id": id_conta_a_pagar_e_receber,
         "descricao": "Curso de FastAPI",
         "valor": 333.0,
-        "tipo": "PAGAR"
+        "tipo": "PAGAR",
+        "data_vencimento": HOJE
     }
 
 
@@ -215,3 +233,533 @@ def test_deve_retornar_erro_quando_valor_for_zero_ou_menor():
     response = client.post("/contas_a_pagar_e_receber", json=nova_conta)
     assert response.status_code == 422
     assert response.json()["detail"][0]["loc"] == ["body", "valor"]
+
+
+def test_deve_paginar_contas_a_pagar_e_receber_com_cursor():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    for i in range(5):
+        client.post("/contas_a_pagar_e_receber",
+                    json={"descricao": f"Conta {i + 1}", "valor": 10, "tipo": "PAGAR"})
+
+    response = client.get("/contas_a_pagar_e_receber", params={"limite": 2})
+    assert response.status_code == 200
+    assert [conta["id"] for conta in response.json()] == [1, 2]
+    cursor = response.headers["X-Proximo-Cursor"]
+
+    response = client.get("/contas_a_pagar_e_receber",
+                          params={"limite": 2, "cursor": cursor})
+    assert [conta["id"] for conta in response.json()] == [3, 4]
+    cursor = response.headers["X-Proximo-Cursor"]
+
+    response = client.get("/contas_a_pagar_e_receber",
+                          params={"limite": 2, "cursor": cursor})
+    assert [conta["id"] for conta in response.json()] == [5]
+    assert "X-Proximo-Cursor" not in response.headers
+
+
+def test_deve_filtrar_contas_a_pagar_e_receber():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000, "tipo": "PAGAR"})
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"})
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Freelance", "valor": 300, "tipo": "RECEBER"})
+
+    response = client.get("/contas_a_pagar_e_receber",
+                          params={"tipo": "RECEBER", "valor_minimo": 500})
+    assert response.status_code == 200
+    assert response.json() == [
+        {'id': 2, "descricao": "Salário", "valor": 5000, "tipo": "RECEBER",
+         "data_vencimento": HOJE}
+    ]
+
+
+def test_deve_filtrar_contas_a_pagar_e_receber_por_vencimento():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    for descricao, vencimento in (("Janeiro", "2024-01-10"), ("Fevereiro", "2024-02-10"),
+                                  ("Março", "2024-03-10")):
+        client.post("/contas_a_pagar_e_receber",
+                    json={"descricao": descricao, "valor": 100, "tipo": "PAGAR",
+                          "data_vencimento": vencimento})
+
+    response = client.get("/contas_a_pagar_e_receber",
+                          params={"vencimento_de": "2024-02-01",
+                                  "vencimento_ate": "2024-02-29"})
+    assert response.status_code == 200
+    assert response.json() == [
+        {'id': 2, "descricao": "Fevereiro", "valor": 100, "tipo": "PAGAR",
+         "data_vencimento": "2024-02-10"}
+    ]
+
+
+def test_deve_retornar_erro_para_cursor_invalido():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    response = client.get("/contas_a_pagar_e_receber", params={"cursor": "invalido"})
+    assert response.status_code == 400
+    assert response.json() == {"message": "Cursor de paginação inválido"}
+
+
+def test_deve_retornar_erro_para_cursor_com_id_booleano():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # {"id": true}
+    response = client.get("/contas_a_pagar_e_receber", params={"cursor": "eyJpZCI6dHJ1ZX0"})
+    assert response.status_code == 400
+    assert response.json() == {"message": "Cursor de paginação inválido"}
+
+
+def test_deve_retornar_erro_para_cursor_com_id_fora_da_faixa():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    for ultimo_id in (2 ** 31, -2 ** 31 - 1, 10 ** 30):
+        response = client.get("/contas_a_pagar_e_receber",
+                              params={"cursor": codificar_cursor(ultimo_id)})
+        assert response.status_code == 400
+        assert response.json() == {"message": "Cursor de paginação inválido"}
+
+
+def test_deve_retornar_erro_quando_limite_exceder_o_maximo():
+    response = client.get("/contas_a_pagar_e_receber", params={"limite": 100000})
+    assert response.status_code == 422
+
+
+def test_deve_exportar_contas_a_pagar_e_receber_em_ndjson():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"})
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"})
+
+    response = client.get("/contas_a_pagar_e_receber/exportar")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(linha) for linha in response.text.splitlines()] == [
+        {"id": 1, "descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR",
+         "fornecedor_id": None, "data_vencimento": HOJE},
+        {"id": 2, "descricao": "Salário", "valor": 5000, "tipo": "RECEBER",
+         "fornecedor_id": None, "data_vencimento": HOJE},
+    ]
+
+
+def test_deve_exportar_contas_a_pagar_e_receber_em_csv():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"})
+
+    response = client.get("/contas_a_pagar_e_receber/exportar",
+                          params={"formato": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.text.splitlines() == [
+        "id,descricao,valor,tipo,fornecedor_id,data_vencimento",
+        f"1,Aluguel,1000.5,PAGAR,,{HOJE}",
+    ]
+
+
+def test_deve_criar_contas_a_pagar_e_receber_em_lote():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    response = client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"},
+        {"descricao": "Salário", "valor": 5000, "tipo": "RECEBER",
+         "data_vencimento": "2024-05-05"},
+    ])
+    assert response.status_code == 201
+    assert response.json() == [
+        {"id": 1, "status": 201,
+         "conta": {"id": 1, "descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR",
+                   "data_vencimento": HOJE}},
+        {"id": 2, "status": 201,
+         "conta": {"id": 2, "descricao": "Salário", "valor": 5000, "tipo": "RECEBER",
+                   "data_vencimento": "2024-05-05"}},
+    ]
+    assert len(client.get("/contas_a_pagar_e_receber").json()) == 2
+
+
+def test_deve_rejeitar_o_lote_inteiro_quando_um_item_for_invalido():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    response = client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"},
+        {"descricao": "Salário", "valor": 0, "tipo": "RECEBER"},
+    ])
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 1, "valor"]
+    assert client.get("/contas_a_pagar_e_receber").json() == []
+
+
+def test_deve_informar_por_item_o_fornecedor_inexistente_na_criacao_em_lote():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+
+    response = client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR", "fornecedor_id": 1},
+        {"descricao": "Energia", "valor": 300, "tipo": "PAGAR", "fornecedor_id": 99},
+        {"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"},
+    ])
+    assert response.status_code == 201
+    assert response.json() == [
+        {"id": 1, "status": 201,
+         "conta": {"id": 1, "descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR",
+                   "data_vencimento": HOJE}},
+        {"status": 422, "message": "Fornecedor não encontrado"},
+        {"id": 2, "status": 201,
+         "conta": {"id": 2, "descricao": "Salário", "valor": 5000, "tipo": "RECEBER",
+                   "data_vencimento": HOJE}},
+    ]
+
+    response = client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": "Energia", "valor": 300, "tipo": "PAGAR", "fornecedor_id": 99},
+    ])
+    assert response.json() == [{"status": 422, "message": "Fornecedor não encontrado"}]
+    assert len(client.get("/contas_a_pagar_e_receber").json()) == 2
+
+
+def test_deve_atualizar_contas_a_pagar_e_receber_em_lote():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"})
+
+    response = client.put("/contas_a_pagar_e_receber/lote", json=[
+        {"id": 1, "descricao": "Aluguel novo", "valor": 1200, "tipo": "PAGAR"},
+        {"id": 100, "descricao": "Inexistente", "valor": 10, "tipo": "PAGAR"},
+    ])
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "status": 200,
+         "conta": {"id": 1, "descricao": "Aluguel novo", "valor": 1200, "tipo": "PAGAR",
+                   "data_vencimento": HOJE}},
+        {"id": 100, "status": 404, "message": "Conta a Pagar e Receber não encontrado"},
+    ]
+    assert client.get("/contas_a_pagar_e_receber/1").json()["descricao"] == "Aluguel novo"
+
+
+def test_deve_remover_contas_a_pagar_e_receber_em_lote():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"})
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"})
+
+    response = client.request("DELETE", "/contas_a_pagar_e_receber/lote",
+                              json=[1, 100])
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "status": 204},
+        {"id": 100, "status": 404, "message": "Conta a Pagar e Receber não encontrado"},
+    ]
+    assert [conta["id"] for conta in client.get("/contas_a_pagar_e_receber").json()] == [2]
+
+
+def test_deve_remover_uma_vez_o_id_repetido_no_lote():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"})
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"})
+
+    response = client.request("DELETE", "/contas_a_pagar_e_receber/lote",
+                              json=[2, 2, 99])
+    assert response.json() == [
+        {"id": 2, "status": 204},
+        {"id": 2, "status": 404, "message": "Conta a Pagar e Receber não encontrado"},
+        {"id": 99, "status": 404, "message": "Conta a Pagar e Receber não encontrado"},
+    ]
+
+
+def test_deve_executar_um_unico_comando_sql_por_escrita():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    conta = {"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"}
+
+    with contar_comandos_sql() as comandos:
+        client.post("/contas_a_pagar_e_receber", json=conta)
+    assert len(comandos) == 1
+
+    with contar_comandos_sql() as comandos:
+        client.put("/contas_a_pagar_e_receber/1", json=conta)
+    assert len(comandos) == 1
+
+    with contar_comandos_sql() as comandos:
+        client.delete("/contas_a_pagar_e_receber/1")
+    assert len(comandos) == 1
+
+
+def test_deve_invalidar_o_cache_da_conta_nas_escritas_em_lote():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"})
+    assert client.get("/contas_a_pagar_e_receber/1").json()["descricao"] == "Aluguel"
+
+    client.put("/contas_a_pagar_e_receber/lote", json=[
+        {"id": 1, "descricao": "Aluguel novo", "valor": 1200, "tipo": "PAGAR"},
+    ])
+    assert client.get("/contas_a_pagar_e_receber/1").json()["descricao"] == "Aluguel novo"
+
+    client.request("DELETE", "/contas_a_pagar_e_receber/lote", json=[1])
+    assert client.get("/contas_a_pagar_e_receber/1").status_code == 404
+
+
+def test_deve_responder_304_na_listagem_sem_consultar_as_contas():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"})
+    response = client.get("/contas_a_pagar_e_receber")
+    etag = response.headers["ETag"]
+    assert "Last-Modified" in response.headers
+
+    with contar_comandos_sql() as comandos:
+        response = client.get("/contas_a_pagar_e_receber",
+                              headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert len(comandos) == 1
+    assert "contas_a_pagar_e_receber" not in comandos[0]
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"})
+    response = client.get("/contas_a_pagar_e_receber",
+                          headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_deve_responder_304_para_conta_nao_modificada():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"})
+    etag = client.get("/contas_a_pagar_e_receber/1").headers["ETag"]
+
+    response = client.get("/contas_a_pagar_e_receber/1",
+                          headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.put("/contas_a_pagar_e_receber/1",
+               json={"descricao": "Aluguel novo", "valor": 1000.5, "tipo": "PAGAR"})
+    response = client.get("/contas_a_pagar_e_receber/1",
+                          headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["descricao"] == "Aluguel novo"
+
+
+def test_deve_resumir_contas_por_tipo_e_fornecedor():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR", "fornecedor_id": 1},
+        {"descricao": "Energia", "valor": 200, "tipo": "PAGAR", "fornecedor_id": 1},
+        {"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"},
+    ])
+
+    response = client.get("/contas_a_pagar_e_receber/resumo")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"tipo": "PAGAR", "quantidade": 2, "total": 1200.5},
+        {"tipo": "RECEBER", "quantidade": 1, "total": 5000},
+    ]
+
+    response = client.get("/contas_a_pagar_e_receber/resumo",
+                          params={"agrupar_por": "fornecedor", "tipo": "PAGAR"})
+    assert response.json() == [
+        {"fornecedor_id": 1, "quantidade": 2, "total": 1200.5},
+    ]
+
+    response = client.get("/contas_a_pagar_e_receber/resumo",
+                          params=[("agrupar_por", "tipo"), ("agrupar_por", "fornecedor")])
+    assert response.json() == [
+        {"tipo": "PAGAR", "fornecedor_id": 1, "quantidade": 2, "total": 1200.5},
+        {"tipo": "RECEBER", "fornecedor_id": None, "quantidade": 1, "total": 5000},
+    ]
+
+
+def test_deve_manter_o_saldo_atualizado_nas_escritas():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR",
+                      "fornecedor_id": 1})
+    client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": "Energia", "valor": 200, "tipo": "PAGAR", "fornecedor_id": 1},
+        {"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"},
+    ])
+    client.put("/contas_a_pagar_e_receber/2",
+               json={"descricao": "Reembolso", "valor": 300, "tipo": "RECEBER"})
+    client.delete("/contas_a_pagar_e_receber/1")
+
+    response = client.get("/contas_a_pagar_e_receber/saldo")
+    assert response.status_code == 200
+    assert response.json() == {"quantidade": 2, "total_pagar": 0,
+                               "total_receber": 5300, "saldo": 5300}
+
+    response = client.get("/contas_a_pagar_e_receber/saldo/fornecedores")
+    assert response.json() == [
+        {"fornecedor_id": None, "quantidade": 1, "total_pagar": 0,
+         "total_receber": 5000, "saldo": 5000},
+        {"fornecedor_id": 1, "quantidade": 1, "total_pagar": 0,
+         "total_receber": 300, "saldo": 300},
+    ]
+    response = client.get("/contas_a_pagar_e_receber/saldo/fornecedores",
+                          params={"fornecedor_id": 1})
+    assert [saldo["fornecedor_id"] for saldo in response.json()] == [1]
+    response = client.get("/contas_a_pagar_e_receber/saldo/fornecedores",
+                          params={"fornecedor_id": -1})
+    assert response.json() == []
+
+
+def test_deve_retornar_saldo_zerado_sem_contas():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    response = client.get("/contas_a_pagar_e_receber/saldo")
+    assert response.status_code == 200
+    assert response.json() == {"quantidade": 0, "total_pagar": 0,
+                               "total_receber": 0, "saldo": 0}
+
+
+def test_deve_buscar_contas_pela_descricao():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": "Conta de energia", "valor": 200, "tipo": "PAGAR"},
+        {"descricao": "Energia solar", "valor": 150, "tipo": "RECEBER"},
+        {"descricao": "Aluguel", "valor": 1000, "tipo": "PAGAR"},
+    ])
+
+    response = client.get("/contas_a_pagar_e_receber/busca", params={"q": "ENERGIA"})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 2, "descricao": "Energia solar", "valor": 150, "tipo": "RECEBER",
+         "data_vencimento": HOJE},
+        {"id": 1, "descricao": "Conta de energia", "valor": 200, "tipo": "PAGAR",
+         "data_vencimento": HOJE},
+    ]
+
+
+def test_deve_expandir_fornecedor_com_numero_fixo_de_comandos_sql():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    for i in range(3):
+        client.post("/fornecedor-cliente", json={"nome": f"Fornecedor {i + 1}"})
+    client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": f"Conta {i + 1}", "valor": 10, "tipo": "PAGAR",
+         "fornecedor_id": i % 3 + 1}
+        for i in range(20)
+    ] + [{"descricao": "Sem fornecedor", "valor": 10, "tipo": "RECEBER"}])
+
+    with contar_comandos_sql() as comandos:
+        response = client.get("/contas_a_pagar_e_receber",
+                              params={"expand": "fornecedor"})
+    assert response.status_code == 200
+    contas = response.json()
+    assert len(contas) == 21
+    assert contas[0] == {"id": 1, "descricao": "Conta 1", "valor": 10, "tipo": "PAGAR",
+                         "data_vencimento": HOJE,
+                         "fornecedor": {"id": 1, "nome": "Fornecedor 1"}}
+    assert contas[-1]["fornecedor"] is None
+    # versão das tabelas (ETag) + página de contas + fornecedores da página
+    assert len(comandos) == 3
+
+    response = client.get("/contas_a_pagar_e_receber", params={"limite": 1})
+    assert response.json() == [
+        {"id": 1, "descricao": "Conta 1", "valor": 10, "tipo": "PAGAR",
+         "data_vencimento": HOJE}
+    ]
+
+
+def test_deve_manter_o_schema_openapi_da_listagem():
+    response = client.get("/openapi.json")
+    listagem = response.json()["paths"]["/contas_a_pagar_e_receber/"]["get"]
+    assert listagem["responses"]["200"]["content"]["application/json"]["schema"] == {
+        "type": "array",
+        "items": {"$ref": "#/components/schemas/ContasPagarReceberComFornecedorResponse"},
+        "title": "Response Lista Contas Contas A Pagar E Receber  Get",
+    }
+
+
+def test_deve_gerar_contas_recorrentes_em_segundo_plano():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    client.post("/contas_a_pagar_e_receber/lote", json=[
+        {"descricao": "Aluguel", "valor": 1000, "tipo": "PAGAR",
+         "data_vencimento": "2024-01-31"},
+        {"descricao": "Internet", "valor": 100, "tipo": "PAGAR",
+         "data_vencimento": "2024-01-10"},
+    ])
+
+    pedido = {"mes_origem": "2024-01", "mes_destino": "2024-02"}
+    response = client.post("/contas_a_pagar_e_receber/recorrentes", json=pedido)
+    assert response.status_code == 202
+    assert response.headers["location"] == f"/tarefas/{response.json()['id']}"
+    assert response.json()["status"] == "PENDENTE"
+
+    assert fila_de_teste.processar_pendentes() == 1
+    tarefa = client.get(response.headers["location"]).json()
+    assert tarefa["status"] == "CONCLUIDA"
+    assert tarefa["resultado"] == {"geradas": 2, "ja_existentes": 0}
+
+    # Reenviar para o mesmo mês não duplica as contas.
+    client.post("/contas_a_pagar_e_receber/recorrentes", json=pedido)
+    assert fila_de_teste.processar_pendentes() == 1
+
+    fevereiro = client.get("/contas_a_pagar_e_receber",
+                           params={"vencimento_de": "2024-02-01"}).json()
+    assert [(conta["descricao"], conta["data_vencimento"]) for conta in fevereiro] == [
+        ("Aluguel", "2024-02-29"), ("Internet", "2024-02-10")]
+
+
+def test_deve_gerar_relatorio_de_conciliacao_em_segundo_plano():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    client.post("/contas_a_pagar_e_receber",
+                json={"descricao": "Aluguel", "valor": 1000, "tipo": "PAGAR"})
+
+    response = client.post("/contas_a_pagar_e_receber/conciliacao")
+    assert response.status_code == 202
+    fila_de_teste.processar_pendentes()
+
+    resultado = client.get(response.headers["location"]).json()["resultado"]
+    assert resultado == {"consistente": True, "divergencias": [],
+                         "totais": {"quantidade": 1, "total_pagar": 1000,
+                                    "total_receber": 0}}
+
+
+def test_deve_validar_o_mes_das_contas_recorrentes():
+    response = client.post("/contas_a_pagar_e_receber/recorrentes",
+                           json={"mes_origem": "2024-13", "mes_destino": "2024-02"})
+    assert response.status_code == 422
+    assert client.get("/tarefas/999").status_code == 404
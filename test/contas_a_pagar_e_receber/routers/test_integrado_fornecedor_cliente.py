@@ -1,10 +1,14 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, StaticPool
 from sqlalchemy.orm import sessionmaker
 
 from main import app
 from shared import Base
-from shared.dependencies import get_db
+from shared.dependencies import get_db, get_db_leitura
+from test.contador_sql import contar_comandos_sql
 
 client = TestClient(app=app)
 
@@ -32,6 +36,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_db_leitura] = override_get_db
 
 client = TestClient(app)
 
@@ -139,4 +144,153 @@ def test_deve_retornar_erro_quando_nome_nao_estiver_dentro_dos_limites():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     response = client.post("/fornecedor-cliente", json={"nome": ""})
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+
+def test_deve_exportar_fornecedores_em_csv():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 2"})
+
+    response = client.get("/fornecedor-cliente/exportar",
+                          params={"formato": "csv"})
+    assert response.status_code == 200
+    assert response.text.splitlines() == [
+        "id,nome",
+        "1,Fornecedor 1",
+        "2,Fornecedor 2",
+    ]
+
+
+def test_deve_executar_um_unico_comando_sql_por_escrita():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    with contar_comandos_sql() as comandos:
+        client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    assert len(comandos) == 1
+
+    with contar_comandos_sql() as comandos:
+        client.put("/fornecedor-cliente/1", json={"nome": "Fornecedor 2"})
+    assert len(comandos) == 1
+
+    with contar_comandos_sql() as comandos:
+        client.delete("/fornecedor-cliente/1")
+    assert len(comandos) == 1
+
+
+def test_deve_ler_fornecedor_do_cache_e_invalidar_na_alteracao():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    client.get("/fornecedor-cliente/1")
+
+    with contar_comandos_sql() as comandos:
+        response = client.get("/fornecedor-cliente/1")
+    assert response.json() == {"id": 1, "nome": "Fornecedor 1"}
+    assert len(comandos) == 0
+
+    client.put("/fornecedor-cliente/1", json={"nome": "Fornecedor 2"})
+    assert client.get("/fornecedor-cliente/1").json() == {"id": 1, "nome": "Fornecedor 2"}
+
+    client.delete("/fornecedor-cliente/1")
+    assert client.get("/fornecedor-cliente/1").status_code == 404
+
+
+def test_deve_responder_304_com_if_modified_since_na_listagem():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    ultima_modificacao = client.get("/fornecedor-cliente").headers["Last-Modified"]
+
+    response = client.get("/fornecedor-cliente",
+                          headers={"If-Modified-Since": ultima_modificacao})
+    assert response.status_code == 304
+    assert response.headers["Last-Modified"] == ultima_modificacao
+
+
+def test_nao_deve_responder_304_com_if_modified_since_apos_escrita_no_mesmo_segundo():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    ultima_modificacao = client.get("/fornecedor-cliente").headers["Last-Modified"]
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 2"})
+
+    response = client.get("/fornecedor-cliente",
+                          headers={"If-Modified-Since": ultima_modificacao})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    # A segunda escrita ficou um segundo à frente, mas o cabeçalho não passa
+    # da hora atual.
+    assert parsedate_to_datetime(response.headers["Last-Modified"]) <= \
+        datetime.now(timezone.utc)
+
+
+def test_deve_buscar_fornecedores_por_parte_do_nome():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    for nome in ("Padaria Central", "Central de Compras", "Mercado 100%", "Posto"):
+        client.post("/fornecedor-cliente", json={"nome": nome})
+
+    response = client.get("/fornecedor-cliente/busca", params={"q": "central"})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 2, "nome": "Central de Compras"},
+        {"id": 1, "nome": "Padaria Central"},
+    ]
+    response = client.get("/fornecedor-cliente/busca", params={"q": "central", "limite": 1})
+    assert [fornecedor["id"] for fornecedor in response.json()] == [2]
+    response = client.get("/fornecedor-cliente/busca", params={"q": "00%"})
+    assert [fornecedor["id"] for fornecedor in response.json()] == [3]
+
+    assert client.get("/fornecedor-cliente/busca", params={"q": "ce"}).status_code == 422
+
+
+def test_deve_repetir_resposta_do_post_com_a_mesma_idempotency_key():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    cabecalhos = {"Idempotency-Key": "fornecedor-repetido"}
+
+    primeira = client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"},
+                           headers=cabecalhos)
+    repetida = client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"},
+                           headers=cabecalhos)
+    assert primeira.status_code == repetida.status_code == 201
+    assert repetida.json() == primeira.json() == {"id": 1, "nome": "Fornecedor 1"}
+    assert "Idempotent-Replayed" not in primeira.headers
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert len(client.get("/fornecedor-cliente").json()) == 1
+
+    outro_corpo = client.post("/fornecedor-cliente", json={"nome": "Fornecedor 2"},
+                              headers=cabecalhos)
+    assert outro_corpo.status_code == 422
+    assert len(client.get("/fornecedor-cliente").json()) == 1
+
+
+def test_deve_buscar_fornecedores_em_lote_informando_os_inexistentes():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 1"})
+    client.post("/fornecedor-cliente", json={"nome": "Fornecedor 2"})
+
+    with contar_comandos_sql() as comandos:
+        response = client.get("/fornecedor-cliente/lote?ids=2,99,1")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 2, "status": 200, "fornecedor": {"id": 2, "nome": "Fornecedor 2"}},
+        {"id": 99, "status": 404, "message": "Fornecedor não encontrado"},
+        {"id": 1, "status": 200, "fornecedor": {"id": 1, "nome": "Fornecedor 1"}},
+    ]
+    assert len(comandos) == 1
+
+    # Os encontrados ficam no cache e não voltam ao banco.
+    with contar_comandos_sql() as comandos:
+        assert client.get("/fornecedor-cliente/lote?ids=1,2").status_code == 200
+    assert comandos == []
+
+    assert client.get("/fornecedor-cliente/lote?ids=1,,2").status_code == 422
@@ -0,0 +1,131 @@
+import os
+from datetime import date
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, func, insert, select, text
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber, \
+    ContaPagarReceberArquivada, FornecedorCliente, TOTAL_GERAL
+from contas_a_pagar_e_receber.particoes import arquivar, criar_particoes, \
+    particoes_mensais, somar_meses
+from contas_a_pagar_e_receber.saldo import verificar_saldo
+from shared import Base
+from shared.versao_tabela import VersaoTabela
+
+engine = create_engine("sqlite:///./test.db")
+
+# Banco Postgres descartável (o esquema public é apagado) para os testes
+# que dependem do particionamento, que só existe lá.
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+def test_deve_somar_meses_atravessando_o_ano():
+    assert somar_meses(date(2023, 11, 1), 3) == date(2024, 2, 1)
+    assert somar_meses(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_deve_arquivar_contas_vencidas_antes_do_corte():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conexao:
+        conexao.execute(insert(ContaPagarReceber), [
+            {"descricao": "Aluguel", "valor": 1000, "tipo": "PAGAR",
+             "data_vencimento": date(2023, 1, 10)},
+            {"descricao": "Salário", "valor": 5000, "tipo": "RECEBER",
+             "data_vencimento": date(2023, 2, 28)},
+            {"descricao": "Luz", "valor": 200, "tipo": "PAGAR",
+             "data_vencimento": date(2023, 3, 1)},
+        ])
+        versao = conexao.execute(select(VersaoTabela.versao).where(
+            VersaoTabela.tabela == ContaPagarReceber.__tablename__)).scalar()
+
+        # Sem particionamento (SQLite) não há partições a criar.
+        assert criar_particoes(conexao, date(2030, 1, 1)) == []
+        assert arquivar(conexao, date(2023, 3, 1)) == {"particoes": [], "linhas": 2}
+
+        assert conexao.execute(select(ContaPagarReceber.descricao)).scalars().all() == ["Luz"]
+        assert conexao.execute(select(ContaPagarReceberArquivada.id)
+                               .order_by(ContaPagarReceberArquivada.id)).scalars().all() == [1, 2]
+        assert verificar_saldo(conexao) == []
+        assert conexao.execute(select(VersaoTabela.versao).where(
+            VersaoTabela.tabela == ContaPagarReceber.__tablename__)).scalar() > versao
+    engine.dispose()
+
+
+def ids_das_contas(conexao, modelo=ContaPagarReceber) -> list[int]:
+    return conexao.execute(select(modelo.id).order_by(modelo.id)).scalars().all()
+
+
+@pytest.mark.skipif(TEST_POSTGRES_URL is None, reason="TEST_POSTGRES_URL não definida")
+def test_deve_particionar_arquivar_e_desfazer_no_postgres():
+    engine_postgres = create_engine(TEST_POSTGRES_URL)
+    with engine_postgres.begin() as conexao:
+        conexao.execute(text("DROP SCHEMA public CASCADE"))
+        conexao.execute(text("CREATE SCHEMA public"))
+    configuracao = Config("alembic.ini")
+    configuracao.set_main_option("sqlalchemy.url", TEST_POSTGRES_URL)
+    mes_atual = date.today().replace(day=1)
+    # Primeiro mês sem partição depois da migração (ela cria 12 à frente).
+    sem_particao = somar_meses(mes_atual, 12)
+
+    command.upgrade(configuracao, "a4c8e1f6b209")
+    with engine_postgres.begin() as conexao:
+        conexao.execute(insert(FornecedorCliente), [{"nome": "Fornecedor 1"}])
+        conexao.execute(insert(ContaPagarReceber), [
+            {"descricao": "Aluguel", "valor": 1000, "tipo": "PAGAR",
+             "fornecedor_id": 1, "data_vencimento": date(2023, 1, 10)},
+            {"descricao": "Salário", "valor": 5000, "tipo": "RECEBER",
+             "fornecedor_id": None, "data_vencimento": date(2023, 2, 28)},
+            {"descricao": "Luz", "valor": 200, "tipo": "PAGAR",
+             "fornecedor_id": 1, "data_vencimento": date(2023, 3, 1)},
+            {"descricao": "Internet", "valor": 100, "tipo": "PAGAR",
+             "fornecedor_id": 1, "data_vencimento": mes_atual},
+        ])
+
+    command.upgrade(configuracao, "head")
+    with engine_postgres.begin() as conexao:
+        particoes = particoes_mensais(conexao, ContaPagarReceber.__tablename__)
+        assert {date(2023, 1, 1), date(2023, 3, 1), mes_atual} <= particoes.keys()
+        assert ids_das_contas(conexao) == [1, 2, 3, 4]
+        assert verificar_saldo(conexao) == []
+
+        # Conta que caiu na partição padrão vai para a partição nova com o
+        # mesmo id; um id repetido em outra partição impede a recriação.
+        conexao.execute(insert(ContaPagarReceber).values(
+            descricao="Seguro", valor=300, tipo="PAGAR", fornecedor_id=1,
+            data_vencimento=sem_particao))
+        assert criar_particoes(conexao, sem_particao) == [
+            f"contas_a_pagar_e_receber_p{sem_particao:%Y_%m}"]
+        assert ids_das_contas(conexao) == [1, 2, 3, 4, 5]
+        assert verificar_saldo(conexao) == []
+
+    with pytest.raises(RuntimeError, match=r"\[5\]"):
+        with engine_postgres.begin() as conexao:
+            proximo = somar_meses(sem_particao, 1)
+            conexao.execute(insert(ContaPagarReceber), [
+                {"id": 5, "descricao": "Duplicada", "valor": 1, "tipo": "PAGAR",
+                 "data_vencimento": proximo}])
+            criar_particoes(conexao, proximo)
+
+    with engine_postgres.begin() as conexao:
+        assert arquivar(conexao, date(2023, 3, 1)) == {
+            "particoes": ["contas_a_pagar_e_receber_arquivo_p2023_01",
+                          "contas_a_pagar_e_receber_arquivo_p2023_02"],
+            "linhas": 0}
+        assert ids_das_contas(conexao) == [3, 4, 5]
+        assert ids_das_contas(conexao, ContaPagarReceberArquivada) == [1, 2]
+        assert verificar_saldo(conexao) == []
+
+    command.downgrade(configuracao, "a4c8e1f6b209")
+    with engine_postgres.begin() as conexao:
+        assert ids_das_contas(conexao) == [1, 2, 3, 4, 5]
+        # Nessa revisão ainda não existe a linha do total geral.
+        assert [divergencia["fornecedor_id"]
+                for divergencia in verificar_saldo(conexao)] == [TOTAL_GERAL]
+        assert conexao.execute(select(func.count()).select_from(text(
+            "pg_inherits"))).scalar() == 0
+
+    command.downgrade(configuracao, "base")
+    engine_postgres.dispose()
@@ -0,0 +1,87 @@
+import os
+import threading
+
+import pytest
+from sqlalchemy import create_engine, insert, text, update
+from sqlalchemy.orm import sessionmaker
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber, FornecedorCliente, \
+    SaldoFornecedor, TOTAL_GERAL
+from contas_a_pagar_e_receber.routers.contas_a_pagar_e_receber_router import \
+    ContasPagarReceberLoteRequest, atualizar_contas_em_lote, remover_contas_em_lote
+from contas_a_pagar_e_receber.saldo import reconstruir_saldo, verificar_saldo
+from shared import Base
+from shared.cache import Cache
+
+engine = create_engine("sqlite:///./test.db")
+# Banco Postgres descartável (o esquema public é apagado): os locks de linha
+# só existem lá.
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+def test_deve_detectar_e_reconstruir_saldo_divergente():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conexao:
+        conexao.execute(insert(ContaPagarReceber), [
+            {"descricao": "Aluguel", "valor": 1000.5, "tipo": "PAGAR"},
+            {"descricao": "Salário", "valor": 5000, "tipo": "RECEBER"},
+        ])
+        assert verificar_saldo(conexao) == []
+
+        conexao.execute(update(SaldoFornecedor).values(total_receber=0))
+        divergencias = verificar_saldo(conexao)
+        assert [divergencia["fornecedor_id"] for divergencia in divergencias] == [
+            TOTAL_GERAL, 0]
+
+        reconstruir_saldo(conexao)
+        assert verificar_saldo(conexao) == []
+    engine.dispose()
+
+
+# Cada lote tem contas dos dois fornecedores, em ordens opostas. Escrevendo na
+# ordem recebida, os triggers travavam os saldos em ordens opostas e o
+# Postgres abortava um dos lotes por deadlock.
+@pytest.mark.skipif(TEST_POSTGRES_URL is None, reason="TEST_POSTGRES_URL não definida")
+def test_deve_atualizar_lotes_concorrentes_sem_deadlock_no_postgres():
+    engine_postgres = create_engine(TEST_POSTGRES_URL, pool_size=4)
+    with engine_postgres.begin() as conexao:
+        conexao.execute(text("DROP SCHEMA public CASCADE"))
+        conexao.execute(text("CREATE SCHEMA public"))
+    Base.metadata.create_all(bind=engine_postgres)
+    with engine_postgres.begin() as conexao:
+        conexao.execute(insert(FornecedorCliente), [{"nome": "A"}, {"nome": "B"}])
+        conexao.execute(insert(ContaPagarReceber), [
+            {"descricao": f"Conta {i}", "valor": 10, "tipo": "PAGAR",
+             "fornecedor_id": i % 2 + 1} for i in range(4)])
+    Sessao = sessionmaker(bind=engine_postgres)
+
+    def lote(ids: list[int], valor: int) -> list[ContasPagarReceberLoteRequest]:
+        return [ContasPagarReceberLoteRequest(id=id_conta, descricao="Conta", valor=valor,
+                                              tipo="PAGAR") for id_conta in ids]
+
+    erros = []
+
+    def atualizar(ids: list[int], barreira: threading.Barrier):
+        with Sessao() as db:
+            try:
+                barreira.wait()
+                atualizar_contas_em_lote(lote(ids, len(ids)), db, Cache())
+            except Exception as erro:
+                erros.append(erro)
+
+    for _ in range(20):
+        barreira = threading.Barrier(2)
+        threads = [threading.Thread(target=atualizar, args=(ids, barreira))
+                   for ids in ([1, 2], [4, 3])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert erros == []
+    with Sessao() as db:
+        remover_contas_em_lote([4, 1], db, Cache())
+    with engine_postgres.connect() as conexao:
+        assert verificar_saldo(conexao) == []
+    engine_postgres.dispose()
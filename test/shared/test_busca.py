@@ -0,0 +1,45 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+
+from contas_a_pagar_e_receber.models import FornecedorCliente
+from shared import Base
+from shared.busca import buscar, consulta_busca
+
+# Banco Postgres descartável (o esquema public é apagado): pg_trgm só existe lá.
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.mark.skipif(TEST_POSTGRES_URL is None, reason="TEST_POSTGRES_URL não definida")
+def test_deve_buscar_pela_distancia_com_uma_varredura_knn_no_postgres():
+    engine_postgres = create_engine(TEST_POSTGRES_URL)
+    with engine_postgres.begin() as conexao:
+        conexao.execute(text("DROP SCHEMA public CASCADE"))
+        conexao.execute(text("CREATE SCHEMA public"))
+    Base.metadata.create_all(bind=engine_postgres)
+    with engine_postgres.begin() as conexao:
+        conexao.execute(insert(FornecedorCliente), [
+            {"nome": nome} for nome in ("Padaria Central", "Central", "Posto",
+                                        "Central")])
+
+    colunas = (FornecedorCliente.id, FornecedorCliente.nome)
+    with Session(engine_postgres) as db:
+        fornecedores = buscar(db, select(*colunas), FornecedorCliente.nome,
+                              "central", 3, FornecedorCliente.id).all()
+    assert [tuple(fornecedor) for fornecedor in fornecedores] == [
+        (2, "Central"), (4, "Central"), (1, "Padaria Central")]
+
+    # Com poucas linhas o planejador preferiria ler a tabela inteira.
+    consulta = consulta_busca(select(*colunas), FornecedorCliente.nome,
+                              "central", 3, FornecedorCliente.id, "postgresql")
+    sql = str(consulta.compile(engine_postgres, compile_kwargs={"literal_binds": True}))
+    with engine_postgres.connect() as conexao:
+        conexao.execute(text("SET enable_seqscan = off"))
+        plano = "\n".join(linha[0] for linha in
+                          conexao.exec_driver_sql(f"EXPLAIN {sql}"))
+    assert "Index Cond: ((nome)::text % 'central'::text)" in plano
+    assert "Order By: ((nome)::text <-> 'central'::text)" in plano
+    assert "Filter" not in plano
+    engine_postgres.dispose()
@@ -0,0 +1,171 @@
+import fnmatch
+
+from shared.cache import CacheEmMemoria, CacheRedis
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+class ErroRedisFake(Exception):
+    pass
+
+
+class RedisFake:
+    def __init__(self):
+        self.dados = {}
+        self.disponivel = True
+
+    def _conferir(self):
+        if not self.disponivel:
+            raise ErroRedisFake("Connection refused")
+
+    def get(self, chave):
+        self._conferir()
+        return self.dados.get(chave)
+
+    def mget(self, chaves):
+        self._conferir()
+        return [self.dados.get(chave) for chave in chaves]
+
+    def incr(self, chave):
+        self._conferir()
+        self.dados[chave] = str(int(self.dados.get(chave, 0)) + 1).encode()
+
+    def expire(self, chave, segundos):
+        self._conferir()
+
+    def pipeline(self):
+        return PipelineFake(self)
+
+    def set(self, chave, valor, ex=None):
+        self._conferir()
+        self.dados[chave] = valor.encode()
+
+    def delete(self, *chaves):
+        self._conferir()
+        for chave in chaves:
+            self.dados.pop(chave, None)
+
+    def scan_iter(self, match="*"):
+        self._conferir()
+        return [chave for chave in self.dados if fnmatch.fnmatch(chave, match)]
+
+
+class PipelineFake:
+    def __init__(self, redis):
+        self.redis = redis
+        self.comandos = []
+
+    def __getattr__(self, nome):
+        return lambda *args: self.comandos.append((nome, args))
+
+    def execute(self):
+        self.redis._conferir()
+        for nome, args in self.comandos:
+            getattr(self.redis, nome)(*args)
+
+
+def test_deve_expirar_itens_pelo_ttl():
+    relogio = Relogio()
+    cache = CacheEmMemoria(max_itens=10, ttl=60, relogio=relogio)
+    cache.definir("conta:1", {"id": 1})
+
+    relogio.agora = 59
+    assert cache.obter("conta:1") == {"id": 1}
+    relogio.agora = 60
+    assert cache.obter("conta:1") is None
+    assert (cache.acertos, cache.falhas) == (1, 1)
+
+
+def test_deve_descartar_o_item_menos_usado_recentemente():
+    cache = CacheEmMemoria(max_itens=2, ttl=60)
+    cache.definir("conta:1", {"id": 1})
+    cache.definir("conta:2", {"id": 2})
+    cache.obter("conta:1")
+    cache.definir("conta:3", {"id": 3})
+
+    assert cache.obter("conta:2") is None
+    assert cache.obter("conta:1") == {"id": 1}
+    assert cache.obter("conta:3") == {"id": 3}
+
+
+def test_deve_usar_um_cliente_compativel_com_redis():
+    redis = RedisFake()
+    cache = CacheRedis(redis, ttl=60, prefixo="teste:", excecoes=(ErroRedisFake,))
+    cache.definir("fornecedor:1", {"id": 1, "nome": "Fornecedor 1"})
+
+    assert list(redis.dados) == ["teste:fornecedor:1"]
+    assert cache.obter("fornecedor:1") == {"id": 1, "nome": "Fornecedor 1"}
+
+    cache.remover("fornecedor:1")
+    assert cache.obter("fornecedor:1") is None
+    assert redis.dados["teste:geracao:fornecedor:1"] == b"1"
+    assert cache.status() == {"backend": "redis", "acertos": 1, "falhas": 1,
+                              "erros": 0}
+
+
+def test_deve_tratar_redis_indisponivel_como_falha_do_cache():
+    redis = RedisFake()
+    cache = CacheRedis(redis, ttl=60, prefixo="teste:", excecoes=(ErroRedisFake,))
+    cache.definir("fornecedor:1", {"id": 1})
+    redis.disponivel = False
+
+    assert cache.obter("fornecedor:1") is None
+    cache.definir("fornecedor:2", {"id": 2})
+    cache.remover("fornecedor:1")
+    cache.limpar()
+    assert cache.status() == {"backend": "redis", "acertos": 0, "falhas": 1,
+                              "erros": 4}
+
+    redis.disponivel = True
+    assert cache.obter("fornecedor:1") == {"id": 1}
+
+
+# Uma leitura carrega a linha, um PUT/DELETE invalida a chave e só depois a
+# leitura tenta gravar o que carregou.
+def test_nao_deve_gravar_valor_lido_antes_de_uma_invalidacao_em_memoria():
+    cache = CacheEmMemoria(max_itens=10, ttl=60)
+    geracao = cache.geracao("conta:1")
+    cache.remover("conta:1")
+    cache.definir("conta:1", {"id": 1, "valor": "antigo"}, geracao)
+    assert cache.obter("conta:1") is None
+
+    geracao = cache.geracao("conta:1")
+    cache.remover("conta:2")
+    cache.definir("conta:1", {"id": 1, "valor": "novo"}, geracao)
+    assert cache.obter("conta:1") == {"id": 1, "valor": "novo"}
+
+
+def test_deve_descartar_gravacao_se_a_invalidacao_ja_saiu_do_registro():
+    cache = CacheEmMemoria(max_itens=2, ttl=60)
+    geracao = cache.geracao("conta:1")
+    cache.remover("conta:1", "conta:2", "conta:3")
+    cache.definir("conta:1", {"id": 1}, geracao)
+    assert cache.obter("conta:1") is None
+
+
+def test_nao_deve_servir_valor_lido_antes_de_uma_invalidacao_no_redis():
+    redis = RedisFake()
+    cache = CacheRedis(redis, ttl=60, prefixo="teste:", excecoes=(ErroRedisFake,))
+    geracao = cache.geracao("fornecedor:1", "fornecedor:2")
+    cache.remover("fornecedor:1")
+    cache.definir("fornecedor:1", {"id": 1, "nome": "Antigo"}, geracao)
+    cache.definir("fornecedor:2", {"id": 2, "nome": "Fornecedor 2"}, geracao)
+
+    assert cache.obter("fornecedor:1") is None
+    assert cache.obter("fornecedor:2") == {"id": 2, "nome": "Fornecedor 2"}
+
+    geracao = cache.geracao("fornecedor:1")
+    cache.definir("fornecedor:1", {"id": 1, "nome": "Novo"}, geracao)
+    assert cache.obter("fornecedor:1") == {"id": 1, "nome": "Novo"}
+
+    redis.disponivel = False
+    geracao = cache.geracao("fornecedor:3")
+    redis.disponivel = True
+    cache.definir("fornecedor:3", {"id": 3}, geracao)
+    assert cache.obter("fornecedor:3") is None
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+from shared.carregador_lote import CarregadorEmLote, CarregadorEmLoteAsync
+
+
+def test_deve_juntar_em_um_lote_os_ids_pedidos_durante_uma_consulta():
+    consultas = []
+    liberar = threading.Event()
+
+    def carregar(db, ids):
+        consultas.append(set(ids))
+        if len(consultas) == 1:
+            liberar.wait(timeout=5)
+        return {id_: f"fornecedor {id_}" for id_ in ids if id_ != 4}
+
+    carregador = CarregadorEmLote(carregar)
+    resultados = {}
+
+    def pedir(ids):
+        resultados[tuple(ids)] = carregador.carregar(None, ids)
+
+    primeira = threading.Thread(target=pedir, args=([1],))
+    primeira.start()
+    while not consultas:
+        time.sleep(0.001)
+    # Chegam enquanto a primeira consulta está no banco: viram um só lote.
+    seguintes = [threading.Thread(target=pedir, args=(ids,))
+                 for ids in ([2, 3], [3, 4], [2])]
+    for thread in seguintes:
+        thread.start()
+    while carregador._pendente is None or len(carregador._pendente.ids) < 3:
+        time.sleep(0.001)
+    liberar.set()
+    for thread in [primeira, *seguintes]:
+        thread.join()
+
+    assert consultas == [{1}, {2, 3, 4}]
+    assert resultados == {
+        (1,): {1: "fornecedor 1"},
+        (2, 3): {2: "fornecedor 2", 3: "fornecedor 3"},
+        (3, 4): {3: "fornecedor 3"},
+        (2,): {2: "fornecedor 2"},
+    }
+
+
+def test_deve_juntar_pedidos_do_mesmo_ciclo_do_event_loop():
+    consultas = []
+
+    async def carregar(db, ids):
+        consultas.append(set(ids))
+        return {id_: id_ * 10 for id_ in ids}
+
+    async def pedir_concorrentes():
+        carregador = CarregadorEmLoteAsync(carregar)
+        return await asyncio.gather(carregador.carregar(None, [1, 2]),
+                                    carregador.carregar(None, [2, 3]))
+
+    assert asyncio.run(pedir_concorrentes()) == [{1: 10, 2: 20}, {2: 20, 3: 30}]
+    assert consultas == [{1, 2, 3}]
+
+
+def test_deve_liberar_o_lote_quando_a_lider_e_cancelada():
+    consultas = []
+    liberar = None
+
+    async def carregar(db, ids):
+        consultas.append(set(ids))
+        if len(consultas) == 1:
+            await liberar.wait()
+        return {id_: id_ * 10 for id_ in ids}
+
+    async def cancelar_lider():
+        nonlocal liberar
+        liberar = asyncio.Event()
+        carregador = CarregadorEmLoteAsync(carregar)
+        lider = asyncio.create_task(carregador.carregar(None, [1]))
+        seguidora = asyncio.create_task(carregador.carregar(None, [2]))
+        while not consultas:
+            await asyncio.sleep(0)
+        lider.cancel()
+        await asyncio.gather(lider, return_exceptions=True)
+
+        depois = await asyncio.wait_for(carregador.carregar(None, [3]), 1)
+        return lider.cancelled(), await asyncio.wait_for(seguidora, 1), depois
+
+    cancelada, seguidora, depois = asyncio.run(cancelar_lider())
+    assert cancelada
+    assert seguidora == {2: 20}
+    assert depois == {3: 30}
+    assert consultas[0] == {1, 2}
+
+
+def test_deve_liberar_o_lote_quando_a_lider_e_cancelada_antes_da_consulta():
+    async def carregar(db, ids):
+        return {id_: id_ * 10 for id_ in ids}
+
+    async def cancelar_lider():
+        carregador = CarregadorEmLoteAsync(carregar)
+        lider = asyncio.create_task(carregador.carregar(None, [1]))
+        await asyncio.sleep(0)
+        lider.cancel()
+        await asyncio.gather(lider, return_exceptions=True)
+        return lider.cancelled(), await asyncio.wait_for(carregador.carregar(None, [2]), 1)
+
+    assert asyncio.run(cancelar_lider()) == (True, {2: 20})
@@ -0,0 +1,87 @@
+import gzip
+
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from shared.compressao import MiddlewareCompressao, escolher_codificacao
+
+CORPO_GRANDE = "conta;" * 500
+
+app = FastAPI()
+app.add_middleware(MiddlewareCompressao, codificacoes=["br", "gzip"], minimo=100)
+
+
+@app.get("/grande")
+def grande():
+    return PlainTextResponse(CORPO_GRANDE, headers={"ETag": '"abc"'})
+
+
+@app.get("/pequeno")
+def pequeno():
+    return PlainTextResponse("ok")
+
+
+@app.get("/imagem")
+def imagem():
+    return Response(b"\x89PNG" * 100, media_type="image/png")
+
+
+@app.get("/vary")
+def vary():
+    return PlainTextResponse("ok", headers={"Vary": "Authorization"})
+
+
+@app.get("/stream")
+def stream():
+    return StreamingResponse((f"linha {i}\n" for i in range(1000)),
+                             media_type="application/x-ndjson")
+
+
+client = TestClient(app)
+
+
+def test_deve_escolher_a_codificacao_pelo_accept_encoding():
+    assert escolher_codificacao("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert escolher_codificacao("gzip;q=1, br;q=0.5", ["br", "gzip"]) == "gzip"
+    assert escolher_codificacao("*", ["br", "gzip"]) == "br"
+    assert escolher_codificacao("gzip;q=0, identity", ["gzip"]) is None
+    assert escolher_codificacao("", ["gzip"]) is None
+
+
+def test_deve_comprimir_somente_acima_do_minimo():
+    response = client.get("/grande", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert int(response.headers["content-length"]) < len(CORPO_GRANDE)
+    assert response.text == CORPO_GRANDE
+
+    response = client.get("/pequeno", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text == "ok"
+
+    response = client.get("/grande", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"abc"'
+
+
+def test_deve_enviar_vary_em_toda_resposta_comprimivel():
+    for caminho, accept_encoding in [("/grande", "gzip"), ("/pequeno", "gzip"),
+                                     ("/grande", "identity"), ("/pequeno", "")]:
+        response = client.get(caminho, headers={"Accept-Encoding": accept_encoding})
+        assert response.headers["vary"] == "Accept-Encoding"
+
+    response = client.get("/imagem", headers={"Accept-Encoding": "gzip"})
+    assert "vary" not in response.headers
+
+    response = client.get("/vary", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["vary"] == "Authorization, Accept-Encoding"
+
+
+def test_deve_comprimir_streaming_em_partes():
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        bruto = b"".join(response.iter_raw())
+    assert gzip.decompress(bruto).decode() == "".join(f"linha {i}\n" for i in range(1000))
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from main import criar_app
+from shared import config, database
+
+
+def test_deve_importar_a_aplicacao_sem_criar_engines():
+    saida = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, main; from shared import database; "
+         "print(database.engine, 'psycopg2' in sys.modules)"],
+        capture_output=True, text=True, check=True)
+    assert saida.stdout.split() == ["None", "False"]
+
+
+def test_deve_criar_aquecer_e_descartar_engines_no_ciclo_de_vida(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DATABASE_URL", f"sqlite:///{tmp_path}/pool.db")
+    monkeypatch.setattr(config, "DATABASE_REPLICA_URLS", [])
+    monkeypatch.setattr(config, "DB_POOL_AQUECIMENTO", 2)
+    monkeypatch.setattr(config, "TAREFAS_WORKERS", 0)
+
+    with TestClient(criar_app(database_async=False)):
+        engine = database.engine
+        assert engine is not None
+        assert database.roteador_leitura.escolher() is engine
+        assert engine.pool.checkedin() == 2
+        assert database.SessionLocal.kw["bind"] is engine
+
+    assert database.engine is None
+    assert engine.pool.checkedin() == 0
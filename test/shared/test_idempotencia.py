@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from contas_a_pagar_e_receber.models import FornecedorCliente
+from shared import Base
+from shared.exceptions import ChaveIdempotenciaReutilizada
+from shared.idempotencia import ChaveIdempotencia, RegistroIdempotencia
+
+engine = create_engine("sqlite:///./test.db")
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class Requisicao(BaseModel):
+    nome: str
+
+
+def preparar():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def inserir_fornecedor(db, nome: str = "Fornecedor"):
+    def inserir():
+        return {"id": db.execute(insert(FornecedorCliente).values(nome=nome)
+                                 .returning(FornecedorCliente.id)).scalar_one()}
+
+    return inserir
+
+
+def contar_fornecedores() -> int:
+    with TestingSessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(FornecedorCliente))
+
+
+# Cada thread tem o seu registro, como workers diferentes: só a chave no banco
+# é compartilhada entre elas.
+def test_deve_executar_uma_unica_vez_requisicoes_concorrentes_em_workers_diferentes():
+    preparar()
+    resultados = []
+
+    def requisitar():
+        with TestingSessionLocal() as db:
+            inserir = inserir_fornecedor(db)
+
+            def inserir_devagar():
+                resposta = inserir()
+                time.sleep(0.05)
+                return resposta
+
+            resultados.append(RegistroIdempotencia(ttl=60).executar(
+                db, "teste", "chave", Requisicao(nome="Fornecedor"), inserir_devagar))
+
+    threads = [threading.Thread(target=requisitar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert contar_fornecedores() == 1
+    assert [resposta for resposta, _ in resultados] == [{"id": 1}] * 8
+    assert sorted(repetida for _, repetida in resultados) == [False] + [True] * 7
+
+
+def test_deve_recusar_chave_reutilizada_com_outro_corpo():
+    preparar()
+    registro = RegistroIdempotencia(ttl=60)
+    with TestingSessionLocal() as db:
+        registro.executar(db, "teste", "chave", Requisicao(nome="A"),
+                          inserir_fornecedor(db, "A"))
+
+        with pytest.raises(ChaveIdempotenciaReutilizada):
+            registro.executar(db, "teste", "chave", Requisicao(nome="B"),
+                              inserir_fornecedor(db, "B"))
+        assert registro.executar(db, "outro", "chave", Requisicao(nome="B"),
+                                 inserir_fornecedor(db, "B")) == ({"id": 2}, False)
+
+
+def test_nao_deve_guardar_a_chave_quando_a_operacao_falha():
+    preparar()
+    registro = RegistroIdempotencia(ttl=60)
+
+    def falhar():
+        raise RuntimeError("banco indisponível")
+
+    with TestingSessionLocal() as db:
+        with pytest.raises(RuntimeError):
+            registro.executar(db, "teste", "chave", Requisicao(nome="A"), falhar)
+        assert db.scalar(select(func.count()).select_from(ChaveIdempotencia)) == 0
+        assert registro.executar(db, "teste", "chave", Requisicao(nome="A"),
+                                 inserir_fornecedor(db)) == ({"id": 1}, False)
+
+
+def test_deve_executar_de_novo_quando_a_chave_venceu():
+    preparar()
+    registro = RegistroIdempotencia(ttl=60)
+    with TestingSessionLocal() as db:
+        registro.executar(db, "teste", "chave", Requisicao(nome="A"),
+                          inserir_fornecedor(db))
+        db.execute(update(ChaveIdempotencia).values(
+            criada_em=datetime.now(timezone.utc) - timedelta(seconds=61)))
+        db.commit()
+
+    with TestingSessionLocal() as db:
+        assert registro.executar(db, "teste", "chave", Requisicao(nome="A"),
+                                 inserir_fornecedor(db)) == ({"id": 2}, False)
+    assert contar_fornecedores() == 2
@@ -0,0 +1,70 @@
+import logging
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, StaticPool
+from sqlalchemy.orm import sessionmaker
+
+from main import criar_app
+from shared import Base, config
+from shared.dependencies import get_db, get_db_leitura
+from shared.instrumentacao import instrumentar_engine
+
+engine = create_engine(
+    "sqlite:///./test_instrumentacao.db",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+instrumentar_engine(engine)
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False,
+                                   bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app = criar_app(database_async=False)
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_db_leitura] = override_get_db
+
+client = TestClient(app)
+
+ROTULOS = {"metodo": "GET", "rota": "/fornecedor-cliente/{id_fornecedor}"}
+
+
+def test_deve_expor_server_timing_e_metricas_por_rota():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    id_fornecedor = client.post("/fornecedor-cliente",
+                                json={"nome": "Fornecedor 1"}).json()["id"]
+    antes = REGISTRY.get_sample_value(
+        "http_requisicao_duracao_segundos_count", {**ROTULOS, "status": "200"}) or 0
+
+    response = client.get(f"/fornecedor-cliente/{id_fornecedor}")
+
+    assert response.status_code == 200
+    server_timing = response.headers["Server-Timing"]
+    for metrica in ("db-espera;dur=", "sql;dur=", "serializacao;dur=", "app;dur="):
+        assert metrica in server_timing
+    assert REGISTRY.get_sample_value(
+        "http_requisicao_duracao_segundos_count",
+        {**ROTULOS, "status": "200"}) == antes + 1
+    assert REGISTRY.get_sample_value(
+        "http_requisicao_comandos_sql_count", ROTULOS) >= 1
+
+
+def test_deve_registrar_log_de_requisicao_lenta(monkeypatch, caplog):
+    monkeypatch.setattr(config, "LIMITE_REQUISICAO_LENTA_MS", 0)
+
+    with caplog.at_level(logging.WARNING, logger="shared.instrumentacao"):
+        response = client.get("/fornecedor-cliente/999999")
+
+    assert response.status_code == 404
+    assert "Requisição lenta: GET /fornecedor-cliente/{id_fornecedor} " \
+           "status=404" in caplog.text
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, exc, text
+
+from main import app
+from shared.metricas import QueuePoolInstrumentado, registrar_engine
+
+client = TestClient(app)
+
+
+def criar_engine_de_teste(nome: str, diretorio):
+    engine = create_engine(f"sqlite:///{diretorio}/pool.db",
+                           poolclass=QueuePoolInstrumentado,
+                           pool_logging_name=nome,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    registrar_engine(engine)
+    return engine
+
+
+def test_deve_medir_conexoes_em_uso_e_timeouts_do_pool(tmp_path):
+    engine = criar_engine_de_teste("teste_timeout", tmp_path)
+
+    with engine.connect() as conexao:
+        conexao.execute(text("SELECT 1"))
+        assert REGISTRY.get_sample_value(
+            "db_pool_conexoes_em_uso", {"pool": "teste_timeout"}) == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    assert REGISTRY.get_sample_value(
+        "db_pool_conexoes_em_uso", {"pool": "teste_timeout"}) == 0
+    assert REGISTRY.get_sample_value(
+        "db_pool_checkout_timeouts_total", {"pool": "teste_timeout"}) == 1
+    assert REGISTRY.get_sample_value(
+        "db_pool_espera_checkout_segundos_count", {"pool": "teste_timeout"}) == 2
+    assert REGISTRY.get_sample_value(
+        "db_pool_retencao_conexao_segundos_count", {"pool": "teste_timeout"}) == 1
+    engine.dispose()
+
+
+def test_deve_expor_status_do_pool_e_metricas_prometheus(tmp_path):
+    engine = criar_engine_de_teste("teste_endpoint", tmp_path)
+
+    response = client.get("/metricas/pool")
+    assert response.status_code == 200
+    assert response.json()["worker"] == os.getpid()
+    assert response.json()["pools"]["teste_endpoint"] == {
+        "tamanho": 1, "em_uso": 0, "ociosas": 0, "overflow": 0, "timeout": 0.05
+    }
+
+    response = client.get("/metricas")
+    assert response.status_code == 200
+    assert 'db_pool_tamanho{pool="teste_endpoint"} 1.0' in response.text
+    engine.dispose()
+
+
+# Cada processo faz o papel de um worker: o segundo exporta as métricas
+# somando os arquivos dos dois, como o /metricas no gunicorn.
+def test_deve_somar_as_metricas_dos_workers_no_modo_multiprocesso(tmp_path):
+    worker = textwrap.dedent(f"""
+        import os, sys
+        from prometheus_client import generate_latest
+        from sqlalchemy import create_engine
+        from shared.metricas import QueuePoolInstrumentado, registrar_engine, \\
+            registro_metricas
+        from prometheus_client import multiprocess
+
+        engine = create_engine("sqlite:///{tmp_path}/pool.db",
+                               poolclass=QueuePoolInstrumentado,
+                               pool_logging_name="teste_multiprocesso")
+        registrar_engine(engine)
+        conexao = engine.connect()
+        if len(sys.argv) > 1:
+            multiprocess.mark_process_dead(int(sys.argv[1]))
+            sys.stdout.write(generate_latest(registro_metricas()).decode())
+        else:
+            sys.stdout.write(str(os.getpid()))
+        # Sai sem devolver a conexão, como se o worker continuasse com ela.
+        sys.stdout.flush()
+        os._exit(0)
+    """)
+    (tmp_path / "metricas").mkdir()
+    ambiente = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path / "metricas")}
+
+    def executar(*argumentos):
+        return subprocess.run([sys.executable, "-c", worker, *argumentos], env=ambiente,
+                              capture_output=True, text=True, check=True).stdout
+
+    # O terceiro tira o primeiro da soma dos gauges (worker morto), mas o
+    # histograma continua contando os checkouts dele.
+    primeiro = executar()
+    assert 'db_pool_conexoes_em_uso{pool="teste_multiprocesso"} 2.0' in executar("0")
+    metricas = executar(primeiro)
+    assert 'db_pool_conexoes_em_uso{pool="teste_multiprocesso"} 2.0' in metricas
+    assert 'db_pool_espera_checkout_segundos_count{pool="teste_multiprocesso"} 3.0' \
+        in metricas
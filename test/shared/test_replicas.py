@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from contas_a_pagar_e_receber.models import FornecedorCliente
+from main import criar_app
+from shared import Base, database
+from shared.dependencies import get_db
+from shared.replicas import RoteadorLeitura
+
+URL_INDISPONIVEL = "sqlite:////diretorio/inexistente/replica.db"
+
+
+def criar_engine_de_teste(url: str):
+    return create_engine(url, connect_args={"check_same_thread": False},
+                         poolclass=StaticPool)
+
+
+primario = criar_engine_de_teste("sqlite:///./test.db")
+replica = criar_engine_de_teste("sqlite:///./test_replica.db")
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False,
+                                   bind=primario)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app = criar_app(database_async=False)
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+
+def test_deve_listar_da_replica_e_escrever_no_primario(monkeypatch):
+    monkeypatch.setattr(database, "roteador_leitura",
+                        RoteadorLeitura([replica], primario))
+    for engine in (primario, replica):
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    response = client.post("/fornecedor-cliente", json={"nome": "No primário"})
+    assert response.status_code == 201
+    assert client.get("/fornecedor-cliente").json() == []
+
+    with replica.begin() as conexao:
+        conexao.execute(insert(FornecedorCliente), [{"nome": "Na réplica"}])
+    assert client.get("/fornecedor-cliente").json() == [
+        {"id": 1, "nome": "Na réplica"}
+    ]
+    assert client.get("/fornecedor-cliente/1").json() == {
+        "id": 1, "nome": "No primário"
+    }
+
+
+def test_deve_buscar_o_lote_no_primario_porque_ele_alimenta_o_cache(monkeypatch):
+    monkeypatch.setattr(database, "roteador_leitura",
+                        RoteadorLeitura([replica], primario))
+    for engine in (primario, replica):
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+    with replica.begin() as conexao:
+        conexao.execute(insert(FornecedorCliente), [{"nome": "Atrasado na réplica"}])
+
+    client.post("/fornecedor-cliente", json={"nome": "No primário"})
+    assert client.get("/fornecedor-cliente/lote?ids=1").json() == [
+        {"id": 1, "status": 200, "fornecedor": {"id": 1, "nome": "No primário"}}
+    ]
+    assert client.get("/fornecedor-cliente/1").json() == {
+        "id": 1, "nome": "No primário"
+    }
+
+
+def test_deve_alternar_replicas_e_usar_o_primario_quando_indisponiveis():
+    agora = [0.0]
+    indisponivel = create_engine(URL_INDISPONIVEL)
+
+    roteador = RoteadorLeitura([replica, primario], None)
+    assert [roteador.escolher() for _ in range(3)] == [replica, primario, replica]
+
+    roteador = RoteadorLeitura([indisponivel, replica], primario,
+                               retentar_apos=30, relogio=lambda: agora[0])
+    assert [roteador.escolher() for _ in range(3)] == [replica, replica, replica]
+
+    roteador = RoteadorLeitura([indisponivel], primario, retentar_apos=30,
+                               relogio=lambda: agora[0])
+    assert roteador.escolher() is primario
+    roteador.replicas[0] = replica
+    assert roteador.escolher() is primario
+    agora[0] = 31
+    assert roteador.escolher() is replica
+
+
+def test_deve_usar_o_primario_async_quando_a_replica_esta_indisponivel(tmp_path):
+    # Tudo termina dentro do event loop do teste: os engines são descartados
+    # nele, e as threads do aiosqlite (a da conexão que falhou avisa o loop
+    # ao parar) são aguardadas antes de o loop fechar.
+    async def escolher():
+        threads_antes = set(threading.enumerate())
+        primario_async = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/primario.db")
+        replica_async = create_async_engine(
+            "sqlite+aiosqlite:////diretorio/inexistente/replica.db")
+        try:
+            roteador = RoteadorLeitura([replica_async], primario_async)
+            return await roteador.escolher_async() is primario_async
+        finally:
+            await replica_async.dispose()
+            await primario_async.dispose()
+            for thread in set(threading.enumerate()) - threads_antes:
+                await asyncio.to_thread(thread.join, 5)
+
+    assert asyncio.run(escolher())
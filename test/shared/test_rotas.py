@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, field_validator
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from shared import database
+from shared.rotas import RotaSessaoCurta
+from shared.tarefas import Tarefa
+
+engine = create_engine("sqlite:///./test_pool.db", pool_size=1, max_overflow=0)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False,
+                                   bind=engine)
+conexoes_em_uso_na_serializacao = []
+
+
+def get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class RespostaTeste(BaseModel):
+    valor: int
+
+    @field_validator("valor")
+    @classmethod
+    def registrar_conexoes_em_uso(cls, valor):
+        conexoes_em_uso_na_serializacao.append(engine.pool.checkedout())
+        return valor
+
+
+router = APIRouter(route_class=RotaSessaoCurta)
+
+
+@router.get("/sync", response_model=RespostaTeste)
+def rota_sync(db: Session = Depends(get_db)):
+    return {"valor": db.execute(text("SELECT 1")).scalar()}
+
+
+@router.get("/async", response_model=RespostaTeste)
+async def rota_async(db: Session = Depends(get_db)):
+    return {"valor": db.execute(text("SELECT 2")).scalar()}
+
+
+@router.get("/parametro/{valor}")
+def rota_com_parametro(valor: int) -> RespostaTeste:
+    return RespostaTeste(valor=valor)
+
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+
+def test_deve_devolver_conexao_ao_pool_antes_da_serializacao():
+    conexoes_em_uso_na_serializacao.clear()
+
+    assert client.get("/sync").json() == {"valor": 1}
+    assert client.get("/async").json() == {"valor": 2}
+
+    assert conexoes_em_uso_na_serializacao == [0, 0]
+    assert engine.pool.checkedout() == 0
+
+
+def test_deve_manter_a_assinatura_do_endpoint_envolvido():
+    conexoes_em_uso_na_serializacao.clear()
+
+    assert client.get("/parametro/3").json() == {"valor": 3}
+    assert client.get("/parametro/x").status_code == 422
+    assert rota_com_parametro.__name__ == "rota_com_parametro"
+
+
+# Nas rotas que escrevem, a conexão volta ao pool no commit, e o objeto
+# retornado não é recarregado do banco na serialização.
+def test_deve_devolver_conexao_no_commit_sem_recarregar_os_objetos():
+    Tarefa.__table__.drop(bind=engine, checkfirst=True)
+    Tarefa.__table__.create(bind=engine)
+    agora = datetime.now(timezone.utc)
+    with database.SessionLocal(bind=engine) as db:
+        tarefa = Tarefa(tipo="teste", parametros={}, status="PENDENTE", tentativas=0,
+                        max_tentativas=1, criada_em=agora, disponivel_em=agora)
+        db.add(tarefa)
+        db.commit()
+        assert engine.pool.checkedout() == 0
+
+        assert (tarefa.id, tarefa.status) == (1, "PENDENTE")
+        assert engine.pool.checkedout() == 0
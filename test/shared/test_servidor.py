@@ -0,0 +1,41 @@
+import os
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+import shared.cache
+from main import app
+from shared import config, database
+from shared.cache import Cache, CacheEmMemoria
+from shared.servidor import desativar_cache_local
+
+
+def test_deve_descartar_pool_herdado_sem_fechar_conexoes_do_pai(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/pool.db")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", None)
+
+    conexao_do_pai = engine.connect()
+    pool_herdado = engine.pool
+
+    database.descartar_conexoes_herdadas()
+
+    assert engine.pool is not pool_herdado
+    assert engine.pool.checkedout() == 0
+    assert conexao_do_pai.execute(text("SELECT 1")).scalar() == 1
+    conexao_do_pai.close()
+    engine.dispose()
+
+
+def test_deve_desativar_o_cache_em_memoria_com_mais_de_um_worker(monkeypatch):
+    monkeypatch.setattr(config, "CACHE_BACKEND", "memoria")
+    monkeypatch.setattr(shared.cache, "cache", CacheEmMemoria())
+    monkeypatch.setenv("CACHE_BACKEND", "memoria")
+
+    desativar_cache_local(1)
+    assert isinstance(shared.cache.cache, CacheEmMemoria)
+
+    desativar_cache_local(4)
+    assert type(shared.cache.cache) is Cache
+    assert os.environ["CACHE_BACKEND"] == "desativado"
+    assert TestClient(app).get("/metricas/cache").json()["backend"] == "nulo"
@@ -0,0 +1,125 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from contas_a_pagar_e_receber.models import FornecedorCliente
+from shared import Base
+from shared.tarefas import FilaTarefas, StatusTarefaEnum, Tarefa, \
+    bloquear_por_chave, tarefa
+
+engine = create_engine("sqlite:///./test.db")
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+chamadas = []
+outro_worker = []
+
+
+@tarefa("teste_instavel")
+def tarefa_instavel(db, falhas: int) -> dict:
+    chamadas.append(falhas)
+    if len(chamadas) <= falhas:
+        raise RuntimeError("banco indisponível")
+    return {"chamadas": len(chamadas)}
+
+
+# Na primeira execução, outro worker encontra a tarefa além do tempo limite
+# e a executa inteira antes de esta terminar.
+@tarefa("teste_demorada")
+def tarefa_demorada(db) -> dict:
+    chamadas.append(1)
+    if len(chamadas) == 1:
+        outro_worker[0].processar_pendentes()
+    db.execute(insert(FornecedorCliente).values(nome=f"Execução {len(chamadas)}"))
+    return {"execucao": len(chamadas)}
+
+
+def preparar() -> FilaTarefas:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    chamadas.clear()
+    outro_worker.clear()
+    return FilaTarefas(TestingSessionLocal, max_tentativas=3, espera_base=0)
+
+
+def obter(id_tarefa: int) -> Tarefa:
+    with TestingSessionLocal() as db:
+        return db.get(Tarefa, id_tarefa)
+
+
+def test_deve_repetir_a_tarefa_ate_concluir():
+    fila = preparar()
+    with TestingSessionLocal() as db:
+        id_tarefa = fila.enfileirar(db, "teste_instavel", {"falhas": 2}).id
+
+    assert fila.processar_pendentes() == 3
+    concluida = obter(id_tarefa)
+    assert concluida.status == StatusTarefaEnum.CONCLUIDA
+    assert concluida.tentativas == 3
+    assert concluida.resultado == {"chamadas": 3}
+    assert concluida.erro is None
+
+
+def test_deve_marcar_como_falha_depois_da_ultima_tentativa():
+    fila = preparar()
+    with TestingSessionLocal() as db:
+        id_tarefa = fila.enfileirar(db, "teste_instavel", {"falhas": 5}).id
+
+    assert fila.processar_pendentes() == 3
+    falhou = obter(id_tarefa)
+    assert falhou.status == StatusTarefaEnum.FALHOU
+    assert falhou.erro == "RuntimeError: banco indisponível"
+
+
+def test_deve_reexecutar_tarefa_abandonada_por_um_worker():
+    fila = preparar()
+    with TestingSessionLocal() as db:
+        id_tarefa = fila.enfileirar(db, "teste_instavel", {"falhas": 0}).id
+        db.execute(update(Tarefa).values(
+            status=StatusTarefaEnum.EXECUTANDO.value, tentativas=1,
+            iniciada_em=datetime(2000, 1, 1, tzinfo=timezone.utc)))
+        db.commit()
+
+    assert fila.processar_pendentes() == 1
+    concluida = obter(id_tarefa)
+    assert concluida.status == StatusTarefaEnum.CONCLUIDA
+    assert concluida.tentativas == 2
+
+
+def test_deve_descartar_o_trabalho_do_worker_que_perdeu_a_reserva():
+    fila = preparar()
+    depois_do_limite = datetime.now(timezone.utc) + timedelta(hours=1)
+    outro_worker.append(FilaTarefas(TestingSessionLocal, espera_base=0,
+                                    relogio=lambda: depois_do_limite))
+    with TestingSessionLocal() as db:
+        id_tarefa = fila.enfileirar(db, "teste_demorada", {}).id
+
+    assert fila.processar_pendentes() == 1
+    concluida = obter(id_tarefa)
+    assert concluida.status == StatusTarefaEnum.CONCLUIDA
+    assert concluida.tentativas == 2
+    assert concluida.resultado == {"execucao": 2}
+    with TestingSessionLocal() as db:
+        assert db.scalars(select(FornecedorCliente.nome)).all() == ["Execução 2"]
+
+
+def test_deve_executar_uma_de_cada_vez_as_transacoes_com_a_mesma_chave():
+    preparar()
+    eventos = []
+
+    def executar(indice: int):
+        with TestingSessionLocal() as db:
+            bloquear_por_chave(db, "chave")
+            eventos.append(("inicio", indice))
+            time.sleep(0.05)
+            eventos.append(("fim", indice))
+            db.commit()
+
+    threads = [threading.Thread(target=executar, args=(indice,)) for indice in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [tipo for tipo, _ in eventos] == ["inicio", "fim"] * 3
@@ -0,0 +1,44 @@
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, insert, select
+
+from contas_a_pagar_e_receber.models import ContaPagarReceber, FornecedorCliente, \
+    SaldoFornecedor, TOTAL_GERAL
+from shared import Base
+from shared.versao_tabela import VersaoTabela
+
+def configuracao_alembic(url: str) -> Config:
+    configuracao = Config("alembic.ini")
+    configuracao.set_main_option("sqlalchemy.url", url)
+    return configuracao
+
+
+def test_deve_migrar_ate_head_com_o_mesmo_esquema_dos_modelos(tmp_path):
+    url = f"sqlite:///{tmp_path}/migracoes.db"
+    engine = create_engine(url)
+    configuracao = configuracao_alembic(url)
+    command.downgrade(configuracao, "base")
+    command.upgrade(configuracao, "head")
+
+    with engine.connect() as conexao:
+        diferencas = compare_metadata(MigrationContext.configure(conexao),
+                                      Base.metadata)
+    assert diferencas == []
+
+    with engine.begin() as conexao:
+        conexao.execute(insert(FornecedorCliente).values(nome="Fornecedor 1"))
+        versao = conexao.execute(select(VersaoTabela.versao).where(
+            VersaoTabela.tabela == "fornecedor_cliente")).scalar_one()
+        conexao.execute(insert(ContaPagarReceber).values(
+            descricao="Aluguel", valor=100, tipo="PAGAR", fornecedor_id=1))
+        saldo = conexao.execute(select(SaldoFornecedor.fornecedor_id,
+                                       SaldoFornecedor.quantidade,
+                                       SaldoFornecedor.total_pagar)
+                                .order_by(SaldoFornecedor.fornecedor_id)).all()
+    assert versao == 1
+    assert saldo == [(TOTAL_GERAL, 1, 100), (1, 1, 100)]
+
+    command.downgrade(configuracao, "base")
+    engine.dispose()